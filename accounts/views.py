@@ -167,9 +167,11 @@ def custom_logout(request):
 
 # Importar modelo de funcionário, se o app employees estiver disponível
 try:
+    from employees.dashboard import dashboard_period
     from employees.models import Employee
 except ImportError:
     Employee = None
+    dashboard_period = None
 
 
 from django.contrib.auth import login, authenticate
@@ -262,7 +264,13 @@ class DashboardView(LoginRequiredMixin, TemplateView):
             
         # Adicionar contadores ao contexto
         if Employee is not None:
-            context['total_employees'] = Employee.objects.filter(client=client).count()
-            context['active_employees'] = Employee.objects.filter(client=client, situacao='ATIVO').count()
+            # Funcionários que saíram da exportação do SOC não entram no quadro
+            employees = Employee.objects.filter(client=client, missing_since__isnull=True)
+            context['total_employees'] = employees.count()
+            context['active_employees'] = employees.filter(situacao='ATIVO').count()
+
+        # Período dos filtros, em meses inteiros como os gráficos o aplicam
+        if dashboard_period is not None:
+            context['start_date'], context['end_date'] = dashboard_period(self.request.GET)
         
         return context
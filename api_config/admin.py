@@ -1,24 +1,72 @@
 from django.contrib import admin
-from .models import EmployeeCredentials, AbsenceCredentials, SyncLog
+from .models import EmployeeCredentials, AbsenceCredentials, SyncLog, SyncChunk, BackfillJob, BackfillWindow
 
 @admin.register(EmployeeCredentials)
 class EmployeeCredentialsAdmin(admin.ModelAdmin):
-    list_display = ('company', 'user', 'is_active', 'is_inactive', 'is_away', 'is_pending', 'is_vacation', 'updated_at')
+    list_display = ('company', 'user', 'is_active', 'is_inactive', 'is_away', 'is_pending', 'is_vacation', 'last_change_watermark', 'last_full_sync_at', 'sync_interval_minutes', 'next_sync_at', 'updated_at')
     list_filter = ('is_active', 'is_inactive', 'is_away', 'is_pending', 'is_vacation', 'client')
     search_fields = ('company', 'user__email', 'code')
     date_hierarchy = 'updated_at'
 
 @admin.register(AbsenceCredentials)
 class AbsenceCredentialsAdmin(admin.ModelAdmin):
-    list_display = ('main_company', 'work_company', 'user', 'start_date', 'end_date', 'updated_at')
+    list_display = ('main_company', 'work_company', 'user', 'start_date', 'end_date', 'sync_interval_minutes', 'next_sync_at', 'updated_at')
     list_filter = ('client', 'start_date', 'end_date')
     search_fields = ('main_company', 'work_company', 'user__email', 'code')
     date_hierarchy = 'updated_at'
 
+class SyncChunkInline(admin.TabularInline):
+    model = SyncChunk
+    extra = 0
+    can_delete = False
+    fields = ('index', 'status', 'size', 'attempts', 'records_success', 'records_error', 'error_message', 'finished_at')
+    readonly_fields = fields
+
 @admin.register(SyncLog)
 class SyncLogAdmin(admin.ModelAdmin):
     list_display = ('api_type', 'company', 'user', 'status', 'records_processed', 'records_success', 'records_error', 'start_time')
     list_filter = ('api_type', 'status', 'client')
     search_fields = ('company', 'user__email', 'error_message')
     date_hierarchy = 'created_at'
-    readonly_fields = ('created_at', 'start_time', 'end_time')
\ No newline at end of file
+    readonly_fields = ('created_at', 'start_time', 'end_time')
+    inlines = [SyncChunkInline]
+
+class BackfillWindowInline(admin.TabularInline):
+    model = BackfillWindow
+    extra = 0
+    can_delete = False
+    fields = ('start_date', 'end_date', 'status', 'attempts', 'records_processed', 'records_error', 'error_message', 'finished_at')
+    readonly_fields = fields
+
+@admin.register(BackfillJob)
+class BackfillJobAdmin(admin.ModelAdmin):
+    list_display = ('credentials', 'start_date', 'end_date', 'parallelism', 'status', 'created_at', 'finished_at')
+    list_filter = ('status', 'client')
+    search_fields = ('credentials__main_company', 'user__email')
+    readonly_fields = ('status', 'task_id', 'created_at', 'finished_at')
+    inlines = [BackfillWindowInline]
+    actions = ['run_jobs']
+
+    @admin.action(description="Executar/retomar cargas selecionadas")
+    def run_jobs(self, request, queryset):
+        from employees.tasks import run_backfill_job_task
+
+        for job in queryset:
+            result = run_backfill_job_task.delay(job.id)
+            BackfillJob.objects.filter(id=job.id).update(task_id=result.id)
+        self.message_user(request, f"{queryset.count()} carga(s) enfileirada(s).")
+
+@admin.register(BackfillWindow)
+class BackfillWindowAdmin(admin.ModelAdmin):
+    list_display = ('job', 'start_date', 'end_date', 'status', 'attempts', 'records_processed', 'records_error', 'finished_at')
+    list_filter = ('status', 'job__client')
+    readonly_fields = ('sync_log', 'attempts', 'records_processed', 'records_error', 'started_at', 'finished_at')
+    actions = ['retry_windows']
+
+    @admin.action(description="Reprocessar janelas selecionadas")
+    def retry_windows(self, request, queryset):
+        from employees.tasks import retry_backfill_window_task
+
+        for window in queryset:
+            retry_backfill_window_task.delay(window.id)
+        self.message_user(request, f"{queryset.count()} janela(s) enfileirada(s).")
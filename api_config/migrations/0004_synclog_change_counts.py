@@ -0,0 +1,28 @@
+# Generated manually
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_config', '0003_alter_synclog_error_message'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='synclog',
+            name='records_inserted',
+            field=models.IntegerField(default=0, verbose_name='Registros Inseridos'),
+        ),
+        migrations.AddField(
+            model_name='synclog',
+            name='records_updated',
+            field=models.IntegerField(default=0, verbose_name='Registros Atualizados'),
+        ),
+        migrations.AddField(
+            model_name='synclog',
+            name='records_unchanged',
+            field=models.IntegerField(default=0, verbose_name='Registros sem Alteração'),
+        ),
+    ]
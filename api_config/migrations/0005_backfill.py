@@ -0,0 +1,62 @@
+# Generated manually
+
+import django.core.validators
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_config', '0004_synclog_change_counts'),
+        ('clients', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BackfillJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_date', models.DateField(verbose_name='Data Início')),
+                ('end_date', models.DateField(verbose_name='Data Fim')),
+                ('parallelism', models.PositiveSmallIntegerField(default=4, validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(10)], verbose_name='Janelas Simultâneas')),
+                ('status', models.CharField(choices=[('pending', 'Pendente'), ('running', 'Em execução'), ('success', 'Sucesso'), ('partial', 'Parcial'), ('error', 'Erro')], default='pending', max_length=50, verbose_name='Status')),
+                ('task_id', models.CharField(blank=True, max_length=36, null=True, verbose_name='ID da Tarefa')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Criado em')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Concluído em')),
+                ('client', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='clients.client', verbose_name='Cliente')),
+                ('credentials', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='api_config.absencecredentials', verbose_name='Credencial de Absenteísmo')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Usuário')),
+            ],
+            options={
+                'verbose_name': 'Carga Histórica de Absenteísmo',
+                'verbose_name_plural': 'Cargas Históricas de Absenteísmo',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='BackfillWindow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_date', models.DateField(verbose_name='Data Início')),
+                ('end_date', models.DateField(verbose_name='Data Fim')),
+                ('status', models.CharField(choices=[('pending', 'Pendente'), ('running', 'Em execução'), ('success', 'Sucesso'), ('partial', 'Parcial'), ('error', 'Erro')], default='pending', max_length=50, verbose_name='Status')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Tentativas')),
+                ('records_processed', models.IntegerField(default=0, verbose_name='Registros Processados')),
+                ('records_error', models.IntegerField(default=0, verbose_name='Registros com Erro')),
+                ('error_message', models.TextField(blank=True, null=True, verbose_name='Mensagem de Erro')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Iniciado em')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Concluído em')),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='windows', to='api_config.backfilljob', verbose_name='Carga Histórica')),
+                ('sync_log', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='api_config.synclog', verbose_name='Log de Sincronização')),
+            ],
+            options={
+                'verbose_name': 'Janela de Carga Histórica',
+                'verbose_name_plural': 'Janelas de Carga Histórica',
+                'ordering': ['job', 'start_date'],
+                'unique_together': {('job', 'start_date')},
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated manually
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_config', '0005_backfill'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='employeecredentials',
+            name='last_change_watermark',
+            field=models.DateField(blank=True, null=True, verbose_name='Última Alteração Sincronizada'),
+        ),
+        migrations.AddField(
+            model_name='employeecredentials',
+            name='last_full_sync_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Última Sincronização Completa'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.1.7 on 2026-10-18 19:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_config', '0006_employeecredentials_watermark'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncChunk',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('index', models.PositiveIntegerField(verbose_name='Parte')),
+                ('status', models.CharField(choices=[('pending', 'Pendente'), ('success', 'Sucesso'), ('error', 'Erro')], default='pending', max_length=50, verbose_name='Status')),
+                ('records', models.JSONField(blank=True, null=True, verbose_name='Registros')),
+                ('size', models.PositiveIntegerField(default=0, verbose_name='Registros Recebidos')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Tentativas')),
+                ('records_success', models.IntegerField(default=0, verbose_name='Registros com Sucesso')),
+                ('records_error', models.IntegerField(default=0, verbose_name='Registros com Erro')),
+                ('records_inserted', models.IntegerField(default=0, verbose_name='Registros Inseridos')),
+                ('records_updated', models.IntegerField(default=0, verbose_name='Registros Atualizados')),
+                ('records_unchanged', models.IntegerField(default=0, verbose_name='Registros sem Alteração')),
+                ('latest_change', models.DateField(blank=True, null=True, verbose_name='Última Alteração Recebida')),
+                ('error_message', models.TextField(blank=True, null=True, verbose_name='Mensagem de Erro')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Concluído em')),
+                ('sync_log', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chunks', to='api_config.synclog', verbose_name='Log de Sincronização')),
+            ],
+            options={
+                'verbose_name': 'Parte de Sincronização',
+                'verbose_name_plural': 'Partes de Sincronização',
+                'ordering': ['sync_log', 'index'],
+                'unique_together': {('sync_log', 'index')},
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.7 on 2026-10-18 19:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_config', '0007_syncchunk'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='absencecredentials',
+            name='next_sync_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Próxima Sincronização'),
+        ),
+        migrations.AddField(
+            model_name='absencecredentials',
+            name='sync_interval_minutes',
+            field=models.PositiveIntegerField(default=0, verbose_name='Intervalo de Sincronização (min)'),
+        ),
+        migrations.AddField(
+            model_name='employeecredentials',
+            name='next_sync_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Próxima Sincronização'),
+        ),
+        migrations.AddField(
+            model_name='employeecredentials',
+            name='sync_interval_minutes',
+            field=models.PositiveIntegerField(default=0, verbose_name='Intervalo de Sincronização (min)'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 19:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_config', '0008_sync_schedule'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='synclog',
+            name='records_missing',
+            field=models.IntegerField(default=0, verbose_name='Funcionários Ausentes da Exportação'),
+        ),
+    ]
@@ -10,6 +10,12 @@ User = get_user_model()
 # Definindo as constantes para "Usuário" e "Criado em"
 USER_LABEL = _("Usuário")
 CREATED_AT_LABEL = _("Criado em")
+# Maior intervalo aceito pelo SOC em uma consulta de absenteísmo
+ABSENCE_MAX_PERIOD_DAYS = 30
+# Intervalo padrão das sincronizações agendadas: desligado, o agendamento é
+# ativado por credencial (admin), para credenciais existentes não passarem a
+# sincronizar sozinhas
+DEFAULT_SYNC_INTERVAL_MINUTES = 0
 
 class EmployeeCredentials(models.Model):
     """Credenciais para API de funcionários"""
@@ -26,6 +32,16 @@ class EmployeeCredentials(models.Model):
     is_pending = models.BooleanField(_("Pendente"), default=False)
     is_vacation = models.BooleanField(_("Férias"), default=False)
 
+    # Sincronização incremental: maior DATAULTALTERACAO já gravada com sucesso
+    last_change_watermark = models.DateField(_("Última Alteração Sincronizada"), blank=True, null=True)
+    last_full_sync_at = models.DateTimeField(_("Última Sincronização Completa"), blank=True, null=True)
+
+    # Agendamento automático (0 desliga); next_sync_at é calculado pelo agendador
+    sync_interval_minutes = models.PositiveIntegerField(
+        _("Intervalo de Sincronização (min)"), default=DEFAULT_SYNC_INTERVAL_MINUTES
+    )
+    next_sync_at = models.DateTimeField(_("Próxima Sincronização"), blank=True, null=True)
+
     created_at = models.DateTimeField(CREATED_AT_LABEL, auto_now_add=True)
     updated_at = models.DateTimeField(_("Atualizado em"), auto_now=True)
 
@@ -49,6 +65,12 @@ class AbsenceCredentials(models.Model):
     start_date = models.DateField(_("Data Início"))
     end_date = models.DateField(_("Data Fim"))
 
+    # Agendamento automático (0 desliga); next_sync_at é calculado pelo agendador
+    sync_interval_minutes = models.PositiveIntegerField(
+        _("Intervalo de Sincronização (min)"), default=DEFAULT_SYNC_INTERVAL_MINUTES
+    )
+    next_sync_at = models.DateTimeField(_("Próxima Sincronização"), blank=True, null=True)
+
     created_at = models.DateTimeField(CREATED_AT_LABEL, auto_now_add=True)
     updated_at = models.DateTimeField(_("Atualizado em"), auto_now=True)
 
@@ -69,7 +91,7 @@ class AbsenceCredentials(models.Model):
             raise ValidationError(_("A data de fim deve ser maior que a data de início."))
 
         # Verificar se o intervalo é de no máximo 30 dias
-        if (self.end_date - self.start_date) > timedelta(days=30):
+        if (self.end_date - self.start_date) > timedelta(days=ABSENCE_MAX_PERIOD_DAYS):
             raise ValidationError(_("O intervalo entre as datas não pode ser maior que 30 dias."))
 
 
@@ -91,6 +113,10 @@ class SyncLog(models.Model):
     records_processed = models.IntegerField(_("Registros Processados"), default=0)
     records_success = models.IntegerField(_("Registros com Sucesso"), default=0)
     records_error = models.IntegerField(_("Registros com Erro"), default=0)
+    records_inserted = models.IntegerField(_("Registros Inseridos"), default=0)
+    records_updated = models.IntegerField(_("Registros Atualizados"), default=0)
+    records_unchanged = models.IntegerField(_("Registros sem Alteração"), default=0)
+    records_missing = models.IntegerField(_("Funcionários Ausentes da Exportação"), default=0)
     error_message = models.TextField(_("Mensagem de Erro"), blank=True, null=True)  # Adicionando null=True
     start_time = models.DateTimeField(_("Hora Início"))
     end_time = models.DateTimeField(_("Hora Fim"), blank=True, null=True)
@@ -105,3 +131,115 @@ class SyncLog(models.Model):
 
     def __str__(self):
         return f"{self.get_api_type_display()} - {self.company} - {self.get_status_display()}"
+
+
+class BackfillJob(models.Model):
+    """Carga histórica de absenteísmo dividida em janelas aceitas pelo SOC"""
+    client = models.ForeignKey(Client, on_delete=models.CASCADE, verbose_name=_("Cliente"))
+    user = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name=USER_LABEL)
+    credentials = models.ForeignKey(
+        AbsenceCredentials, on_delete=models.CASCADE, verbose_name=_("Credencial de Absenteísmo")
+    )
+    start_date = models.DateField(_("Data Início"))
+    end_date = models.DateField(_("Data Fim"))
+    parallelism = models.PositiveSmallIntegerField(
+        _("Janelas Simultâneas"), default=4, validators=[MinValueValidator(1), MaxValueValidator(10)]
+    )
+    status = models.CharField(
+        _("Status"),
+        max_length=50,
+        choices=[
+            ('pending', 'Pendente'), ('running', 'Em execução'), ('success', 'Sucesso'),
+            ('partial', 'Parcial'), ('error', 'Erro'),
+        ],
+        default='pending'
+    )
+    task_id = models.CharField(_("ID da Tarefa"), max_length=36, blank=True, null=True)
+
+    created_at = models.DateTimeField(CREATED_AT_LABEL, auto_now_add=True)
+    finished_at = models.DateTimeField(_("Concluído em"), blank=True, null=True)
+
+    class Meta:
+        verbose_name = _("Carga Histórica de Absenteísmo")
+        verbose_name_plural = _("Cargas Históricas de Absenteísmo")
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.credentials.main_company} - {self.start_date:%d/%m/%Y} a {self.end_date:%d/%m/%Y}"
+
+    def clean(self):
+        from django.core.exceptions import ValidationError
+
+        if self.end_date < self.start_date:
+            raise ValidationError(_("A data de fim deve ser maior que a data de início."))
+
+
+class BackfillWindow(models.Model):
+    """Janela de até ABSENCE_MAX_PERIOD_DAYS dias de uma carga histórica"""
+    job = models.ForeignKey(
+        BackfillJob, on_delete=models.CASCADE, related_name='windows', verbose_name=_("Carga Histórica")
+    )
+    start_date = models.DateField(_("Data Início"))
+    end_date = models.DateField(_("Data Fim"))
+    status = models.CharField(
+        _("Status"),
+        max_length=50,
+        choices=[
+            ('pending', 'Pendente'), ('running', 'Em execução'), ('success', 'Sucesso'),
+            ('partial', 'Parcial'), ('error', 'Erro'),
+        ],
+        default='pending'
+    )
+    sync_log = models.ForeignKey(
+        SyncLog, on_delete=models.SET_NULL, blank=True, null=True, verbose_name=_("Log de Sincronização")
+    )
+    attempts = models.PositiveIntegerField(_("Tentativas"), default=0)
+    records_processed = models.IntegerField(_("Registros Processados"), default=0)
+    records_error = models.IntegerField(_("Registros com Erro"), default=0)
+    error_message = models.TextField(_("Mensagem de Erro"), blank=True, null=True)
+    started_at = models.DateTimeField(_("Iniciado em"), blank=True, null=True)
+    finished_at = models.DateTimeField(_("Concluído em"), blank=True, null=True)
+
+    class Meta:
+        verbose_name = _("Janela de Carga Histórica")
+        verbose_name_plural = _("Janelas de Carga Histórica")
+        ordering = ['job', 'start_date']
+        unique_together = ['job', 'start_date']
+
+    def __str__(self):
+        return f"{self.start_date:%d/%m/%Y} a {self.end_date:%d/%m/%Y} - {self.get_status_display()}"
+
+
+class SyncChunk(models.Model):
+    """Parte de uma sincronização grande, processada por uma tarefa própria do Celery"""
+    sync_log = models.ForeignKey(
+        SyncLog, on_delete=models.CASCADE, related_name='chunks', verbose_name=_("Log de Sincronização")
+    )
+    index = models.PositiveIntegerField(_("Parte"))
+    status = models.CharField(
+        _("Status"),
+        max_length=50,
+        choices=[('pending', 'Pendente'), ('success', 'Sucesso'), ('error', 'Erro')],
+        default='pending'
+    )
+    # Registros brutos do SOC; apagados quando a parte é gravada com sucesso
+    records = models.JSONField(_("Registros"), blank=True, null=True)
+    size = models.PositiveIntegerField(_("Registros Recebidos"), default=0)
+    attempts = models.PositiveIntegerField(_("Tentativas"), default=0)
+    records_success = models.IntegerField(_("Registros com Sucesso"), default=0)
+    records_error = models.IntegerField(_("Registros com Erro"), default=0)
+    records_inserted = models.IntegerField(_("Registros Inseridos"), default=0)
+    records_updated = models.IntegerField(_("Registros Atualizados"), default=0)
+    records_unchanged = models.IntegerField(_("Registros sem Alteração"), default=0)
+    latest_change = models.DateField(_("Última Alteração Recebida"), blank=True, null=True)
+    error_message = models.TextField(_("Mensagem de Erro"), blank=True, null=True)
+    finished_at = models.DateTimeField(_("Concluído em"), blank=True, null=True)
+
+    class Meta:
+        verbose_name = _("Parte de Sincronização")
+        verbose_name_plural = _("Partes de Sincronização")
+        ordering = ['sync_log', 'index']
+        unique_together = ['sync_log', 'index']
+
+    def __str__(self):
+        return f"{self.sync_log_id} - parte {self.index} - {self.get_status_display()}"
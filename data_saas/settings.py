@@ -102,9 +102,13 @@ TEMPLATES = [
 ]
 
 # --------------------------------------------------------------
-# WSGI
+# WSGI / ASGI
 # --------------------------------------------------------------
 WSGI_APPLICATION = "data_saas.wsgi.application"
+# Produção roda em ASGI (uvicorn) por causa do stream SSE de progresso das
+# sincronizações, com WEB_CONCURRENCY processos (Procfile): as views síncronas
+# vão para o pool de threads de cada processo, então um processo só não basta
+ASGI_APPLICATION = "data_saas.asgi.application"
 
 # --------------------------------------------------------------
 # Banco de Dados
@@ -250,6 +254,89 @@ CELERY_TASK_SERIALIZER = "json"
 CELERY_RESULT_SERIALIZER = "json"
 CELERY_TIMEZONE = "America/Sao_Paulo"
 
+# Agendador das sincronizações automáticas (processo separado: celery -A data_saas beat)
+SYNC_SCHEDULER_INTERVAL = config("SYNC_SCHEDULER_INTERVAL", default=60, cast=int)
+# Sincronizações em andamento ao mesmo tempo: no total e por cliente
+SYNC_MAX_CONCURRENT = config("SYNC_MAX_CONCURRENT", default=4, cast=int)
+SYNC_MAX_CONCURRENT_PER_CLIENT = config("SYNC_MAX_CONCURRENT_PER_CLIENT", default=1, cast=int)
+# Sincronizações agendadas de absenteísmo buscam os últimos N dias até hoje
+# (no máximo os 30 dias que o SOC aceita por consulta)
+SYNC_ABSENCE_WINDOW_DAYS = config("SYNC_ABSENCE_WINDOW_DAYS", default=30, cast=int)
+CELERY_BEAT_SCHEDULE = {
+    "schedule-syncs": {
+        "task": "employees.tasks.schedule_syncs_task",
+        "schedule": SYNC_SCHEDULER_INTERVAL,
+    },
+}
+
+# --------------------------------------------------------------
+# Cache
+# --------------------------------------------------------------
+# Redis (compartilhado entre web e workers) é obrigatório em produção: sem ele
+# o cache é local ao processo, o progresso das sincronizações feitas no worker
+# só aparece no fim e cada stream SSE aberto consulta o SyncLog no banco a cada
+# SYNC_STREAM_INTERVAL, e o dashboard é montado uma vez por processo web.
+# Em produção, aponte REDIS_CACHE_URL para uma instância Redis separada do
+# broker, com maxmemory e maxmemory-policy allkeys-lru. A política vale para a
+# instância inteira (não por banco), e o broker precisa de noeviction para não
+# perder tarefas. Sem essa separação o cache cai no REDIS_URL do broker e só o
+# prazo de validade das chaves limita a memória.
+REDIS_CACHE_URL = config("REDIS_CACHE_URL", default=os.environ.get("REDIS_URL", ""))
+if REDIS_CACHE_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_CACHE_URL,
+        }
+    }
+
+# Tempo de vida do progresso de uma sincronização no cache (segundos)
+SYNC_PROGRESS_TTL = config("SYNC_PROGRESS_TTL", default=6 * 60 * 60, cast=int)
+# Validade máxima do lock de uma sincronização (cliente, tipo, empresa), caso a tarefa não o libere
+SYNC_LOCK_TTL = config("SYNC_LOCK_TTL", default=6 * 60 * 60, cast=int)
+# Dashboard em cache por cliente e versão dos dados (segundos). O período
+# padrão é o mais lido e fica mais tempo; os escolhidos pelo usuário expiram logo
+DASHBOARD_CACHE_TTL = config("DASHBOARD_CACHE_TTL", default=7 * 24 * 60 * 60, cast=int)
+DASHBOARD_CUSTOM_PERIOD_CACHE_TTL = config("DASHBOARD_CUSTOM_PERIOD_CACHE_TTL", default=15 * 60, cast=int)
+# Stream SSE de progresso: intervalo de leitura, duração máxima de uma conexão
+# (o navegador reconecta depois) e espera antes da reconexão
+SYNC_STREAM_INTERVAL = config("SYNC_STREAM_INTERVAL", default=1.0, cast=float)
+SYNC_STREAM_TIMEOUT = config("SYNC_STREAM_TIMEOUT", default=30 * 60, cast=int)
+SYNC_STREAM_RETRY_MS = config("SYNC_STREAM_RETRY_MS", default=3000, cast=int)
+
+# --------------------------------------------------------------
+# Web Service SOC
+# --------------------------------------------------------------
+SOC_EXPORT_URL = config("SOC_EXPORT_URL", default="https://ws1.soc.com.br/WebSoc/exportadados")
+SOC_CONNECT_TIMEOUT = config("SOC_CONNECT_TIMEOUT", default=10, cast=float)
+# Tempo máximo entre dois blocos da resposta (não do download inteiro)
+SOC_READ_TIMEOUT = config("SOC_READ_TIMEOUT", default=300, cast=float)
+SOC_MAX_RETRIES = config("SOC_MAX_RETRIES", default=3, cast=int)
+SOC_BACKOFF_FACTOR = config("SOC_BACKOFF_FACTOR", default=1.0, cast=float)
+SOC_BACKOFF_JITTER = config("SOC_BACKOFF_JITTER", default=1.0, cast=float)
+SOC_POOL_MAXSIZE = config("SOC_POOL_MAXSIZE", default=10, cast=int)
+# Teto de janelas de carga histórica de absenteísmo consultadas ao mesmo tempo
+BACKFILL_MAX_PARALLELISM = config("BACKFILL_MAX_PARALLELISM", default=4, cast=int)
+# Intervalo entre sincronizações completas de funcionários; entre elas a
+# sincronização é incremental (só registros alterados desde a última)
+EMPLOYEE_FULL_SYNC_INTERVAL_HOURS = config("EMPLOYEE_FULL_SYNC_INTERVAL_HOURS", default=24, cast=int)
+# Respostas brutas do SOC guardadas (gzip) para reprocessamento; 0 desliga a captura
+SYNC_PAYLOAD_DIR = config("SYNC_PAYLOAD_DIR", default=str(BASE_DIR / "sync_payloads"))
+SYNC_PAYLOAD_RETENTION_DAYS = config("SYNC_PAYLOAD_RETENTION_DAYS", default=14, cast=int)
+# Pipeline de sincronização: threads por estágio e lotes em espera entre estágios
+SYNC_MAP_WORKERS = config("SYNC_MAP_WORKERS", default=2, cast=int)
+# Um único gravador mantém os lotes em ordem e numa transação por vez (ver
+# employees/pipeline.py); mais de um só para payloads sem chaves repetidas
+SYNC_WRITE_WORKERS = config("SYNC_WRITE_WORKERS", default=1, cast=int)
+SYNC_QUEUE_SIZE = config("SYNC_QUEUE_SIZE", default=4, cast=int)
+# Sincronizações pelo Celery maiores que uma parte são gravadas em partes de
+# SYNC_CHUNK_SIZE conforme a resposta chega (só uma parte fica em memória). Com
+# mais registros que o limite, as partes são processadas em paralelo pelos
+# workers; abaixo dele, na própria tarefa. 0 desliga
+SYNC_FANOUT_THRESHOLD = config("SYNC_FANOUT_THRESHOLD", default=50000, cast=int)
+SYNC_CHUNK_SIZE = config("SYNC_CHUNK_SIZE", default=10000, cast=int)
+SYNC_CHUNK_MAX_RETRIES = config("SYNC_CHUNK_MAX_RETRIES", default=3, cast=int)
+
 # --------------------------------------------------------------
 # Logging
 # --------------------------------------------------------------
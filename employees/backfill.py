@@ -0,0 +1,155 @@
+"""
+Carga histórica de absenteísmo.
+
+O SOC aceita no máximo ABSENCE_MAX_PERIOD_DAYS dias por consulta. Uma carga
+histórica divide o intervalo pedido em janelas desse tamanho, consulta várias
+janelas ao mesmo tempo (limitado pelo paralelismo da carga) e grava cada uma
+pelo mesmo caminho de upsert da sincronização comum. O estado de cada janela
+fica salvo, de modo que uma janela com erro pode ser reprocessada sozinha.
+"""
+import concurrent.futures
+import logging
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from api_config.models import ABSENCE_MAX_PERIOD_DAYS, BackfillJob, BackfillWindow
+from .services import APIService
+
+logger = logging.getLogger(__name__)
+
+
+def split_windows(start_date, end_date, max_days=ABSENCE_MAX_PERIOD_DAYS):
+    """Divide [start_date, end_date] em janelas consecutivas aceitas pelo SOC."""
+    windows = []
+    window_start = start_date
+    while window_start <= end_date:
+        window_end = min(window_start + timedelta(days=max_days), end_date)
+        windows.append((window_start, window_end))
+        window_start = window_end + timedelta(days=1)
+    return windows
+
+
+class BackfillService:
+    @staticmethod
+    def create_job(credentials, start_date, end_date, parallelism=None, user=None):
+        """Cria a carga histórica e suas janelas (ainda pendentes)."""
+        if end_date < start_date:
+            raise ValueError("A data de fim deve ser maior que a data de início.")
+        with transaction.atomic():
+            job = BackfillJob.objects.create(
+                client=credentials.client,
+                user=user or credentials.user,
+                credentials=credentials,
+                start_date=start_date,
+                end_date=end_date,
+                parallelism=parallelism or settings.BACKFILL_MAX_PARALLELISM,
+            )
+            BackfillWindow.objects.bulk_create([
+                BackfillWindow(job=job, start_date=window_start, end_date=window_end)
+                for window_start, window_end in split_windows(start_date, end_date)
+            ])
+        return job
+
+    @staticmethod
+    def run_job(job_id):
+        """
+        Processa todas as janelas ainda não concluídas com sucesso. Rodar de
+        novo uma carga interrompida ou com erros retoma de onde parou.
+        """
+        job = BackfillJob.objects.select_related("client", "user", "credentials").get(id=job_id)
+        windows = list(job.windows.exclude(status="success"))
+        job.status = "running"
+        job.finished_at = None
+        job.save(update_fields=["status", "finished_at"])
+
+        workers = max(1, min(job.parallelism, settings.BACKFILL_MAX_PARALLELISM, len(windows) or 1))
+        logger.info(f"Carga histórica {job.id}: {len(windows)} janelas, {workers} simultâneas")
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix=f"backfill-{job.id}"
+        ) as executor:
+            list(executor.map(partial(BackfillService._run_window_in_thread, job=job), windows))
+
+        return BackfillService._finalize_job(job)
+
+    @staticmethod
+    def retry_window(window_id):
+        """Reprocessa uma única janela e recalcula o status da carga."""
+        window = BackfillWindow.objects.select_related(
+            "job__client", "job__user", "job__credentials"
+        ).get(id=window_id)
+        BackfillService._run_window(window, window.job)
+        return BackfillService._finalize_job(window.job)
+
+    @staticmethod
+    def _run_window_in_thread(window, job):
+        try:
+            BackfillService._run_window(window, job)
+        finally:
+            # Cada thread abre a própria conexão com o banco; fechá-la aqui
+            # evita deixar conexões ociosas presas ao worker.
+            connections.close_all()
+
+    @staticmethod
+    def _run_window(window, job):
+        sync_log = APIService._get_or_create_log(
+            None, job.client, job.user, "absence", job.credentials.main_company
+        )
+        window.sync_log = sync_log
+        window.status = "running"
+        window.attempts += 1
+        window.error_message = None
+        window.started_at = timezone.now()
+        window.finished_at = None
+        window.save()
+
+        try:
+            result = APIService.sync_absence_period(
+                job.user, job.client, job.credentials, window.start_date, window.end_date, sync_log.id
+            )
+        except Exception as e:
+            logger.exception(f"Erro na janela {window} da carga histórica {job.id}")
+            result = {"success": False, "message": f"Erro na sincronização: {str(e)}"}
+
+        sync_log.refresh_from_db()
+        window.status = sync_log.status if result["success"] else "error"
+        window.records_processed = sync_log.records_processed
+        window.records_error = sync_log.records_error
+        window.error_message = None if window.status == "success" else result.get("message")
+        window.finished_at = timezone.now()
+        window.save()
+        return window
+
+    @staticmethod
+    def _finalize_job(job):
+        statuses = dict(job.windows.values_list("status").annotate(total=Count("id")))
+        total = sum(statuses.values())
+        succeeded = statuses.get("success", 0)
+
+        if succeeded == total:
+            job.status = "success"
+        elif succeeded or statuses.get("partial", 0):
+            job.status = "partial"
+        else:
+            job.status = "error"
+        job.finished_at = timezone.now()
+        job.save(update_fields=["status", "finished_at"])
+
+        records = job.windows.aggregate(processed=Sum("records_processed"), errors=Sum("records_error"))
+        msg = (
+            f"Carga histórica {job.id} concluída. Janelas: {succeeded}/{total} com sucesso, "
+            f"Registros: {records['processed'] or 0}, Erros: {records['errors'] or 0}"
+        )
+        logger.info(msg)
+        return {
+            "success": job.status != "error",
+            "message": msg,
+            "status": job.status,
+            "windows": total,
+            "windows_success": succeeded,
+            "windows_failed": total - succeeded,
+        }
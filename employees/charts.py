@@ -0,0 +1,136 @@
+"""
+Especificações dos gráficos do dashboard no formato que o Plotly.js recebe
+({"data": [...], "layout": {...}}), montadas direto das séries do
+DashboardData.
+
+Só entram os arrays de dados e as chaves de layout que a página usa: sem
+DataFrame, sem graph_objects (e a validação de cada atributo) e sem o
+template padrão do plotly.py, que sozinho ocupava a maior parte do JSON de
+cada gráfico. O JSON sai compacto e fica no cache do dashboard.
+"""
+import json
+
+DAYS_OFF_LABEL = "Dias Afastados"
+NUM_ATTESTADOS_LABEL = "Número de Atestados"
+
+# Paleta do template padrão do plotly.py, para as cores continuarem as mesmas
+COLORWAY = [
+    "#636efa", "#EF553B", "#00cc96", "#ab63fa", "#FFA15A",
+    "#19d3f3", "#FF6692", "#B6E880", "#FF97FF", "#FECB52",
+]
+BASE_LAYOUT = {"colorway": COLORWAY, "margin": {"t": 30, "r": 20}}
+
+UNIT_LABEL_LENGTH = 20
+CID_LABEL_LENGTH = 30
+
+
+def chart_json(spec):
+    """JSON compacto de uma especificação (null quando não há gráfico)."""
+    return json.dumps(spec, ensure_ascii=False, separators=(",", ":"))
+
+
+def _figure(traces, **layout):
+    return {"data": traces, "layout": {**BASE_LAYOUT, **layout}}
+
+
+def _grouped_bars(labels, items, first, second, horizontal=False):
+    """Duas barras agrupadas por rótulo, (campo, nome) em `first` e `second`."""
+    traces = []
+    for field, name in (first, second):
+        values = [item[field] for item in items]
+        trace = {"type": "bar", "name": name}
+        if horizontal:
+            trace.update(y=labels, x=values, orientation="h")
+        else:
+            trace.update(x=labels, y=values)
+        traces.append(trace)
+    return _figure(traces, barmode="group")
+
+
+def units_chart(data):
+    """Unidades com maior absenteísmo."""
+    if not data.units:
+        return None
+    labels = [item["unidade"][:UNIT_LABEL_LENGTH] for item in data.units]
+    return _grouped_bars(
+        labels, data.units,
+        ("total_days", DAYS_OFF_LABEL), ("total_absences", NUM_ATTESTADOS_LABEL), horizontal=True,
+    )
+
+
+def departments_chart(data):
+    """Setores com maior absenteísmo."""
+    if not data.departments:
+        return None
+    labels = [item["setor"] for item in data.departments]
+    return _grouped_bars(
+        labels, data.departments, ("total_days", DAYS_OFF_LABEL), ("total_absences", NUM_ATTESTADOS_LABEL),
+    )
+
+
+def cid_chart(data):
+    """Grupos patológicos (CID) com mais atestados."""
+    if not data.cids:
+        return None
+    labels = [item["grupo_patologico"][:CID_LABEL_LENGTH] for item in data.cids]
+    return _grouped_bars(
+        labels, data.cids,
+        ("total_absences", NUM_ATTESTADOS_LABEL), ("total_days", DAYS_OFF_LABEL), horizontal=True,
+    )
+
+
+def month_chart(data):
+    """Evolução mensal, com os atestados no eixo da direita."""
+    if len(data.months) <= 1:
+        return None
+    months = [item["month"].strftime("%m/%Y") for item in data.months]
+    return _figure(
+        [
+            {"type": "scatter", "mode": "lines+markers", "name": DAYS_OFF_LABEL,
+             "x": months, "y": [item["total_days"] for item in data.months]},
+            {"type": "scatter", "mode": "lines+markers", "name": NUM_ATTESTADOS_LABEL, "yaxis": "y2",
+             "x": months, "y": [item["total_absences"] for item in data.months]},
+        ],
+        yaxis2={"overlaying": "y", "side": "right"},
+    )
+
+
+def gender_chart(data):
+    """Distribuição dos atestados por gênero."""
+    if not data.genders:
+        return None
+    return _figure([{
+        "type": "pie",
+        "hole": 0.4,
+        "labels": [item["label"] for item in data.genders],
+        "values": [item["total_absences"] for item in data.genders],
+        "textposition": "inside",
+        "textinfo": "percent+label",
+    }])
+
+
+def cost_chart(data):
+    """Custo estimado por setor."""
+    if not data.costs:
+        return None
+    costs = [round(item["total_cost"], 2) for item in data.costs]
+    return _figure(
+        [{
+            "type": "bar",
+            "x": [item["setor"] for item in data.costs],
+            "y": costs,
+            "text": [f"R$ {cost:.2f}".replace(".", ",") for cost in costs],
+            "textposition": "auto",
+        }],
+        yaxis={"tickprefix": "R$ ", "tickformat": ",.2f"},
+    )
+
+
+CHARTS = {
+    "units": units_chart,
+    "departments": departments_chart,
+    "cid": cid_chart,
+    "month": month_chart,
+    "gender": gender_chart,
+    "cost": cost_chart,
+}
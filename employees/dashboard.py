@@ -0,0 +1,268 @@
+"""
+Agregação do dashboard de absenteísmo em uma passada.
+
+build_dashboard(client) faz duas consultas: a contagem do quadro de
+funcionários e a leitura de todas as linhas do resumo de absenteísmo do
+cliente (AbsenceRollup, uma por mês x unidade x setor x grupo x sexo). Os
+indicadores e todas as séries dos gráficos são calculados em Python a partir
+dessas linhas e ficam num DashboardData, usado pela view e pelos endpoints JSON.
+
+O resultado pronto (indicadores e gráficos serializados) fica no cache numa
+chave com o cliente, o período e a versão dos dados dele. A versão sobe
+sempre que uma sincronização grava dados do cliente (bump_dashboard_version):
+as entradas antigas deixam de ser lidas, sem que o dashboard mostre números
+velhos, e saem do cache pelo prazo de validade (DASHBOARD_CACHE_TTL, bem mais
+curto para os períodos escolhidos pelo usuário), sem depender da política de
+despejo do Redis.
+"""
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import Employee, AbsenceRollup
+
+# Parâmetros simplificados do cálculo de taxa e custo
+WORKING_DAYS_PER_MONTH = 22
+HOURS_PER_DAY = 8
+MIN_WAGE_BRAZIL = 1412.00
+AVG_WORK_HOURS_PER_MONTH = 176
+HOURLY_RATE = MIN_WAGE_BRAZIL / AVG_WORK_HOURS_PER_MONTH
+SAVINGS_RATES = (10, 20, 30)
+
+GENDER_LABELS = {1: 'Masculino', 2: 'Feminino', None: 'Não informado'}
+TOP_ITEMS = 10
+TOP_COST_SECTORS = 5
+TOP_CIDS_PER_GENDER = 5
+
+ROLLUP_COLUMNS = ('month', 'unidade', 'setor', 'grupo_patologico', 'sexo', 'absences_count', 'days_off')
+
+# Período exibido quando o usuário não escolhe datas
+DEFAULT_PERIOD_MONTHS = 3
+
+DASHBOARD_VERSION_KEY = "dashboard-version:{client_id}"
+DASHBOARD_CACHE_KEY = "dashboard:{client_id}:{version}:{name}"
+
+
+class DashboardData:
+    """
+    Indicadores e séries do dashboard de um cliente. As séries são listas de
+    dicts no mesmo formato dos antigos values().annotate() (total_absences,
+    total_days), para os gráficos continuarem montados da mesma forma.
+    """
+
+    def __init__(self, total_employees, rows, has_absences=None):
+        self.total_employees = total_employees
+        units = _Totals()
+        sectors = _Totals()
+        groups = _Totals()
+        months = _Totals()
+        genders = _Totals()
+        gender_groups = defaultdict(_Totals)
+
+        for month, unidade, setor, grupo, sexo, absences, days in rows:
+            units.add(unidade, absences, days)
+            sectors.add(setor, absences, days)
+            groups.add(grupo, absences, days)
+            months.add(month, absences, days)
+            genders.add(sexo, absences, days)
+            gender_groups[sexo].add(grupo, absences, days)
+
+        self.total_absences = sum(absences for absences, _ in genders.values())
+        self.total_days_off = sum(days for _, days in genders.values())
+        # Sem absenteísmo no período não é o mesmo que sem dados: vale o histórico todo
+        self.no_data = not total_employees or not (rows or has_absences)
+
+        # Taxa = dias afastados / (dias úteis * meses * funcionários)
+        self.months_analyzed = max(1, sum(1 for month in months if month is not None))
+        capacity = WORKING_DAYS_PER_MONTH * self.months_analyzed * total_employees
+        self.absenteeism_rate = self.total_days_off / capacity * 100 if capacity else 0
+        self.hourly_rate = HOURLY_RATE
+        self.total_hours_off = self.total_days_off * HOURS_PER_DAY
+        self.absenteeism_cost = self.total_hours_off * HOURLY_RATE
+        self.savings = {rate: self.absenteeism_cost * rate / 100 for rate in SAVINGS_RATES}
+
+        self.units = units.top('unidade', 'total_days', TOP_ITEMS)
+        self.departments = sectors.top('setor', 'total_days', TOP_ITEMS)
+        self.cids = groups.top('grupo_patologico', 'total_absences', TOP_ITEMS)
+        self.months = [
+            {'month': month, 'total_absences': absences, 'total_days': days}
+            for month, (absences, days) in sorted(item for item in months.items() if item[0] is not None)
+        ]
+        self.genders = [
+            {'sexo': sexo, 'label': GENDER_LABELS.get(sexo, 'Outro'),
+             'total_absences': absences, 'total_days': days}
+            for sexo, (absences, days) in genders.items()
+        ]
+        self.gender_top_cids = {}
+        for sexo, totals in gender_groups.items():
+            top_cids = totals.top('grupo_patologico', 'total_absences', TOP_CIDS_PER_GENDER)
+            if sexo is not None and top_cids:
+                self.gender_top_cids[GENDER_LABELS.get(sexo, 'Outro')] = [
+                    {'grupo_patologico': item['grupo_patologico'], 'count': item['total_absences']}
+                    for item in top_cids
+                ]
+        self.costs = [
+            dict(item, total_hours=item['total_days'] * HOURS_PER_DAY,
+                 total_cost=item['total_days'] * HOURS_PER_DAY * HOURLY_RATE)
+            for item in sectors.top('setor', 'total_days', TOP_COST_SECTORS)
+        ]
+
+    def as_dict(self):
+        """Versão serializável em JSON (datas em ISO, valores arredondados)."""
+        return {
+            'no_data': self.no_data,
+            'kpis': {
+                'total_employees': self.total_employees,
+                'total_absences': self.total_absences,
+                'total_days_off': self.total_days_off,
+                'months_analyzed': self.months_analyzed,
+                'absenteeism_rate': round(self.absenteeism_rate, 2),
+                'absenteeism_cost': round(self.absenteeism_cost, 2),
+                'total_hours_off': self.total_hours_off,
+                'hourly_rate': round(self.hourly_rate, 2),
+                'savings': {str(rate): round(value, 2) for rate, value in self.savings.items()},
+            },
+            'units': self.units,
+            'departments': self.departments,
+            'cids': self.cids,
+            'months': [dict(item, month=item['month'].isoformat()) for item in self.months],
+            'genders': self.genders,
+            'gender_top_cids': self.gender_top_cids,
+            'costs': [dict(item, total_cost=round(item['total_cost'], 2)) for item in self.costs],
+        }
+
+
+def build_dashboard(client, start=None, end=None):
+    """
+    Lê o quadro e o resumo de absenteísmo do cliente e monta o DashboardData.
+    `start`/`end` limitam o absenteísmo pelo mês de início (a granularidade
+    do resumo); sem eles, vale todo o histórico.
+    """
+    # Funcionários ausentes da última exportação do SOC ficam fora do quadro
+    total_employees = Employee.objects.filter(client=client, missing_since__isnull=True).count()
+    rollups = AbsenceRollup.objects.filter(client=client)
+    if start is not None:
+        rollups = rollups.filter(month__gte=start.replace(day=1))
+    if end is not None:
+        rollups = rollups.filter(month__lte=end.replace(day=1))
+    rows = list(rollups.values_list(*ROLLUP_COLUMNS))
+    has_absences = bool(rows) or AbsenceRollup.objects.filter(client=client).exists()
+    return DashboardData(total_employees, rows, has_absences)
+
+
+def dashboard_period(params):
+    """
+    (início, fim) pedidos em start_date/end_date, arredondados para meses
+    inteiros (a granularidade do resumo): o início vai para o dia 1 e o fim
+    para o último dia do mês. Aceita AAAA-MM (campo de mês da página) ou
+    AAAA-MM-DD; o que faltar ou for inválido cai nos últimos
+    DEFAULT_PERIOD_MONTHS meses até o mês atual.
+    """
+    default_start, default_end = _default_period()
+    start = _parse_month(params.get("start_date")) or default_start
+    end = _parse_month(params.get("end_date")) or default_end
+    return start.replace(day=1), _month_end(end)
+
+
+def period_key(start, end):
+    """Trecho da chave de cache de um período (mês a mês, como o resumo)."""
+    return f"{start:%Y-%m}:{end:%Y-%m}"
+
+
+def _default_period():
+    today = timezone.localdate()
+    month = today.month - DEFAULT_PERIOD_MONTHS
+    return today.replace(year=today.year + (month - 1) // 12, month=(month - 1) % 12 + 1, day=1), today
+
+
+def _month_end(day):
+    next_month = day.replace(day=28) + timedelta(days=4)
+    return next_month - timedelta(days=next_month.day)
+
+
+def _parse_month(value):
+    if value and len(value) == 7:
+        value += "-01"
+    try:
+        return date.fromisoformat(value) if value else None
+    except ValueError:
+        return None
+
+
+class _Totals(dict):
+    """chave -> [atestados, dias], acumulado linha a linha."""
+
+    def add(self, key, absences, days):
+        totals = self.get(key)
+        if totals is None:
+            self[key] = [absences, days]
+        else:
+            totals[0] += absences
+            totals[1] += days
+
+    def top(self, field, order_by, limit):
+        """Os `limit` maiores por `order_by`, sem as chaves vazias, como lista de dicts."""
+        items = [
+            {field: key, 'total_absences': absences, 'total_days': days}
+            for key, (absences, days) in self.items()
+            if key
+        ]
+        items.sort(key=lambda item: item[order_by], reverse=True)
+        return items[:limit]
+
+
+# ----------------------------
+# CACHE VERSIONADO POR CLIENTE
+# ----------------------------
+def dashboard_version(client_id):
+    """Versão atual dos dados do dashboard do cliente."""
+    key = DASHBOARD_VERSION_KEY.format(client_id=client_id)
+    version = cache.get(key)
+    if version is None:
+        # Começa num valor único: se a chave sair do cache, as entradas
+        # gravadas com a versão antiga não voltam a ser lidas
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_dashboard_version(client_id):
+    """Invalida o dashboard do cliente depois de uma gravação de dados."""
+    try:
+        cache.incr(DASHBOARD_VERSION_KEY.format(client_id=client_id))
+    except ValueError:
+        cache.add(DASHBOARD_VERSION_KEY.format(client_id=client_id), time.time_ns(), None)
+
+
+def cached_dashboard(client_id, name, build, timeout=None):
+    """
+    Valor `name` do dashboard do cliente na versão atual, calculado por
+    `build()` só quando ainda não está no cache, onde fica por `timeout`
+    segundos (padrão DASHBOARD_CACHE_TTL).
+    """
+    # A versão é lida antes do cálculo: se uma sincronização terminar no
+    # meio, o resultado fica na versão antiga e não é servido
+    key = DASHBOARD_CACHE_KEY.format(client_id=client_id, version=dashboard_version(client_id), name=name)
+    value = cache.get(key)
+    if value is None:
+        value = build()
+        cache.set(key, value, settings.DASHBOARD_CACHE_TTL if timeout is None else timeout)
+    return value
+
+
+def cached_period(client_id, name, start, end, build):
+    """
+    cached_dashboard para um período: a chave leva o período e a validade é
+    longa só para o período padrão; os escolhidos pelo usuário expiram logo,
+    para não acumularem no cache.
+    """
+    key = period_key(start, end)
+    if key == period_key(*_default_period()):
+        timeout = settings.DASHBOARD_CACHE_TTL
+    else:
+        timeout = settings.DASHBOARD_CUSTOM_PERIOD_CACHE_TTL
+    return cached_dashboard(client_id, f"{name}:{key}", build, timeout)
@@ -0,0 +1,271 @@
+"""
+Resolução dos funcionários referenciados pelos registros de absenteísmo.
+
+O índice é carregado uma vez por sincronização, numa única consulta
+(matrícula e código de todos os funcionários do cliente), e cada lote é
+resolvido em memória. As identidades que não existem no cliente viram
+funcionários genéricos, criados num único INSERT por lote antes de o lote
+seguir para a gravação dos absenteísmos. Nenhuma consulta é feita por registro.
+
+O código de um funcionário genérico é derivado do conteúdo do absenteísmo
+(matrícula ou, sem ela, todos os campos do registro): o mesmo absenteísmo
+aponta para o mesmo genérico em qualquer sincronização e em qualquer worker.
+Sem matrícula não há como saber que dois registros são da mesma pessoa, então
+cada absenteísmo distinto fica no seu próprio genérico, como antes da chave
+natural: dois registros nunca se sobrescrevem por terem caído no mesmo.
+"""
+import hashlib
+import logging
+import threading
+
+from django.db import connection, transaction
+
+from .mapping import ABSENCE_SCHEMA
+from .models import Employee, Absence
+from .dashboard import bump_dashboard_version
+from .rollups import refresh_absence_rollups
+
+logger = logging.getLogger(__name__)
+
+# Linhas lidas por vez ao carregar o índice
+INDEX_CHUNK_SIZE = 5000
+PLACEHOLDER_SITUACAO = "GENERICO"
+# "SEM_MAT_" + 12 dígitos hexadecimais = max_length do código (20)
+PLACEHOLDER_PREFIX = "SEM_MAT_"
+PLACEHOLDER_DIGEST_SIZE = 6
+# Campos do absenteísmo que identificam o genérico de um registro sem
+# matrícula: o registro inteiro
+ANONYMOUS_IDENTITY_FIELDS = tuple(spec.target for spec in ABSENCE_SCHEMA if spec.target != "matricula_func")
+
+
+def placeholder_code(absence):
+    """Código estável do funcionário genérico de um absenteísmo já mapeado."""
+    matricula = absence.get("matricula_func")
+    if matricula:
+        parts = ["matricula", matricula]
+    else:
+        parts = ["anonimo"] + [
+            "" if absence.get(field) is None else str(absence.get(field))
+            for field in ANONYMOUS_IDENTITY_FIELDS
+        ]
+    digest = hashlib.blake2b("\x1f".join(parts).encode("utf-8"), digest_size=PLACEHOLDER_DIGEST_SIZE)
+    return PLACEHOLDER_PREFIX + digest.hexdigest()
+
+
+def placeholder_employee(client_id, absence):
+    """Funcionário genérico para um absenteísmo sem funcionário correspondente."""
+    code = placeholder_code(absence)
+    matricula = absence.get("matricula_func") or ""
+    return Employee(
+        client_id=client_id,
+        codigo=code,
+        nome=f"Sem Matrícula ({matricula or code[len(PLACEHOLDER_PREFIX):]})",
+        matricula_funcionario=matricula,
+        situacao=PLACEHOLDER_SITUACAO,
+    )
+
+
+class EmployeeIndex:
+    """
+    Mapa em memória dos funcionários de um cliente.
+
+    `resolve(lote)` é chamado pelas threads de mapeamento do pipeline; o lock
+    garante que duas threads não criem o mesmo funcionário genérico nem
+    alterem o índice ao mesmo tempo.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.by_matricula = {}
+        self.by_codigo = {}
+        self._placeholders = set()
+        self._lock = threading.Lock()
+
+        rows = (
+            Employee.objects.filter(client=client)
+            .order_by("id")
+            .values_list("id", "codigo", "matricula_funcionario", "situacao")
+        )
+        for employee_id, codigo, matricula, situacao in rows.iterator(chunk_size=INDEX_CHUNK_SIZE):
+            self._add(employee_id, codigo, matricula, situacao == PLACEHOLDER_SITUACAO)
+
+    def _add(self, employee_id, codigo, matricula, placeholder=False):
+        self.by_codigo[codigo] = employee_id
+        if placeholder:
+            self._placeholders.add(employee_id)
+        if not matricula:
+            return
+        # Matrícula repetida no cliente: vale o primeiro funcionário real
+        current = self.by_matricula.get(matricula)
+        if current is None or (current in self._placeholders and not placeholder):
+            self.by_matricula[matricula] = employee_id
+
+    def _find(self, absence):
+        matricula = absence["matricula_func"]
+        if matricula:
+            return self.by_matricula.get(matricula)
+        return self.by_codigo.get(placeholder_code(absence))
+
+    def resolve(self, absences):
+        """
+        Retorna o id do funcionário de cada absenteísmo mapeado (None para os
+        registros inválidos), criando os genéricos que faltam.
+        """
+        with self._lock:
+            employee_ids = [None if absence is None else self._find(absence) for absence in absences]
+            pending = {}
+            for absence, employee_id in zip(absences, employee_ids):
+                if absence is not None and employee_id is None:
+                    placeholder = placeholder_employee(self.client.id, absence)
+                    pending.setdefault(placeholder.codigo, placeholder)
+            if not pending:
+                return employee_ids
+
+            self._create_placeholders(pending)
+            return [
+                employee_id if employee_id is not None or absence is None else self._find(absence)
+                for absence, employee_id in zip(absences, employee_ids)
+            ]
+
+    def _create_placeholders(self, pending):
+        logger.info(f"Criando {len(pending)} funcionários genéricos para absenteísmos sem matrícula conhecida")
+        # ignore_conflicts: o mesmo código pode ter sido criado por outro processo
+        Employee.objects.bulk_create(list(pending.values()), ignore_conflicts=True)
+        created = Employee.objects.filter(client=self.client, codigo__in=list(pending)).values_list("codigo", "id")
+        for code, employee_id in created:
+            self._add(employee_id, code, pending[code].matricula_funcionario, placeholder=True)
+
+
+# ----------------------------
+# LIMPEZA DOS GENÉRICOS DUPLICADOS
+# ----------------------------
+def merge_placeholder_employees(client_id=None, dry_run=False):
+    """
+    Junta os funcionários genéricos duplicados no genérico canônico da sua
+    identidade (ou no funcionário real com a mesma matrícula), move os
+    absenteísmos para ele e apaga os demais. Absenteísmos que passariam a
+    repetir a chave natural no destino são descartados, ficando o já existente
+    no destino ou o mais recente.
+
+    O mapeamento antigo -> destino é montado em Python a partir de uma
+    consulta; a troca é feita por poucos comandos SQL sobre uma tabela
+    temporária. Retorna os totais.
+    """
+    placeholders = Employee.objects.filter(situacao=PLACEHOLDER_SITUACAO)
+    absences = Absence.objects.filter(employee__situacao=PLACEHOLDER_SITUACAO)
+    if client_id is not None:
+        placeholders = placeholders.filter(client_id=client_id)
+        absences = absences.filter(client_id=client_id)
+
+    # Identidade de cada genérico, a partir do primeiro de seus absenteísmos
+    identities = {}
+    rows = absences.order_by("employee_id", "id").values_list(
+        "employee_id", "client_id", "matricula_func", *ANONYMOUS_IDENTITY_FIELDS
+    )
+    for employee_id, absence_client_id, matricula, *fields in rows.iterator(chunk_size=INDEX_CHUNK_SIZE):
+        if employee_id not in identities:
+            absence = dict(zip(ANONYMOUS_IDENTITY_FIELDS, fields), matricula_func=matricula)
+            identities[employee_id] = (absence_client_id, absence)
+
+    # Destino preferido: funcionário real com a mesma matrícula
+    matriculas = {absence["matricula_func"] for _, absence in identities.values() if absence["matricula_func"]}
+    real = {}
+    real_rows = (
+        Employee.objects.exclude(situacao=PLACEHOLDER_SITUACAO)
+        .filter(matricula_funcionario__in=matriculas)
+        .order_by("-id")
+        .values_list("client_id", "matricula_funcionario", "id")
+    )
+    for employee_client_id, matricula, employee_id in real_rows.iterator(chunk_size=INDEX_CHUNK_SIZE):
+        real[(employee_client_id, matricula)] = employee_id
+
+    # Senão, o genérico canônico (criado se ainda não existir)
+    canonical = {}
+    for absence_client_id, absence in identities.values():
+        if (absence_client_id, absence["matricula_func"]) not in real:
+            placeholder = placeholder_employee(absence_client_id, absence)
+            canonical.setdefault((absence_client_id, placeholder.codigo), placeholder)
+
+    summary = {"placeholders": len(identities), "created": 0, "merged": 0, "absences_dropped": 0, "orphans": 0}
+    with transaction.atomic():
+        existing = _canonical_ids(canonical)
+        missing = [placeholder for key, placeholder in canonical.items() if key not in existing]
+        summary["created"] = len(missing)
+        if missing and not dry_run:
+            Employee.objects.bulk_create(missing, ignore_conflicts=True)
+            existing = _canonical_ids(canonical)
+
+        mapping = []
+        for employee_id, (absence_client_id, absence) in identities.items():
+            target = real.get((absence_client_id, absence["matricula_func"]))
+            if target is None:
+                target = existing.get((absence_client_id, placeholder_code(absence)))
+            if target != employee_id:
+                mapping.append((employee_id, target))
+        summary["merged"] = len(mapping)
+
+        if dry_run:
+            summary["orphans"] = placeholders.filter(absences__isnull=True).count()
+            return summary
+
+        summary["absences_dropped"] = _repoint_absences(mapping)
+        _, deleted = placeholders.filter(absences__isnull=True).delete()
+        summary["orphans"] = deleted.get(Employee._meta.label, 0)
+
+    # Absenteísmos descartados mudam as contagens do resumo do dashboard e os
+    # genéricos apagados, o quadro de funcionários
+    for absence_client_id in {absence_client_id for absence_client_id, _ in identities.values()}:
+        if summary["absences_dropped"]:
+            refresh_absence_rollups(absence_client_id)
+        elif summary["merged"] or summary["orphans"]:
+            bump_dashboard_version(absence_client_id)
+    return summary
+
+
+def _canonical_ids(canonical):
+    codes = {code for _, code in canonical}
+    rows = Employee.objects.filter(codigo__in=codes).values_list("client_id", "codigo", "id")
+    return {(client_id, code): employee_id for client_id, code, employee_id in rows if (client_id, code) in canonical}
+
+
+def _repoint_absences(mapping):
+    """Move os absenteísmos dos genéricos antigos para o destino. Retorna quantos descartou."""
+    if not mapping:
+        return 0
+    absence_table = connection.ops.quote_name(Absence._meta.db_table)
+    employee_table = connection.ops.quote_name(Employee._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "CREATE TEMPORARY TABLE placeholder_merge (old_id bigint PRIMARY KEY, new_id bigint NOT NULL)"
+        )
+        try:
+            cursor.executemany("INSERT INTO placeholder_merge (old_id, new_id) VALUES (%s, %s)", mapping)
+
+            # Absenteísmos que colidiriam no destino: fica o que já estava no
+            # destino ou, entre os movidos, o de maior id
+            cursor.execute(f"""
+                DELETE FROM {absence_table} WHERE id IN (
+                    SELECT a.id FROM {absence_table} a
+                    JOIN placeholder_merge m ON m.old_id = a.employee_id
+                    WHERE EXISTS (
+                        SELECT 1 FROM {absence_table} b
+                        LEFT JOIN placeholder_merge mb ON mb.old_id = b.employee_id
+                        WHERE b.client_id = a.client_id
+                          AND b.dt_inicio_atestado = a.dt_inicio_atestado
+                          AND b.dt_fim_atestado = a.dt_fim_atestado
+                          AND COALESCE(mb.new_id, b.employee_id) = m.new_id
+                          AND (mb.old_id IS NULL OR b.id > a.id)
+                    )
+                )
+            """)
+            dropped = cursor.rowcount
+            cursor.execute(f"""
+                UPDATE {absence_table} SET employee_id = (
+                    SELECT new_id FROM placeholder_merge WHERE old_id = {absence_table}.employee_id
+                )
+                WHERE employee_id IN (SELECT old_id FROM placeholder_merge)
+            """)
+            cursor.execute(f"DELETE FROM {employee_table} WHERE id IN (SELECT old_id FROM placeholder_merge)")
+        finally:
+            cursor.execute("DROP TABLE placeholder_merge")
+    return dropped
@@ -0,0 +1,125 @@
+"""Geradores de payloads sintéticos do SOC usados pelos comandos de benchmark."""
+import random
+
+
+def build_employee_payload(total, seed=42, duplicate_ratio=0.0, malformed_ratio=0.0):
+    """
+    Gera registros no formato do exportadados do SOC. Uma fração
+    `duplicate_ratio` repete o CODIGO de um registro anterior e uma fração
+    `malformed_ratio` vem com campos inválidos (sem código, datas e números
+    fora do formato, textos maiores que as colunas).
+    """
+    rng = random.Random(seed)
+    records = []
+    for i in range(total):
+        records.append({
+            "CODIGOEMPRESA": "1001",
+            "NOMEEMPRESA": "EMPRESA BENCHMARK LTDA",
+            "CODIGO": str(100000 + i),
+            "NOME": f"FUNCIONARIO {i}",
+            "CODIGOUNIDADE": str(rng.randint(1, 30)),
+            "NOMEUNIDADE": f"UNIDADE {rng.randint(1, 30)}",
+            "CODIGOSETOR": str(rng.randint(1, 80)),
+            "NOMESETOR": f"SETOR {rng.randint(1, 80)}",
+            "CODIGOCARGO": str(rng.randint(1, 200)),
+            "NOMECARGO": f"CARGO {rng.randint(1, 200)}",
+            "MATRICULAFUNCIONARIO": f"M{i:07d}",
+            "CPF": f"{rng.randint(0, 99999999999):011d}",
+            "SITUACAO": rng.choice(["Ativo", "Inativo", "Afastado", "Férias"]),
+            "SEXO": str(rng.randint(1, 2)),
+            "ESTADOCIVIL": str(rng.randint(1, 5)),
+            "DATA_NASCIMENTO": f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/{rng.randint(1960, 2004)}",
+            "DATA_ADMISSAO": f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/{rng.randint(2000, 2024)}",
+            "DATAULTALTERACAO": f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/2024",
+            "CIDADE": "SAO PAULO",
+            "UF": "SP",
+            "EMAIL": f"funcionario{i}@example.com",
+        })
+    _add_noise(records, seed, duplicate_ratio, malformed_ratio, _duplicate_employee, _malform_employee)
+    return records
+
+
+def build_absence_payload(total, employees=1000, seed=42, duplicate_ratio=0.0, malformed_ratio=0.0):
+    """
+    Gera registros de absenteísmo para `employees` matrículas distintas.
+    `duplicate_ratio` e `malformed_ratio` como em build_employee_payload; as
+    duplicatas repetem a chave natural (matrícula e período) de um registro anterior.
+    """
+    rng = random.Random(seed)
+    groups = ["DOENCAS DO APARELHO RESPIRATORIO", "DOENCAS OSTEOMUSCULARES",
+              "TRANSTORNOS MENTAIS", "DOENCAS INFECCIOSAS", "LESOES"]
+    records = []
+    for i in range(total):
+        start_day = rng.randint(1, 20)
+        days = rng.randint(1, 8)
+        month = rng.randint(1, 12)
+        records.append({
+            "UNIDADE": f"UNIDADE {rng.randint(1, 30)}",
+            "SETOR": f"SETOR {rng.randint(1, 80)}",
+            "MATRICULA_FUNC": f"M{rng.randrange(employees):07d}",
+            "DT_NASCIMENTO": f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/{rng.randint(1960, 2004)}",
+            "SEXO": str(rng.randint(1, 2)),
+            "TIPO_ATESTADO": "1",
+            "DT_INICIO_ATESTADO": f"{start_day:02d}/{month:02d}/2024",
+            "DT_FIM_ATESTADO": f"{start_day + days - 1:02d}/{month:02d}/2024",
+            "HORA_INICIO_ATESTADO": "",
+            "HORA_FIM_ATESTADO": "",
+            "DIAS_AFASTADOS": str(days),
+            "HORAS_AFASTADO": "",
+            "CID_PRINCIPAL": f"J{rng.randint(0, 99):02d}",
+            "DESCRICAO_CID": "DESCRICAO DO CID",
+            "GRUPO_PATOLOGICO": rng.choice(groups),
+            "TIPO_LICENCA": "Atestado Médico",
+        })
+    _add_noise(records, seed, duplicate_ratio, malformed_ratio, _duplicate_absence, _malform_absence)
+    return records
+
+
+def _add_noise(records, seed, duplicate_ratio, malformed_ratio, duplicate, malform):
+    """Troca registros por duplicatas e estraga outros, sem mudar a sequência dos limpos."""
+    if not duplicate_ratio and not malformed_ratio:
+        return
+    rng = random.Random(seed + 1)
+    for i in range(len(records)):
+        draw = rng.random()
+        if i and draw < duplicate_ratio:
+            records[i] = duplicate(records[rng.randrange(i)], records[i])
+        elif draw < duplicate_ratio + malformed_ratio:
+            malform(records[i], rng)
+
+
+def _duplicate_employee(original, current):
+    # Mesmo funcionário reenviado com outra alteração
+    return dict(original, NOME=original["NOME"] + " (REPETIDO)", DATAULTALTERACAO=current["DATAULTALTERACAO"])
+
+
+def _duplicate_absence(original, current):
+    return dict(original, CID_PRINCIPAL=current["CID_PRINCIPAL"])
+
+
+def _malform_employee(record, rng):
+    choice = rng.randrange(4)
+    if choice == 0:
+        record["CODIGO"] = ""
+    elif choice == 1:
+        record["DATA_NASCIMENTO"] = rng.choice(["31/02/1980", "1980-13-01", "??/??/????"])
+        record["DATAULTALTERACAO"] = ""
+    elif choice == 2:
+        record["SEXO"] = rng.choice(["M", "", None])
+        record["ESTADOCIVIL"] = "CASADO"
+    else:
+        record["NOME"] = "NOME MUITO LONGO " * 20
+        record["NOMESETOR"] = "SETOR Ç" * 60
+
+
+def _malform_absence(record, rng):
+    choice = rng.randrange(4)
+    if choice == 0:
+        record["DT_INICIO_ATESTADO"] = rng.choice(["", "00/00/0000", "2024-01-01"])
+    elif choice == 1:
+        record["DIAS_AFASTADOS"] = rng.choice(["", "dois", "1,5"])
+    elif choice == 2:
+        record["MATRICULA_FUNC"] = ""
+    else:
+        record["DESCRICAO_CID"] = "DESCRIÇÃO " * 100
+        record["SEXO"] = None
@@ -0,0 +1,119 @@
+"""
+Servidor HTTP local que imita o exportadados do SOC nos benchmarks.
+
+Responde ao GET com `?parametro=<json>` como o serviço real: corpo JSON em
+latin-1, escolhido pelo "codigo" dos parâmetros (códigos desconhecidos
+recebem {"Error": ...}). O corpo pode sair em blocos com
+Transfer-Encoding: chunked e uma pausa entre os blocos, para simular
+respostas lentas. Também usado nos testes do SOCClient: responde com os
+status de `failures` antes do corpo, comprime com gzip quando o cliente
+aceita e guarda os cabeçalhos e a porta de origem de cada pedido.
+"""
+import gzip
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+INVALID_KEY_BODY = json.dumps({"Error": "Chave invalida"}).encode("latin-1")
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Cliente que desistiu no meio (timeout nos testes) não é erro do stub
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class SOCStubServer:
+    """
+    `payloads` mapeia o código da credencial para a lista de registros. Use
+    como context manager; a URL fica em `url` enquanto o servidor está no ar.
+    """
+
+    def __init__(self, payloads, chunk_size=64 * 1024, delay=0.0, chunked=True, failures=(), compress=False):
+        # Os corpos são codificados uma vez, fora da medição
+        self.bodies = {
+            code: json.dumps(records, ensure_ascii=False).encode("latin-1", errors="replace")
+            for code, records in payloads.items()
+        }
+        self.chunk_size = chunk_size
+        self.delay = delay
+        self.chunked = chunked
+        self.failures = list(failures)
+        self.compress = compress
+        self.requests = 0
+        # (cabeçalhos, porta do cliente) de cada pedido recebido
+        self.received = []
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/WebSoc/exportadados"
+
+    def __enter__(self):
+        self._server = _Server(("127.0.0.1", 0), self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, name="soc-stub", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                stub.requests += 1
+                stub.received.append((dict(self.headers), self.client_address[1]))
+                if stub.failures:
+                    self.send_response(stub.failures.pop(0))
+                    self.send_header("Retry-After", "0")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                try:
+                    params = json.loads(parse_qs(urlparse(self.path).query)["parametro"][0])
+                except (KeyError, ValueError):
+                    params = {}
+                body = stub.bodies.get(params.get("codigo"), INVALID_KEY_BODY)
+                compress = stub.compress and "gzip" in self.headers.get("Accept-Encoding", "")
+                if compress:
+                    body = gzip.compress(body)
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json;charset=ISO-8859-1")
+                if compress:
+                    self.send_header("Content-Encoding", "gzip")
+                if stub.chunked:
+                    self.send_header("Transfer-Encoding", "chunked")
+                else:
+                    self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+
+                for start in range(0, len(body), stub.chunk_size):
+                    if stub.delay:
+                        time.sleep(stub.delay)
+                    block = body[start:start + stub.chunk_size]
+                    if stub.chunked:
+                        self.wfile.write(b"%x\r\n%s\r\n" % (len(block), block))
+                    else:
+                        self.wfile.write(block)
+                if stub.chunked:
+                    self.wfile.write(b"0\r\n\r\n")
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,59 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api_config.models import AbsenceCredentials, BackfillJob, BackfillWindow
+from employees.backfill import BackfillService
+from employees.tasks import run_backfill_job_task, retry_backfill_window_task
+
+
+class Command(BaseCommand):
+    help = 'Carrega o histórico de absenteísmo de um período longo em janelas aceitas pelo SOC'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--credentials', type=int, help='ID da credencial de absenteísmo')
+        parser.add_argument('--start', type=date.fromisoformat, help='Data início (AAAA-MM-DD)')
+        parser.add_argument('--end', type=date.fromisoformat, help='Data fim (AAAA-MM-DD)')
+        parser.add_argument('--parallelism', type=int, help='Janelas consultadas ao mesmo tempo')
+        parser.add_argument('--job', type=int, help='Retoma uma carga existente (só janelas pendentes/com erro)')
+        parser.add_argument('--window', type=int, help='Reprocessa apenas esta janela')
+        parser.add_argument('--async', dest='run_async', action='store_true', help='Enfileira no Celery')
+
+    def handle(self, *args, **options):
+        if options['window']:
+            if not BackfillWindow.objects.filter(id=options['window']).exists():
+                raise CommandError(f"Janela {options['window']} não encontrada")
+            self._run(retry_backfill_window_task, BackfillService.retry_window, options['window'], options)
+            return
+
+        if options['job']:
+            job = BackfillJob.objects.filter(id=options['job']).first()
+            if not job:
+                raise CommandError(f"Carga histórica {options['job']} não encontrada")
+        else:
+            if not (options['credentials'] and options['start'] and options['end']):
+                raise CommandError('Informe --credentials, --start e --end (ou --job para retomar)')
+            credentials = AbsenceCredentials.objects.filter(id=options['credentials']).first()
+            if not credentials:
+                raise CommandError(f"Credencial {options['credentials']} não encontrada")
+            try:
+                job = BackfillService.create_job(
+                    credentials, options['start'], options['end'], options['parallelism']
+                )
+            except ValueError as e:
+                raise CommandError(str(e))
+            self.stdout.write(f"Carga histórica {job.id} criada com {job.windows.count()} janelas")
+
+        self._run(run_backfill_job_task, BackfillService.run_job, job.id, options)
+
+    def _run(self, task, func, object_id, options):
+        if options['run_async']:
+            result = task.delay(object_id)
+            if task is run_backfill_job_task:
+                BackfillJob.objects.filter(id=object_id).update(task_id=result.id)
+            self.stdout.write(self.style.SUCCESS(f"Tarefa enfileirada: {result.id}"))
+            return
+
+        result = func(object_id)
+        style = self.style.SUCCESS if result['status'] == 'success' else self.style.WARNING
+        self.stdout.write(style(result['message']))
@@ -0,0 +1,177 @@
+import datetime
+import json
+import random
+import time
+
+import pandas as pd
+import plotly
+import plotly.express as px
+import plotly.graph_objects as go
+from django.core.management.base import BaseCommand, CommandError
+
+from clients.models import Client
+from employees.charts import CHARTS, DAYS_OFF_LABEL, NUM_ATTESTADOS_LABEL, chart_json
+from employees.dashboard import DashboardData, build_dashboard
+
+
+class Command(BaseCommand):
+    help = 'Compara o custo de montar os gráficos do dashboard com plotly.py e com employees.charts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200, help='Renderizações de cada gráfico')
+        parser.add_argument('--client', type=int, help='Usa o resumo de absenteísmo deste cliente')
+        parser.add_argument('--groups', type=int, default=5000,
+                            help='Linhas sintéticas do resumo (sem --client)')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        if options['client']:
+            try:
+                client = Client.objects.get(id=options['client'])
+            except Client.DoesNotExist:
+                raise CommandError(f"Cliente {options['client']} não encontrado")
+            data = build_dashboard(client)
+            source = f"cliente {client.id} ({client.name})"
+        else:
+            data = DashboardData(1000, _synthetic_rows(options['groups'], options['seed']))
+            source = f"{options['groups']} linhas sintéticas"
+
+        iterations = options['iterations']
+        self.stdout.write(f"Dados: {source} | {iterations} renderizações por gráfico (tempo de CPU)")
+        self.stdout.write(f"{'Gráfico':<12} {'plotly.py':>11} {'charts':>9} {'ganho':>7} {'bytes antes':>12} {'depois':>8}")
+
+        totals = [0.0, 0.0, 0, 0]
+        for name, build in CHARTS.items():
+            reference = PLOTLY_CHARTS[name]
+            before = reference(data)
+            if before is None:
+                self.stdout.write(f"{name:<12} sem dados")
+                continue
+            after = chart_json(build(data))
+
+            plotly_cpu = _cpu_per_call(lambda: reference(data), iterations)
+            compact_cpu = _cpu_per_call(lambda: chart_json(build(data)), iterations)
+            before_size, after_size = len(before.encode()), len(after.encode())
+            for i, value in enumerate((plotly_cpu, compact_cpu, before_size, after_size)):
+                totals[i] += value
+            self.stdout.write(
+                f"{name:<12} {plotly_cpu * 1000:>9.3f}ms {compact_cpu * 1000:>7.3f}ms "
+                f"{plotly_cpu / compact_cpu:>6.0f}x {before_size:>12,} {after_size:>8,}"
+            )
+
+        if totals[1]:
+            self.stdout.write(self.style.SUCCESS(
+                f"{'total':<12} {totals[0] * 1000:>9.3f}ms {totals[1] * 1000:>7.3f}ms "
+                f"{totals[0] / totals[1]:>6.0f}x {totals[2]:>12,} {totals[3]:>8,}"
+            ))
+
+
+def _cpu_per_call(run, iterations):
+    """Tempo de CPU médio de `run()`, depois de uma chamada de aquecimento."""
+    run()
+    started = time.process_time()
+    for _ in range(iterations):
+        run()
+    return (time.process_time() - started) / iterations
+
+
+def _synthetic_rows(total, seed):
+    """Linhas no formato de ROLLUP_COLUMNS, espalhadas por 24 meses."""
+    rng = random.Random(seed)
+    first_month = datetime.date(2024, 1, 1)
+    rows = []
+    for _ in range(total):
+        offset = rng.randint(0, 23)
+        month = first_month.replace(year=first_month.year + offset // 12, month=offset % 12 + 1)
+        rows.append((
+            month,
+            f"UNIDADE {rng.randint(1, 30)}",
+            f"SETOR {rng.randint(1, 80)}",
+            f"GRUPO PATOLOGICO {rng.randint(1, 40)}",
+            rng.choice((1, 2, None)),
+            rng.randint(1, 5),
+            rng.randint(1, 30),
+        ))
+    return rows
+
+
+# Montagem anterior dos gráficos (DataFrame + graph_objects + PlotlyJSONEncoder),
+# mantida aqui só como referência da medição
+def _plotly_units_chart(data):
+    if not data.units:
+        return None
+    df = pd.DataFrame(data.units)
+    df['unidade'] = df['unidade'].str.slice(0, 20)
+    fig = go.Figure()
+    fig.add_trace(go.Bar(y=df['unidade'], x=df['total_days'], name=DAYS_OFF_LABEL, orientation='h'))
+    fig.add_trace(go.Bar(y=df['unidade'], x=df['total_absences'], name=NUM_ATTESTADOS_LABEL, orientation='h'))
+    fig.update_layout(barmode='group')
+    return json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
+
+
+def _plotly_departments_chart(data):
+    if not data.departments:
+        return None
+    df = pd.DataFrame(data.departments)
+    fig = go.Figure()
+    fig.add_trace(go.Bar(x=df['setor'], y=df['total_days'], name=DAYS_OFF_LABEL))
+    fig.add_trace(go.Bar(x=df['setor'], y=df['total_absences'], name=NUM_ATTESTADOS_LABEL))
+    fig.update_layout(barmode='group')
+    return json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
+
+
+def _plotly_cid_chart(data):
+    if not data.cids:
+        return None
+    df = pd.DataFrame(data.cids)
+    df['grupo_patologico'] = df['grupo_patologico'].str.slice(0, 30)
+    fig = go.Figure()
+    fig.add_trace(go.Bar(y=df['grupo_patologico'], x=df['total_absences'], name=NUM_ATTESTADOS_LABEL,
+                         orientation='h'))
+    fig.add_trace(go.Bar(y=df['grupo_patologico'], x=df['total_days'], name=DAYS_OFF_LABEL, orientation='h'))
+    fig.update_layout(barmode='group')
+    return json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
+
+
+def _plotly_month_chart(data):
+    if len(data.months) <= 1:
+        return None
+    df = pd.DataFrame(data.months)
+    df['month_str'] = df['month'].apply(lambda x: x.strftime('%m/%Y'))
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=df['month_str'], y=df['total_days'], name=DAYS_OFF_LABEL, mode='lines+markers'))
+    fig.add_trace(go.Scatter(x=df['month_str'], y=df['total_absences'], name=NUM_ATTESTADOS_LABEL,
+                             mode='lines+markers', yaxis='y2'))
+    fig.update_layout(yaxis2=dict(overlaying='y', side='right'))
+    return json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
+
+
+def _plotly_gender_chart(data):
+    if not data.genders:
+        return None
+    df = pd.DataFrame(data.genders)
+    fig = px.pie(df, values='total_absences', names='label', hole=0.4)
+    fig.update_traces(textposition='inside', textinfo='percent+label')
+    return json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
+
+
+def _plotly_cost_chart(data):
+    if not data.costs:
+        return None
+    df = pd.DataFrame(data.costs)
+    fig = go.Figure(go.Bar(
+        x=df['setor'], y=df['total_cost'],
+        text=df['total_cost'].apply(lambda x: f'R$ {x:.2f}'.replace('.', ',')), textposition='auto',
+    ))
+    fig.update_layout(yaxis=dict(tickprefix='R$ ', tickformat=',.2f'))
+    return json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
+
+
+PLOTLY_CHARTS = {
+    'units': _plotly_units_chart,
+    'departments': _plotly_departments_chart,
+    'cid': _plotly_cid_chart,
+    'month': _plotly_month_chart,
+    'gender': _plotly_gender_chart,
+    'cost': _plotly_cost_chart,
+}
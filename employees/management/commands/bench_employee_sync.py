@@ -0,0 +1,82 @@
+import concurrent.futures
+import logging
+import time
+from functools import partial
+
+from django.core.management.base import BaseCommand
+
+from clients.models import Client
+from employees.mapping import map_employee
+from employees.models import Employee
+from employees.services import APIService, EMPLOYEE_BATCH_SIZE
+from ._payloads import build_employee_payload
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Compara o upsert em lotes de funcionários com o caminho registro a registro'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--records', type=int, default=5000, help='Quantidade de funcionários gerados')
+        parser.add_argument('--workers', type=int, default=10, help='Threads do caminho registro a registro')
+
+    def handle(self, *args, **options):
+        total = options['records']
+        records = build_employee_payload(total)
+
+        legacy_client = Client.objects.create(name='Benchmark (legado)', subdomain=f'bench-legacy-{time.time_ns()}')
+        bulk_client = Client.objects.create(name='Benchmark (lote)', subdomain=f'bench-bulk-{time.time_ns()}')
+        try:
+            # Primeira passada insere tudo, a segunda altera todos os nomes e a
+            # terceira reenvia os mesmos dados (o caminho em lote não grava nada)
+            for label in ('insert', 'update', 'unchanged'):
+                if label == 'update':
+                    for record in records:
+                        record['NOME'] += ' (ALTERADO)'
+                legacy = self._run_legacy(records, legacy_client, options['workers'])
+                bulk = self._run_bulk(records, bulk_client)
+                self.stdout.write(
+                    f"[{label}] registro a registro: {legacy:.2f}s ({total / legacy:.0f} reg/s) | "
+                    f"lote de {EMPLOYEE_BATCH_SIZE}: {bulk:.2f}s ({total / bulk:.0f} reg/s) | "
+                    f"ganho: {legacy / bulk:.1f}x"
+                )
+            self.stdout.write(self.style.SUCCESS(
+                f"Funcionários gravados: legado={Employee.objects.filter(client=legacy_client).count()} "
+                f"lote={Employee.objects.filter(client=bulk_client).count()}"
+            ))
+        finally:
+            legacy_client.delete()
+            bulk_client.delete()
+
+    def _run_legacy(self, records, client, workers):
+        func = partial(_process_single_employee, client=client)
+        started = time.perf_counter()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(func, records))
+        return time.perf_counter() - started
+
+    def _run_bulk(self, records, client):
+        started = time.perf_counter()
+        digests = APIService._load_employee_digests(client)
+        for start in range(0, len(records), EMPLOYEE_BATCH_SIZE):
+            _, pending = APIService._prepare_employee_batch(records[start:start + EMPLOYEE_BATCH_SIZE], digests)
+            _, saved = APIService._write_employee_batch(pending, client)
+            digests.update(saved)
+        return time.perf_counter() - started
+
+
+# Caminho anterior (update_or_create por registro, em threads), mantido aqui
+# só como referência da medição
+def _process_single_employee(employee_data, client):
+    if not employee_data.get('CODIGO'):
+        logger.warning(f"Funcionário sem código, ignorando: {employee_data}")
+        return False
+
+    employee_dict = map_employee(employee_data)
+    try:
+        Employee.objects.update_or_create(client=client, codigo=employee_dict['codigo'], defaults=employee_dict)
+        return True
+    except Exception as e:
+        logger.error(f"Erro ao processar funcionário: {e}")
+        return False
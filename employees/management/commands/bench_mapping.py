@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from employees import mapping
+from employees.mapping import map_employee, map_absence
+from ._payloads import build_employee_payload, build_absence_payload
+
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = 'Mede quantos registros do SOC por segundo o mapeamento compilado converte'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--records', type=int, default=50000, help='Quantidade de registros gerados')
+        parser.add_argument('--rounds', type=int, default=3, help='Repetições (vale a melhor)')
+
+    def handle(self, *args, **options):
+        total = options['records']
+        employees = build_employee_payload(total)
+        absences = build_absence_payload(total)
+
+        self._report('funcionários', employees, lambda batch: [map_employee(r) for r in batch], options['rounds'])
+        self._report('absenteísmo', absences, lambda batch: [map_absence(r, None) for r in batch], options['rounds'])
+
+    def _report(self, label, records, map_batch, rounds):
+        total = len(records)
+
+        def run():
+            # Cada rodada começa com o cache de datas vazio, como um worker novo
+            mapping._DATE_CACHE.clear()
+            started = time.perf_counter()
+            for start in range(0, total, BATCH_SIZE):
+                map_batch(records[start:start + BATCH_SIZE])
+            return time.perf_counter() - started
+
+        best = min(run() for _ in range(rounds))
+        self.stdout.write(f"{label}: {total / best:,.0f} registros/s ({best * 1e6 / total:.1f} µs/registro)")
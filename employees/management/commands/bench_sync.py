@@ -0,0 +1,184 @@
+import datetime
+import os
+import resource
+import threading
+import time
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.backends.signals import connection_created
+
+from accounts.models import User
+from api_config.models import EmployeeCredentials, AbsenceCredentials, SyncLog
+from clients.models import Client
+from employees import soc_client
+from employees.payload_store import delete_payload
+from employees.services import APIService
+from employees.soc_client import SOCClient
+from ._payloads import build_employee_payload, build_absence_payload
+from ._soc_stub import SOCStubServer
+
+EMPLOYEE_CODE = 'bench-funcionarios'
+ABSENCE_CODE = 'bench-absenteismo'
+# Intervalo entre as leituras do RSS durante uma sincronização
+RSS_SAMPLE_SECONDS = 0.02
+
+
+class Command(BaseCommand):
+    help = 'Mede a sincronização de ponta a ponta contra um exportadados simulado localmente'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--employees', type=int, default=20000, help='Funcionários no payload')
+        parser.add_argument('--absences', type=int, default=20000, help='Absenteísmos no payload')
+        parser.add_argument('--duplicates', type=float, default=0.0, help='Fração de registros repetidos')
+        parser.add_argument('--malformed', type=float, default=0.0, help='Fração de registros com campos inválidos')
+        parser.add_argument('--chunk-size', type=int, default=64 * 1024, help='Bytes por bloco da resposta')
+        parser.add_argument('--delay', type=float, default=0.0, help='Pausa (s) antes de cada bloco da resposta')
+        parser.add_argument('--content-length', action='store_true',
+                            help='Responde com Content-Length em vez de Transfer-Encoding: chunked')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        noise = {'duplicate_ratio': options['duplicates'], 'malformed_ratio': options['malformed']}
+        payloads = {
+            EMPLOYEE_CODE: build_employee_payload(options['employees'], seed=options['seed'], **noise),
+            ABSENCE_CODE: build_absence_payload(
+                options['absences'], employees=max(1, options['employees']), seed=options['seed'], **noise
+            ),
+        }
+        stub = SOCStubServer(
+            payloads, chunk_size=options['chunk_size'], delay=options['delay'],
+            chunked=not options['content_length'],
+        )
+        self.stdout.write(
+            f"Payload: {options['employees']} funcionários, {options['absences']} absenteísmos "
+            f"({options['duplicates']:.0%} repetidos, {options['malformed']:.0%} inválidos) | "
+            f"blocos de {options['chunk_size']} bytes, pausa {options['delay']}s, "
+            f"{'Content-Length' if options['content_length'] else 'chunked'}"
+        )
+
+        client = Client.objects.create(name='Benchmark (sync)', subdomain=f'bench-sync-{time.time_ns()}')
+        user = User.objects.create_user(
+            f'bench-sync-{time.time_ns()}@example.com', 'Benchmark', 'Benchmark', client=client
+        )
+        # Todas as situações: exportação completa, com a reconciliação do quadro
+        EmployeeCredentials.objects.create(
+            client=client, user=user, company='1001', code=EMPLOYEE_CODE, key='bench', sync_interval_minutes=0,
+            is_active=True, is_inactive=True, is_away=True, is_pending=True, is_vacation=True,
+        )
+        AbsenceCredentials.objects.create(
+            client=client, user=user, main_company='1001', work_company='1001', code=ABSENCE_CODE, key='bench',
+            start_date=datetime.date(2024, 1, 1), end_date=datetime.date(2024, 1, 30), sync_interval_minutes=0,
+        )
+
+        previous_client = soc_client._default_client
+        try:
+            with stub:
+                soc_client._default_client = SOCClient(base_url=stub.url, max_retries=0)
+                # Absenteísmos depois dos funcionários, para as matrículas já existirem
+                runs = [
+                    ('funcionários', 'carga inicial', lambda: APIService.sync_employees(user, client, full=True)),
+                    ('funcionários', 'reenvio', lambda: APIService.sync_employees(user, client, full=True)),
+                    ('absenteísmo', 'carga inicial', lambda: APIService.sync_absences(user, client)),
+                    ('absenteísmo', 'reenvio', lambda: APIService.sync_absences(user, client)),
+                ]
+                for label, mode, run in runs:
+                    self._report(f"{label}/{mode}", run)
+        finally:
+            soc_client._default_client = previous_client
+            for sync_log in SyncLog.objects.filter(client=client):
+                delete_payload(sync_log)
+            client.delete()
+
+    def _report(self, label, run):
+        queries = QueryCounter()
+        rss = RSSSampler()
+        started = time.perf_counter()
+        with queries, rss:
+            result = run()
+        elapsed = time.perf_counter() - started
+
+        total = result.get('total') or 0
+        stages = ', '.join(f"{stage} {queries.counts[stage]}" for stage in QueryCounter.STAGES)
+        line = (
+            f"[{label}] {total} registros em {elapsed:.2f}s ({total / elapsed:,.0f} reg/s) | "
+            f"pico RSS {rss.peak / 2**20:.0f} MB (+{(rss.peak - rss.baseline) / 2**20:.0f} MB) | "
+            f"consultas: {stages}"
+        )
+        if result.get('success'):
+            self.stdout.write(f"{line} | sucesso {result.get('success_count', total)}, "
+                              f"erros {result.get('error_count', 0)}")
+        else:
+            self.stdout.write(self.style.ERROR(f"{line} | {result.get('message')}"))
+
+
+class QueryCounter:
+    """
+    Conta as consultas ao banco por estágio do pipeline, pelo nome da thread
+    que as executa (ver StagedPipeline). Vale para a conexão da thread atual e
+    para as abertas pelas threads do pipeline enquanto o contador está ativo.
+    """
+
+    STAGES = ('leitura', 'mapeamento', 'gravação')
+
+    def __init__(self):
+        self.counts = Counter()
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        name = threading.current_thread().name
+        if '-map-' in name:
+            stage = 'mapeamento'
+        elif '-write-' in name:
+            stage = 'gravação'
+        else:
+            stage = 'leitura'
+        with self._lock:
+            self.counts[stage] += 1
+        return execute(sql, params, many, context)
+
+    def _attach(self, sender, connection, **kwargs):
+        connection.execute_wrappers.append(self)
+
+    def __enter__(self):
+        connection.execute_wrappers.append(self)
+        connection_created.connect(self._attach)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        connection_created.disconnect(self._attach)
+        connection.execute_wrappers.remove(self)
+
+
+class RSSSampler:
+    """
+    Maior RSS do processo durante o bloco, lido de /proc/self/statm por uma
+    thread. Sem /proc, usa o ru_maxrss (máximo desde o início do processo).
+    """
+
+    def __init__(self):
+        self.baseline = self.peak = self._read()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, name='rss-sampler', daemon=True)
+
+    @staticmethod
+    def _read():
+        try:
+            with open('/proc/self/statm') as statm:
+                return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except OSError:
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+    def _sample(self):
+        while not self._stop.wait(RSS_SAMPLE_SECONDS):
+            self.peak = max(self.peak, self._read())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self._read())
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from clients.models import Client
+from employees.identity import merge_placeholder_employees
+
+
+class Command(BaseCommand):
+    help = 'Junta os funcionários genéricos (sem matrícula) duplicados e move seus absenteísmos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--client', type=int, help='Limita a limpeza a um cliente')
+        parser.add_argument('--dry-run', action='store_true', help='Apenas mostra o que seria feito')
+
+    def handle(self, *args, **options):
+        if options['client'] and not Client.objects.filter(id=options['client']).exists():
+            raise CommandError(f"Cliente {options['client']} não encontrado")
+
+        summary = merge_placeholder_employees(options['client'], dry_run=options['dry_run'])
+        prefix = '[simulação] ' if options['dry_run'] else ''
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}Genéricos com absenteísmos: {summary['placeholders']}, "
+            f"Canônicos criados: {summary['created']}, Juntados: {summary['merged']}, "
+            f"Absenteísmos duplicados descartados: {summary['absences_dropped']}, "
+            f"Genéricos sem absenteísmo apagados: {summary['orphans']}"
+        ))
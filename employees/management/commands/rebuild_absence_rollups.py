@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from clients.models import Client
+from employees.rollups import refresh_absence_rollups
+
+
+class Command(BaseCommand):
+    help = 'Recalcula por inteiro o resumo de absenteísmo usado pelo dashboard'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--client', type=int, help='Limita o recálculo a um cliente')
+
+    def handle(self, *args, **options):
+        clients = Client.objects.order_by('id')
+        if options['client']:
+            clients = clients.filter(id=options['client'])
+            if not clients.exists():
+                raise CommandError(f"Cliente {options['client']} não encontrado")
+
+        for client in clients:
+            groups = refresh_absence_rollups(client.id)
+            self.stdout.write(f"{client}: {groups} grupos")
+        self.stdout.write(self.style.SUCCESS('Resumo de absenteísmo recalculado'))
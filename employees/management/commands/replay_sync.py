@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api_config.models import SyncLog
+from clients.models import Client
+from employees.payload_store import payload_path, prune_payloads
+from employees.services import APIService
+
+
+class Command(BaseCommand):
+    help = 'Reprocessa a resposta gravada de uma sincronização, sem chamar o SOC'
+
+    def add_arguments(self, parser):
+        parser.add_argument('sync_log_id', nargs='?', type=int, help='ID do SyncLog de origem')
+        parser.add_argument('--client', type=int, help='Reprocessa em outro cliente (ex.: cliente de testes)')
+        parser.add_argument('--prune', action='store_true', help='Apenas aplica a retenção aos payloads gravados')
+
+    def handle(self, *args, **options):
+        if options['prune']:
+            clients = Client.objects.values_list('id', flat=True)
+            removed = sum(prune_payloads(client_id) for client_id in clients)
+            self.stdout.write(self.style.SUCCESS(f"{removed} payload(s) removido(s)"))
+            return
+
+        if not options['sync_log_id']:
+            raise CommandError('Informe o ID do SyncLog (ou --prune)')
+        source_log = SyncLog.objects.select_related('client', 'user').filter(id=options['sync_log_id']).first()
+        if not source_log:
+            raise CommandError(f"SyncLog {options['sync_log_id']} não encontrado")
+
+        client = None
+        if options['client']:
+            client = Client.objects.filter(id=options['client']).first()
+            if not client:
+                raise CommandError(f"Cliente {options['client']} não encontrado")
+
+        self.stdout.write(f"Payload: {payload_path(source_log)}")
+        result = APIService.replay_sync(source_log, client=client)
+        style = self.style.SUCCESS if result['success'] else self.style.ERROR
+        self.stdout.write(style(result['message']))
@@ -0,0 +1,55 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api_config.models import SyncLog
+from employees.scheduler import SyncScheduler
+
+
+class Command(BaseCommand):
+    help = 'Mostra a fila e os próximos horários das sincronizações agendadas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--run', action='store_true', help='Executa um ciclo do agendador antes de listar')
+
+    def handle(self, *args, **options):
+        if options['run']:
+            summary = SyncScheduler.run_once()
+            self.stdout.write(self.style.SUCCESS(
+                f"Iniciadas: {summary['started']}, Já em andamento: {summary['attached']}, "
+                f"Adiadas pelos limites: {summary['deferred']}"
+            ))
+
+        now = timezone.now()
+        running, per_client = SyncScheduler.running_counts()
+        running_logs = {
+            (log.client_id, log.api_type, log.company): log.id
+            for log in SyncLog.objects.filter(end_time__isnull=True).only('client_id', 'api_type', 'company')
+        }
+        rows = SyncScheduler.schedule()
+        due = sum(1 for _, c in rows if c.next_sync_at and c.next_sync_at <= now)
+
+        self.stdout.write(
+            f"Em andamento: {running}/{settings.SYNC_MAX_CONCURRENT} "
+            f"(por cliente: até {settings.SYNC_MAX_CONCURRENT_PER_CLIENT}) | Vencidas na fila: {due}"
+        )
+        self.stdout.write(f"{'Tipo':<9} {'Cred.':>6} {'Cliente':<24} {'Empresa':<12} {'Intervalo':>9}  {'Próxima':<17} Situação")
+        for api_type, credentials in rows:
+            company = credentials.company if api_type == 'employee' else credentials.main_company
+            log_id = running_logs.get((credentials.client_id, api_type, company))
+            if log_id:
+                situation = f"em andamento (log {log_id})"
+            elif credentials.next_sync_at is None:
+                situation = "aguardando primeiro ciclo"
+            elif credentials.next_sync_at <= now:
+                situation = "vencida"
+            else:
+                situation = "agendada"
+            next_run = (
+                timezone.localtime(credentials.next_sync_at).strftime('%d/%m/%Y %H:%M')
+                if credentials.next_sync_at else '-'
+            )
+            self.stdout.write(
+                f"{api_type:<9} {credentials.id:>6} {str(credentials.client)[:24]:<24} {company[:12]:<12} "
+                f"{credentials.sync_interval_minutes:>7}min  {next_run:<17} {situation}"
+            )
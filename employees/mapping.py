@@ -0,0 +1,236 @@
+"""
+Mapeamento declarativo dos registros do SOC para os modelos locais.
+
+Cada esquema lista (chave SOC, campo do modelo, tipo, max_length). Os
+esquemas são compilados uma única vez em funções de conversão por registro;
+campos texto são truncados ao max_length do modelo para não falharem no INSERT.
+"""
+import logging
+from collections import namedtuple
+from datetime import date, datetime
+
+from .models import Employee, Absence
+
+logger = logging.getLogger(__name__)
+
+DATE_FORMAT_DDMMYYYY = "%d/%m/%Y"
+DATE_FORMAT_ISO = "%Y-%m-%d"
+# Quantidade máxima de strings de data distintas mantidas em cache
+DATE_CACHE_SIZE = 32768
+# Quantidade máxima de valores inválidos distintos já avisados no log
+WARNED_VALUES_SIZE = 1024
+
+# max_length=None usa o max_length declarado no campo do modelo
+FieldSpec = namedtuple("FieldSpec", ["source", "target", "type", "max_length"], defaults=[None])
+
+EMPLOYEE_SCHEMA = (
+    FieldSpec("CODIGOEMPRESA", "codigo_empresa", "str"),
+    FieldSpec("NOMEEMPRESA", "nome_empresa", "str"),
+    FieldSpec("CODIGO", "codigo", "str"),
+    FieldSpec("NOME", "nome", "str"),
+    FieldSpec("CODIGOUNIDADE", "codigo_unidade", "str"),
+    FieldSpec("NOMEUNIDADE", "nome_unidade", "str"),
+    FieldSpec("CODIGOSETOR", "codigo_setor", "str"),
+    FieldSpec("NOMESETOR", "nome_setor", "str"),
+    FieldSpec("CODIGOCARGO", "codigo_cargo", "str"),
+    FieldSpec("NOMECARGO", "nome_cargo", "str"),
+    FieldSpec("CBOCARGO", "cbo_cargo", "str"),
+    FieldSpec("CCUSTO", "ccusto", "str"),
+    FieldSpec("NOMECENTROCUSTO", "nome_centro_custo", "str"),
+    FieldSpec("MATRICULAFUNCIONARIO", "matricula_funcionario", "str"),
+    FieldSpec("CPF", "cpf", "str"),
+    FieldSpec("RG", "rg", "str"),
+    FieldSpec("UFRG", "uf_rg", "str"),
+    FieldSpec("ORGAOEMISSORRG", "orgao_emissor_rg", "str"),
+    FieldSpec("SITUACAO", "situacao", "str"),
+    FieldSpec("SEXO", "sexo", "int"),
+    FieldSpec("PIS", "pis", "str"),
+    FieldSpec("CTPS", "ctps", "str"),
+    FieldSpec("SERIECTPS", "serie_ctps", "str"),
+    FieldSpec("ESTADOCIVIL", "estado_civil", "int"),
+    FieldSpec("TIPOCONTATACAO", "tipo_contratacao", "int"),
+    FieldSpec("DATA_NASCIMENTO", "data_nascimento", "date"),
+    FieldSpec("DATA_ADMISSAO", "data_admissao", "date"),
+    FieldSpec("DATA_DEMISSAO", "data_demissao", "date"),
+    FieldSpec("ENDERECO", "endereco", "str"),
+    FieldSpec("NUMERO_ENDERECO", "numero_endereco", "str"),
+    FieldSpec("BAIRRO", "bairro", "str"),
+    FieldSpec("CIDADE", "cidade", "str"),
+    FieldSpec("UF", "uf", "str"),
+    FieldSpec("CEP", "cep", "str"),
+    FieldSpec("TELEFONERESIDENCIAL", "telefone_residencial", "str"),
+    FieldSpec("TELEFONECELULAR", "telefone_celular", "str"),
+    FieldSpec("EMAIL", "email", "str"),
+    FieldSpec("DEFICIENTE", "deficiente", "int"),
+    FieldSpec("DEFICIENCIA", "deficiencia", "str"),
+    FieldSpec("NM_MAE_FUNCIONARIO", "nome_mae", "str"),
+    FieldSpec("DATAULTALTERACAO", "data_ultima_alteracao", "date"),
+    FieldSpec("MATRICULARH", "matricula_rh", "str"),
+    FieldSpec("COR", "cor", "int"),
+    FieldSpec("ESCOLARIDADE", "escolaridade", "int"),
+    FieldSpec("NATURALIDADE", "naturalidade", "str"),
+    FieldSpec("RAMAL", "ramal", "str"),
+    FieldSpec("REGIMEREVEZAMENTO", "regime_revezamento", "int"),
+    FieldSpec("REGIMETRABALHO", "regime_trabalho", "str"),
+    FieldSpec("TELCOMERCIAL", "tel_comercial", "str"),
+    FieldSpec("TURNOTRABALHO", "turno_trabalho", "int"),
+    FieldSpec("RHUNIDADE", "rh_unidade", "str"),
+    FieldSpec("RHSETOR", "rh_setor", "str"),
+    FieldSpec("RHCARGO", "rh_cargo", "str"),
+    FieldSpec("RHCENTROCUSTOUNIDADE", "rh_centro_custo_unidade", "str"),
+)
+
+ABSENCE_SCHEMA = (
+    FieldSpec("UNIDADE", "unidade", "str"),
+    FieldSpec("SETOR", "setor", "str"),
+    FieldSpec("MATRICULA_FUNC", "matricula_func", "str"),
+    FieldSpec("DT_NASCIMENTO", "dt_nascimento", "date"),
+    FieldSpec("SEXO", "sexo", "int"),
+    FieldSpec("TIPO_ATESTADO", "tipo_atestado", "int"),
+    FieldSpec("DT_INICIO_ATESTADO", "dt_inicio_atestado", "date"),
+    FieldSpec("DT_FIM_ATESTADO", "dt_fim_atestado", "date"),
+    FieldSpec("HORA_INICIO_ATESTADO", "hora_inicio_atestado", "str"),
+    FieldSpec("HORA_FIM_ATESTADO", "hora_fim_atestado", "str"),
+    FieldSpec("DIAS_AFASTADOS", "dias_afastados", "int"),
+    FieldSpec("HORAS_AFASTADO", "horas_afastado", "str"),
+    FieldSpec("CID_PRINCIPAL", "cid_principal", "str"),
+    FieldSpec("DESCRICAO_CID", "descricao_cid", "str"),
+    FieldSpec("GRUPO_PATOLOGICO", "grupo_patologico", "str"),
+    FieldSpec("TIPO_LICENCA", "tipo_licenca", "str"),
+)
+
+
+# ----------------------------
+# CONVERSORES
+# ----------------------------
+# string -> date|None; as mesmas poucas milhares de datas se repetem no payload
+_DATE_CACHE = {}
+
+
+def parse_date(value):
+    """Converte 'dd/mm/aaaa' (ou 'aaaa-mm-dd') em date; None se inválida."""
+    if not value:
+        return None
+    if value.__class__ is not str:
+        return value if isinstance(value, date) else _parse_date_uncached(value)
+    try:
+        return _DATE_CACHE[value]
+    except KeyError:
+        pass
+    parsed = _parse_date_uncached(value)
+    _cache_date(value, parsed)
+    return parsed
+
+
+def _cache_date(value, parsed):
+    if len(_DATE_CACHE) >= DATE_CACHE_SIZE:
+        # Limpeza total é mais barata que LRU e o cache se repovoa em poucos registros
+        _DATE_CACHE.clear()
+    _DATE_CACHE[value] = parsed
+
+
+def _parse_date_uncached(value):
+    # Caminho rápido para o formato do SOC, sem passar pelo strptime
+    if value.__class__ is str and len(value) == 10 and value[2] == "/" and value[5] == "/":
+        try:
+            return date(int(value[6:]), int(value[3:5]), int(value[:2]))
+        except ValueError:
+            pass
+    try:
+        return datetime.strptime(value, DATE_FORMAT_DDMMYYYY).date()
+    except (TypeError, ValueError):
+        try:
+            # Tentar formato alternativo
+            return datetime.strptime(value, DATE_FORMAT_ISO).date()
+        except (TypeError, ValueError):
+            _warn_invalid("data", value)
+            return None
+
+
+# Um aviso por valor inválido distinto, e não por registro: um campo errado no
+# cadastro do SOC se repete em milhares de registros da mesma exportação
+_WARNED_VALUES = set()
+
+
+def _warn_invalid(kind, value):
+    key = (kind, repr(value))
+    if key in _WARNED_VALUES:
+        return
+    if len(_WARNED_VALUES) >= WARNED_VALUES_SIZE:
+        _WARNED_VALUES.clear()
+    _WARNED_VALUES.add(key)
+    logger.warning(f"Formato de {kind} inválido: {value}")
+
+
+def parse_int(value):
+    """Converte para inteiro; None se vazio ou inválido."""
+    if value is None or value == "":
+        return None
+    if value.__class__ is int:
+        return value
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        _warn_invalid("número", value)
+        return None
+
+
+def compile_mapping(model, schema):
+    """
+    Compila um esquema em uma função registro -> dict de campos do modelo.
+
+    O trabalho de resolver campos, tipos e max_length é feito aqui, uma vez;
+    a função devolvida só faz um get e uma conversão por campo.
+    """
+    steps = []
+    for spec in schema:
+        field = model._meta.get_field(spec.target)
+        if spec.type == "str":
+            # Texto é tratado inline no laço; sem max_length (TextField) não trunca
+            converter = None
+            max_length = spec.max_length or field.max_length or 0
+        elif spec.type == "int":
+            converter, max_length = parse_int, 0
+        elif spec.type == "date":
+            converter, max_length = parse_date, 0
+        else:
+            raise ValueError(f"Tipo desconhecido no esquema de {model.__name__}: {spec.type}")
+        steps.append((spec.source, spec.target, converter, max_length))
+    steps = tuple(steps)
+
+    def convert(record):
+        get = record.get
+        result = {}
+        for source, target, converter, max_length in steps:
+            value = get(source)
+            if converter is not None:
+                value = converter(value)
+            elif value.__class__ is str:
+                if max_length and len(value) > max_length:
+                    value = value[:max_length]
+            elif value is not None:
+                value = str(value)[:max_length] if max_length else str(value)
+            result[target] = value
+        return result
+
+    return convert
+
+
+_convert_employee = compile_mapping(Employee, EMPLOYEE_SCHEMA)
+_convert_absence = compile_mapping(Absence, ABSENCE_SCHEMA)
+_EMPLOYEE_NAME_MAX_LENGTH = Employee._meta.get_field("nome").max_length
+
+
+def map_employee(record):
+    """Monta o dicionário de campos do modelo Employee a partir de um registro do SOC."""
+    employee_dict = _convert_employee(record)
+    if not employee_dict["nome"]:
+        employee_dict["nome"] = f"Sem Nome ({employee_dict['codigo']})"[:_EMPLOYEE_NAME_MAX_LENGTH]
+    return employee_dict
+
+
+def map_absence(record, employee_id=None):
+    """Monta o dicionário de campos do modelo Absence a partir de um registro do SOC."""
+    absence_dict = _convert_absence(record)
+    absence_dict["employee_id"] = employee_id
+    return absence_dict
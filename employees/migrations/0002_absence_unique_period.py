@@ -0,0 +1,38 @@
+# Generated manually
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def remove_duplicate_absences(apps, schema_editor):
+    """Mantém apenas o registro mais recente de cada chave natural."""
+    Absence = apps.get_model('employees', 'Absence')
+    keep_ids = (
+        Absence.objects.order_by()
+        .values('client_id', 'employee_id', 'dt_inicio_atestado', 'dt_fim_atestado')
+        .annotate(keep_id=Max('id'))
+        .values('keep_id')
+    )
+    # Linhas com algum campo da chave nulo não conflitam na constraint
+    (Absence.objects
+     .filter(employee__isnull=False, dt_inicio_atestado__isnull=False, dt_fim_atestado__isnull=False)
+     .exclude(id__in=keep_ids)
+     .delete())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_absences, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='absence',
+            constraint=models.UniqueConstraint(
+                fields=('client', 'employee', 'dt_inicio_atestado', 'dt_fim_atestado'),
+                name='unique_absence_period',
+            ),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated manually
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0002_absence_unique_period'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='employee',
+            name='content_hash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=32, verbose_name='Digest dos Dados'),
+            preserve_default=False,
+        ),
+    ]
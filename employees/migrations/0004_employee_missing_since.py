@@ -0,0 +1,18 @@
+# Generated manually
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0003_employee_content_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='employee',
+            name='missing_since',
+            field=models.DateTimeField(blank=True, db_index=True, null=True, verbose_name='Ausente da Exportação desde'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated manually
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import Coalesce, TruncMonth
+
+
+def build_rollups(apps, schema_editor):
+    """Agrega o absenteísmo já gravado, cliente a cliente."""
+    Absence = apps.get_model('employees', 'Absence')
+    AbsenceRollup = apps.get_model('employees', 'AbsenceRollup')
+    client_ids = Absence.objects.order_by().values_list('client_id', flat=True).distinct()
+    for client_id in client_ids:
+        groups = (
+            Absence.objects.filter(client_id=client_id).order_by()
+            .annotate(month=TruncMonth('dt_inicio_atestado'))
+            .values('month', 'unidade', 'setor', 'grupo_patologico', 'sexo')
+            .annotate(absences_count=Count('id'), days_off=Coalesce(Sum('dias_afastados'), 0))
+        )
+        AbsenceRollup.objects.bulk_create(
+            [AbsenceRollup(client_id=client_id, **group) for group in groups], batch_size=1000
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0001_initial'),
+        ('employees', '0004_employee_missing_since'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AbsenceRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(blank=True, null=True, verbose_name='Mês')),
+                ('unidade', models.CharField(blank=True, max_length=130, null=True, verbose_name='Unidade')),
+                ('setor', models.CharField(blank=True, max_length=130, null=True, verbose_name='Setor')),
+                ('grupo_patologico', models.CharField(blank=True, max_length=80, null=True, verbose_name='Grupo Patológico')),
+                ('sexo', models.IntegerField(blank=True, null=True, verbose_name='Sexo')),
+                ('absences_count', models.IntegerField(default=0, verbose_name='Atestados')),
+                ('days_off', models.IntegerField(default=0, verbose_name='Dias Afastados')),
+                ('client', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='clients.client', verbose_name='Cliente')),
+            ],
+            options={
+                'verbose_name': 'Resumo de Absenteísmo',
+                'verbose_name_plural': 'Resumos de Absenteísmo',
+                'indexes': [models.Index(fields=['client', 'month'], name='absence_rollup_client_month')],
+            },
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
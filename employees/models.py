@@ -64,6 +64,9 @@ class Employee(models.Model):
     rh_centro_custo_unidade = models.CharField(_("RH Centro Custo Unidade"), max_length=80, blank=True)
 
     # Campos de controle
+    content_hash = models.CharField(_("Digest dos Dados"), max_length=32, blank=True, editable=False)
+    # Preenchido quando o funcionário deixa de vir na exportação do SOC; fora da contagem de headcount
+    missing_since = models.DateTimeField(_("Ausente da Exportação desde"), blank=True, null=True, db_index=True)
     created_at = models.DateTimeField(_("Criado em"), auto_now_add=True)
     updated_at = models.DateTimeField(_("Atualizado em"), auto_now=True)
 
@@ -115,3 +118,31 @@ class Absence(models.Model):
         verbose_name = _("Absenteísmo")
         verbose_name_plural = _("Absenteísmos")
         ordering = ['-dt_inicio_atestado']
+        constraints = [
+            # Chave natural usada pelo upsert da sincronização
+            models.UniqueConstraint(
+                fields=['client', 'employee', 'dt_inicio_atestado', 'dt_fim_atestado'],
+                name='unique_absence_period',
+            ),
+        ]
+
+
+class AbsenceRollup(models.Model):
+    """
+    Absenteísmo pré-agregado por cliente, mês de início, unidade, setor,
+    grupo patológico e sexo. Mantido pela sincronização (ver rollups.py) só
+    para os meses que ela gravou; os gráficos do dashboard leem daqui.
+    """
+    client = models.ForeignKey(Client, on_delete=models.CASCADE, verbose_name=_("Cliente"))
+    month = models.DateField(_("Mês"), blank=True, null=True)
+    unidade = models.CharField(_("Unidade"), max_length=130, blank=True, null=True)
+    setor = models.CharField(_("Setor"), max_length=130, blank=True, null=True)
+    grupo_patologico = models.CharField(_("Grupo Patológico"), max_length=80, blank=True, null=True)
+    sexo = models.IntegerField(_("Sexo"), blank=True, null=True)
+    absences_count = models.IntegerField(_("Atestados"), default=0)
+    days_off = models.IntegerField(_("Dias Afastados"), default=0)
+
+    class Meta:
+        verbose_name = _("Resumo de Absenteísmo")
+        verbose_name_plural = _("Resumos de Absenteísmo")
+        indexes = [models.Index(fields=['client', 'month'], name='absence_rollup_client_month')]
@@ -0,0 +1,150 @@
+"""
+Cópia local, comprimida, das respostas brutas do SOC.
+
+Cada sincronização grava os bytes recebidos em
+SYNC_PAYLOAD_DIR/<cliente>/<synclog>.json.gz enquanto o stream é processado,
+sem segunda leitura nem buffer extra. Os arquivos permitem reprocessar um
+SyncLog sem nova chamada ao SOC (comando replay_sync) e servem de entrada
+realista para medições de desempenho. Arquivos mais antigos que
+SYNC_PAYLOAD_RETENTION_DAYS são apagados a cada nova captura do cliente.
+"""
+import gzip
+import logging
+import os
+import time
+from pathlib import Path
+
+import requests
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+PAYLOAD_SUFFIX = ".json.gz"
+# Nível 5 comprime o JSON do SOC quase tanto quanto o 9, a uma fração do custo
+PAYLOAD_COMPRESSLEVEL = 5
+PAYLOAD_READ_SIZE = 64 * 1024
+
+
+def capture_enabled():
+    return settings.SYNC_PAYLOAD_RETENTION_DAYS > 0
+
+
+def payload_path(sync_log):
+    """Caminho do payload gravado para um SyncLog."""
+    return Path(settings.SYNC_PAYLOAD_DIR) / str(sync_log.client_id) / f"{sync_log.id}{PAYLOAD_SUFFIX}"
+
+
+def iter_payload_chunks(path):
+    """Lê um payload gravado em blocos de bytes, como o corpo da resposta HTTP."""
+    with gzip.open(path, "rb") as payload:
+        while True:
+            chunk = payload.read(PAYLOAD_READ_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+
+def delete_payload(sync_log):
+    try:
+        payload_path(sync_log).unlink()
+    except FileNotFoundError:
+        pass
+
+
+def prune_payloads(client_id, max_age_days=None):
+    """Apaga os payloads do cliente mais antigos que a retenção. Retorna quantos apagou."""
+    if max_age_days is None:
+        max_age_days = settings.SYNC_PAYLOAD_RETENTION_DAYS
+    directory = Path(settings.SYNC_PAYLOAD_DIR) / str(client_id)
+    cutoff = time.time() - max_age_days * 86400
+    removed = 0
+    try:
+        entries = list(os.scandir(directory))
+    except FileNotFoundError:
+        return 0
+    for entry in entries:
+        if entry.is_file() and entry.stat().st_mtime < cutoff:
+            try:
+                os.unlink(entry.path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+    return removed
+
+
+class PayloadRecorder:
+    """
+    Grava os blocos da resposta conforme são consumidos pelo parser.
+
+    Uso:
+        with PayloadRecorder(sync_log, response) as recorder:
+            records = SOCClient.iter_records(response, tee=recorder.write)
+
+    Se o processamento parar antes do fim do corpo (erro de mapeamento, por
+    exemplo), o restante da resposta é lido e gravado na saída do bloco, para
+    que o payload guardado fique completo e possa ser reprocessado.
+    """
+
+    def __init__(self, sync_log, response):
+        self.path = payload_path(sync_log)
+        self.client_id = sync_log.client_id
+        self.response = response
+        self._partial_path = self.path.with_name(self.path.name + ".part")
+        self._file = None
+
+    def __enter__(self):
+        if capture_enabled() and self.response.status_code == 200:
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._file = gzip.open(self._partial_path, "wb", compresslevel=PAYLOAD_COMPRESSLEVEL)
+            except OSError as e:
+                # Falha de disco não pode interromper a sincronização
+                logger.warning(f"Não foi possível gravar o payload em {self.path}: {e}")
+        return self
+
+    def write(self, chunk):
+        if self._file is not None:
+            try:
+                self._file.write(chunk)
+            except OSError as e:
+                logger.warning(f"Não foi possível gravar o payload em {self.path}: {e}")
+                self._discard()
+        return chunk
+
+    def _discard(self):
+        try:
+            self._file.close()
+            self._partial_path.unlink()
+        except OSError:
+            pass
+        self._file = None
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._file is None:
+            return False
+        if exc_type is not None and issubclass(exc_type, (requests.RequestException, OSError)):
+            # Conexão caiu no meio do corpo: o que foi gravado está incompleto
+            logger.warning(f"Payload incompleto, não será guardado ({self.path}): {exc}")
+            self._discard()
+            return False
+        complete = True
+        try:
+            for chunk in self.response.iter_content(chunk_size=PAYLOAD_READ_SIZE):
+                self._file.write(chunk)
+        except requests.exceptions.StreamConsumedError:
+            # Corpo já lido por inteiro pelo parser
+            pass
+        except (requests.RequestException, OSError) as e:
+            complete = False
+            logger.warning(f"Payload incompleto, não será guardado ({self.path}): {e}")
+        if not complete:
+            self._discard()
+            return False
+        try:
+            self._file.close()
+            os.replace(self._partial_path, self.path)
+            prune_payloads(self.client_id)
+        except OSError as e:
+            logger.warning(f"Não foi possível gravar o payload em {self.path}: {e}")
+        self._file = None
+        return False
@@ -0,0 +1,184 @@
+"""
+Processamento das sincronizações em estágios ligados por filas limitadas.
+
+    leitura + decodificação (thread chamadora, lê a resposta HTTP em fluxo)
+        -> fila -> SYNC_MAP_WORKERS threads de mapeamento/validação
+        -> fila -> SYNC_WRITE_WORKERS threads de gravação no banco
+
+As filas guardam no máximo SYNC_QUEUE_SIZE lotes. Quando a gravação atrasa, o
+mapeamento bloqueia e, em seguida, a leitura da resposta: a memória fica
+limitada a alguns lotes, qualquer que seja o tamanho do payload. Enquanto um
+lote está no banco (I/O, sem GIL), o seguinte já está sendo mapeado.
+
+Os lotes são gravados na ordem em que foram lidos, mesmo que o mapeamento
+termine fora de ordem: com um único gravador (o padrão de SYNC_WRITE_WORKERS),
+o último registro de uma chave repetida entre lotes prevalece, como na gravação
+sequencial, e nunca há duas transações disputando as mesmas chaves. Mais
+gravadores gravam lotes em transações paralelas; só use com payloads sem chaves
+repetidas entre lotes (senão os upserts podem entrar em deadlock no Postgres).
+
+Um erro em qualquer estágio interrompe os demais e é relançado na thread
+chamadora, com o mesmo tipo, para ser tratado como antes pelo serviço.
+"""
+import logging
+import queue
+import threading
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# Marca de fim de fluxo entre os estágios
+_DONE = object()
+# Intervalo para checar cancelamento enquanto uma fila está cheia/vazia
+_POLL_SECONDS = 0.1
+
+
+class StagedPipeline:
+    """
+    `map_batch(lote) -> mapeado` roda nas threads de mapeamento;
+    `write_batch(mapeado) -> resultado` nas de gravação, na ordem de leitura;
+    `on_result(resultado)` é chamado sob lock, na thread de gravação, na ordem
+    em que os lotes terminam.
+    """
+
+    def __init__(self, map_batch, write_batch, on_result, map_workers=None,
+                 write_workers=None, queue_size=None, name="sync"):
+        self.map_batch = map_batch
+        self.write_batch = write_batch
+        self.on_result = on_result
+        self.map_workers = max(1, map_workers or settings.SYNC_MAP_WORKERS)
+        self.write_workers = max(1, write_workers or settings.SYNC_WRITE_WORKERS)
+        self.name = name
+        size = max(1, queue_size or settings.SYNC_QUEUE_SIZE)
+        self._map_queue = queue.Queue(maxsize=size)
+        self._write_queue = queue.Queue(maxsize=size)
+        self._lock = threading.Lock()
+        self._failed = threading.Event()
+        self._error = None
+        self._maps_running = self.map_workers
+        # Reordenação antes da gravação: lotes mapeados à espera do anterior.
+        # Um mapeador só começa um lote até `_window` posições à frente do
+        # próximo a gravar, o que limita os lotes parados em `_ready`.
+        self._ready = {}
+        self._next_seq = 0
+        self._window = self.map_workers + size
+        self._order = threading.Condition(self._lock)
+
+    def run(self, batches):
+        """Consome `batches` na thread atual, alimentando os estágios seguintes."""
+        threads = [
+            threading.Thread(target=self._map_loop, name=f"{self.name}-map-{i}", daemon=True)
+            for i in range(self.map_workers)
+        ] + [
+            threading.Thread(target=self._write_loop, name=f"{self.name}-write-{i}", daemon=True)
+            for i in range(self.write_workers)
+        ]
+        for thread in threads:
+            thread.start()
+
+        try:
+            for item in enumerate(batches):
+                if not self._put(self._map_queue, item):
+                    break
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            for _ in range(self.map_workers):
+                self._put(self._map_queue, _DONE)
+            for thread in threads:
+                thread.join()
+
+        if self._error is not None:
+            raise self._error
+
+    # ----------------------------
+    # ESTÁGIOS
+    # ----------------------------
+    def _map_loop(self):
+        try:
+            while True:
+                item = self._get(self._map_queue)
+                if item is _DONE or not self._wait_turn(item[0]):
+                    break
+                seq, batch = item
+                if not self._put(self._write_queue, (seq, self.map_batch(batch))):
+                    break
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            with self._lock:
+                self._maps_running -= 1
+                last = self._maps_running == 0
+            # O último mapeador a sair encerra os gravadores
+            if last:
+                for _ in range(self.write_workers):
+                    self._put(self._write_queue, _DONE)
+            connections.close_all()
+
+    def _write_loop(self):
+        try:
+            while True:
+                item = self._get(self._write_queue)
+                if item is _DONE:
+                    break
+                for mapped in self._in_order(item):
+                    result = self.write_batch(mapped)
+                    with self._lock:
+                        self.on_result(result)
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            connections.close_all()
+
+    # ----------------------------
+    # ORDEM DE GRAVAÇÃO
+    # ----------------------------
+    def _wait_turn(self, seq):
+        """Segura o mapeamento de um lote muito à frente do próximo a gravar."""
+        with self._order:
+            while seq >= self._next_seq + self._window:
+                if self._failed.is_set():
+                    return False
+                self._order.wait(_POLL_SECONDS)
+        return True
+
+    def _in_order(self, item):
+        """Lotes que já podem ser gravados, na ordem de leitura, depois de receber `item`."""
+        seq, mapped = item
+        with self._order:
+            self._ready[seq] = mapped
+            batches = []
+            while self._next_seq in self._ready:
+                batches.append(self._ready.pop(self._next_seq))
+                self._next_seq += 1
+            if batches:
+                self._order.notify_all()
+        return batches
+
+    # ----------------------------
+    # FILAS
+    # ----------------------------
+    def _fail(self, error):
+        with self._lock:
+            if self._error is None:
+                self._error = error
+        self._failed.set()
+
+    def _put(self, target, item):
+        while not self._failed.is_set():
+            try:
+                target.put(item, timeout=_POLL_SECONDS)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, source):
+        while not self._failed.is_set():
+            try:
+                return source.get(timeout=_POLL_SECONDS)
+            except queue.Empty:
+                continue
+        return _DONE
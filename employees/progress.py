@@ -0,0 +1,73 @@
+"""
+Progresso das sincronizações em andamento, guardado no cache.
+
+Durante a sincronização, contadores e mensagens de etapa ficam no cache
+(Redis em produção): incrementos atômicos e expiração automática, sem UPDATE
+na linha do SyncLog a cada lote. O SyncLog só é gravado no início e no fim,
+com os totais finais; ao finalizar, as chaves do cache são removidas e o
+banco volta a ser a fonte da verdade.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+COUNTERS = ("records_processed", "records_success", "records_error")
+
+
+class SyncProgress:
+    def __init__(self, sync_log_id):
+        self.sync_log_id = sync_log_id
+        self._prefix = f"sync-progress:{sync_log_id}:"
+
+    def _key(self, field):
+        return self._prefix + field
+
+    def start(self, sync_log):
+        """Registra a sincronização no cache, com o dono para validar a leitura."""
+        ttl = settings.SYNC_PROGRESS_TTL
+        values = {self._key(counter): 0 for counter in COUNTERS}
+        values[self._key("meta")] = {
+            "user_id": sync_log.user_id,
+            "client_id": sync_log.client_id,
+            "api_type": sync_log.api_type,
+            "company": sync_log.company,
+        }
+        values[self._key("message")] = sync_log.error_message
+        cache.set_many(values, ttl)
+
+    def add(self, processed=0, success=0, error=0):
+        """Soma os contadores de um lote (seguro entre threads e processos)."""
+        for counter, delta in zip(COUNTERS, (processed, success, error)):
+            if not delta:
+                continue
+            try:
+                cache.incr(self._key(counter), delta)
+            except ValueError:
+                # Chave expirada ou limpa: recomeça a partir deste lote
+                cache.set(self._key(counter), delta, settings.SYNC_PROGRESS_TTL)
+
+    def message(self, text):
+        cache.set(self._key("message"), text, settings.SYNC_PROGRESS_TTL)
+
+    def read(self):
+        """Retorna o progresso atual, ou None se não há sincronização em andamento no cache."""
+        return self._parse(cache.get_many(self._keys()))
+
+    async def aread(self):
+        """Versão assíncrona de read(), para as views ASGI."""
+        return self._parse(await cache.aget_many(self._keys()))
+
+    def _keys(self):
+        return [self._key(field) for field in ("meta", "message") + COUNTERS]
+
+    def _parse(self, values):
+        meta = values.get(self._key("meta"))
+        if meta is None:
+            return None
+        progress = dict(meta)
+        progress["message"] = values.get(self._key("message"))
+        for counter in COUNTERS:
+            progress[counter] = values.get(self._key(counter)) or 0
+        return progress
+
+    def clear(self):
+        cache.delete_many([self._key(field) for field in ("meta", "message") + COUNTERS])
@@ -0,0 +1,89 @@
+"""
+Manutenção da tabela AbsenceRollup, lida pelos gráficos do dashboard.
+
+A sincronização anota os meses (de dt_inicio_atestado) que gravou e, ao fim,
+reagrega só esses meses: as linhas do resumo de cada mês são apagadas e
+recriadas a partir de um GROUP BY sobre os absenteísmos do mês. O custo da
+atualização depende do volume dos meses tocados, e o do dashboard da
+quantidade de grupos, não do total de absenteísmos do cliente.
+"""
+import logging
+from datetime import date
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce, TruncMonth
+
+from clients.models import Client
+from .dashboard import bump_dashboard_version
+from .models import Absence, AbsenceRollup
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_INSERT_BATCH_SIZE = 1000
+
+
+def month_of(day):
+    """Primeiro dia do mês de `day` (None continua None)."""
+    return day.replace(day=1) if day is not None else None
+
+
+def absence_months(absences):
+    """Meses tocados por uma lista de absenteísmos mapeados (None ignorados)."""
+    return {month_of(absence["dt_inicio_atestado"]) for absence in absences if absence is not None}
+
+
+def refresh_absence_rollups(client_id, months=None):
+    """
+    Recalcula o resumo do cliente para `months` (conjunto de primeiros dias
+    do mês; None no conjunto = absenteísmos sem data) ou, sem `months`, por
+    inteiro. Retorna quantos grupos foram gravados.
+    """
+    if months is not None and not months:
+        return 0
+
+    rollups = AbsenceRollup.objects.filter(client_id=client_id)
+    absences = Absence.objects.filter(client_id=client_id)
+    if months is not None:
+        rollups = rollups.filter(_months_filter("month", months))
+        absences = absences.filter(_months_filter("dt_inicio_atestado", months, ranges=True))
+
+    groups = (
+        absences.order_by()
+        .annotate(month=TruncMonth("dt_inicio_atestado"))
+        .values("month", "unidade", "setor", "grupo_patologico", "sexo")
+        .annotate(absences_count=Count("id"), days_off=Coalesce(Sum("dias_afastados"), 0))
+    )
+    with transaction.atomic():
+        # Serializa as atualizações do mesmo cliente (partes de uma sincronização em paralelo)
+        list(Client.objects.select_for_update().filter(id=client_id).values_list("id", flat=True))
+        rollups.delete()
+        created = AbsenceRollup.objects.bulk_create(
+            [AbsenceRollup(client_id=client_id, **group) for group in groups],
+            batch_size=ROLLUP_INSERT_BATCH_SIZE,
+        )
+    bump_dashboard_version(client_id)
+    logger.info(
+        f"Resumo de absenteísmo do cliente {client_id} atualizado: {len(created)} grupos "
+        f"({'todos os meses' if months is None else f'{len(months)} meses'})"
+    )
+    return len(created)
+
+
+def _months_filter(field, months, ranges=False):
+    """Q para os meses pedidos; com `ranges`, compara a data pelo intervalo do mês (usa índice)."""
+    conditions = []
+    for month in months:
+        if month is None:
+            conditions.append(Q(**{f"{field}__isnull": True}))
+        elif ranges:
+            conditions.append(Q(**{f"{field}__gte": month, f"{field}__lt": _next_month(month)}))
+        else:
+            conditions.append(Q(**{field: month}))
+    return reduce(or_, conditions)
+
+
+def _next_month(month):
+    return date(month.year + 1, 1, 1) if month.month == 12 else date(month.year, month.month + 1, 1)
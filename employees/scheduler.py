@@ -0,0 +1,163 @@
+"""
+Agendamento automático das sincronizações de todas as credenciais.
+
+A cada SYNC_SCHEDULER_INTERVAL segundos o Celery beat dispara
+schedule_syncs_task, que inicia as sincronizações vencidas
+(next_sync_at <= agora) respeitando dois limites: SYNC_MAX_CONCURRENT
+sincronizações em andamento no total e SYNC_MAX_CONCURRENT_PER_CLIENT por
+cliente. O que não cabe fica para o ciclo seguinte, na ordem de vencimento.
+
+Os horários são espalhados: cada credencial tem uma fase fixa dentro do seu
+intervalo (crc32 do tipo + id), de modo que credenciais com o mesmo intervalo
+não começam todas no mesmo minuto, e a fase não muda entre reinícios.
+
+O agendamento é opcional por credencial (sync_interval_minutes > 0). As
+sincronizações agendadas de absenteísmo não usam o período fixo da
+credencial: buscam uma janela móvel, os últimos SYNC_ABSENCE_WINDOW_DAYS dias
+até hoje (absence_window). Períodos mais antigos ficam para a carga histórica.
+"""
+import logging
+import zlib
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+from django.utils import timezone
+
+from api_config.models import ABSENCE_MAX_PERIOD_DAYS, EmployeeCredentials, AbsenceCredentials, SyncLog
+from .services import APIService
+
+logger = logging.getLogger(__name__)
+
+SCHEDULER_LOCK_KEY = "sync-scheduler"
+
+# tipo de API -> (modelo da credencial, campo da empresa)
+SCHEDULED_APIS = {
+    "employee": (EmployeeCredentials, "company"),
+    "absence": (AbsenceCredentials, "main_company"),
+}
+
+
+def next_slot(api_type, credentials_id, interval_minutes, after):
+    """Primeiro horário depois de `after` na grade da credencial (intervalo + fase fixa)."""
+    interval = interval_minutes * 60
+    phase = zlib.crc32(f"{api_type}:{credentials_id}".encode()) % interval
+    slot = ((int(after.timestamp()) - phase) // interval + 1) * interval + phase
+    return datetime.fromtimestamp(slot, tz=dt_timezone.utc)
+
+
+def absence_window(today=None):
+    """(início, fim) da janela móvel das sincronizações agendadas de absenteísmo."""
+    end = today or timezone.localdate()
+    days = max(0, min(settings.SYNC_ABSENCE_WINDOW_DAYS, ABSENCE_MAX_PERIOD_DAYS))
+    return end - timedelta(days=days), end
+
+
+class SyncScheduler:
+    @staticmethod
+    def run_once():
+        """Um ciclo do agendador; ciclos sobrepostos (beat atrasado) são ignorados."""
+        if not cache.add(SCHEDULER_LOCK_KEY, True, settings.SYNC_SCHEDULER_INTERVAL * 5):
+            logger.info("Agendador de sincronizações já em execução, ciclo ignorado")
+            return {"started": 0, "attached": 0, "deferred": 0, "skipped": True}
+        try:
+            return SyncScheduler.run()
+        finally:
+            cache.delete(SCHEDULER_LOCK_KEY)
+
+    @staticmethod
+    def run(now=None):
+        """Inicia as sincronizações vencidas que cabem nos limites globais e por cliente."""
+        now = now or timezone.now()
+        SyncScheduler._initialize(now)
+        running, per_client = SyncScheduler.running_counts()
+        summary = {"started": 0, "attached": 0, "deferred": 0}
+
+        for api_type, credentials in SyncScheduler.due(now):
+            if running >= settings.SYNC_MAX_CONCURRENT:
+                summary["deferred"] += 1
+                continue
+            if per_client.get(credentials.client_id, 0) >= settings.SYNC_MAX_CONCURRENT_PER_CLIENT:
+                summary["deferred"] += 1
+                continue
+
+            model, company_field = SCHEDULED_APIS[api_type]
+            try:
+                sync_log, started = APIService.start_sync(
+                    credentials.user, credentials.client, api_type, getattr(credentials, company_field),
+                    lambda log, api_type=api_type, credentials=credentials: _enqueue(api_type, credentials, log),
+                )
+            except Exception as e:
+                # Broker fora do ar, por exemplo: a credencial continua vencida
+                logger.error(f"Erro ao agendar sincronização {api_type} da credencial {credentials.id}: {e}")
+                continue
+
+            if started:
+                running += 1
+                per_client[credentials.client_id] = per_client.get(credentials.client_id, 0) + 1
+                summary["started"] += 1
+                logger.info(f"Sincronização agendada iniciada: {api_type} credencial {credentials.id} (log {sync_log.id})")
+            else:
+                # Já havia uma igual em andamento (iniciada pelo usuário): conta como feita
+                summary["attached"] += 1
+            model.objects.filter(id=credentials.id).update(
+                next_sync_at=next_slot(api_type, credentials.id, credentials.sync_interval_minutes, now)
+            )
+        return summary
+
+    @staticmethod
+    def running_counts():
+        """(total, {client_id: quantidade}) das sincronizações em andamento."""
+        # Logs abertos há mais que a validade do lock são de tarefas perdidas
+        since = timezone.now() - timedelta(seconds=settings.SYNC_LOCK_TTL)
+        rows = (
+            SyncLog.objects.filter(end_time__isnull=True, start_time__gte=since)
+            .values("client_id")
+            .annotate(total=Count("id"))
+        )
+        per_client = {row["client_id"]: row["total"] for row in rows}
+        return sum(per_client.values()), per_client
+
+    @staticmethod
+    def due(now):
+        """Credenciais vencidas, da mais atrasada para a mais recente: [(tipo, credencial)]."""
+        due = []
+        for api_type, (model, _) in SCHEDULED_APIS.items():
+            credentials = model.objects.filter(
+                sync_interval_minutes__gt=0, next_sync_at__lte=now
+            ).select_related("client", "user")
+            due.extend((api_type, c) for c in credentials)
+        due.sort(key=lambda item: item[1].next_sync_at)
+        return due
+
+    @staticmethod
+    def schedule():
+        """Todas as credenciais com agendamento ativo, para acompanhamento: [(tipo, credencial)]."""
+        rows = []
+        for api_type, (model, _) in SCHEDULED_APIS.items():
+            credentials = model.objects.filter(sync_interval_minutes__gt=0).select_related("client")
+            rows.extend((api_type, c) for c in credentials)
+        rows.sort(key=lambda item: (item[1].next_sync_at is None, item[1].next_sync_at))
+        return rows
+
+    @staticmethod
+    def _initialize(now):
+        """Dá o primeiro horário às credenciais novas ou reativadas."""
+        for api_type, (model, _) in SCHEDULED_APIS.items():
+            pending = model.objects.filter(sync_interval_minutes__gt=0, next_sync_at__isnull=True)
+            for credentials_id, interval in pending.values_list("id", "sync_interval_minutes"):
+                model.objects.filter(id=credentials_id).update(
+                    next_sync_at=next_slot(api_type, credentials_id, interval, now)
+                )
+
+
+def _enqueue(api_type, credentials, sync_log):
+    from .tasks import sync_employees_task, sync_absences_task
+
+    if api_type == "employee":
+        return sync_employees_task.delay(credentials.user_id, credentials.client_id, sync_log.id)
+    start_date, end_date = absence_window()
+    return sync_absences_task.delay(
+        credentials.user_id, credentials.client_id, sync_log.id, start_date.isoformat(), end_date.isoformat()
+    )
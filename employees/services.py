@@ -1,13 +1,27 @@
-import requests
+import hashlib
 import json
 import logging
-from datetime import datetime
+import threading
+from datetime import timedelta
+from django.conf import settings
 from django.utils import timezone
-from django.db import transaction
+from django.db import connection, transaction
+from django.db.models import F, Max, Sum
 from .models import Employee, Absence
-from api_config.models import EmployeeCredentials, AbsenceCredentials, SyncLog
-import concurrent.futures
-from functools import partial
+from .mapping import map_employee, map_absence, parse_date
+from .soc_client import SOCClient, get_soc_client
+from .identity import EmployeeIndex, PLACEHOLDER_SITUACAO
+from .pipeline import StagedPipeline
+from .dashboard import bump_dashboard_version
+from .rollups import absence_months, refresh_absence_rollups
+from .progress import SyncProgress
+from .sync_lock import SyncLock
+from .payload_store import PayloadRecorder, iter_payload_chunks, payload_path
+from .streaming import SOCErrorResponse, iter_json_records
+from api_config.models import EmployeeCredentials, AbsenceCredentials, SyncLog, SyncChunk
+from celery import chord, signature
+from collections import Counter
+from itertools import chain, islice
 
 logger = logging.getLogger(__name__)
 
@@ -18,13 +32,101 @@ NO_EMPLOYEES_FOUND_MSG = "Nenhum funcionário encontrado para sincronizar"
 NO_ABSENCES_FOUND_MSG = "Nenhum registro de absenteísmo encontrado para sincronizar"
 DATE_FORMAT_DDMMYYYY = "%d/%m/%Y"  # Replaces multiple occurrences of '%d/%m/%Y'
 
+# Contadores do SyncLog acompanhados no cache durante a sincronização
+PROGRESS_FIELDS = ["records_processed", "records_success", "records_error"]
+
+# Quantidade de funcionários gravados por comando de upsert
+EMPLOYEE_BATCH_SIZE = 1000
+# Colunas sobrescritas quando o (client, codigo) já existe no banco
+EMPLOYEE_UPDATE_FIELDS = [
+    f.name for f in Employee._meta.concrete_fields
+    if f.name not in ("id", "client", "codigo", "created_at")
+]
+
+# Filtros de situação da exportação de funcionários: campo da credencial -> parâmetro do SOC
+EMPLOYEE_SITUATION_PARAMS = (
+    ("is_active", "ativo"),
+    ("is_inactive", "inativo"),
+    ("is_away", "afastado"),
+    ("is_pending", "pendente"),
+    ("is_vacation", "ferias"),
+)
+# Códigos por INSERT ao preencher a tabela temporária da reconciliação
+ROSTER_INSERT_BATCH_SIZE = 1000
+_EMPLOYEE_CODE_MAX_LENGTH = Employee._meta.get_field("codigo").max_length
+_EMPLOYEE_COMPANY_MAX_LENGTH = Employee._meta.get_field("codigo_empresa").max_length
+
+# Absenteísmos gravados por comando de upsert
+ABSENCE_BATCH_SIZE = 2000
+# Chave natural do absenteísmo (ver Absence.Meta.constraints)
+ABSENCE_UNIQUE_FIELDS = ["client", "employee", "dt_inicio_atestado", "dt_fim_atestado"]
+ABSENCE_UPDATE_FIELDS = [
+    f.name for f in Absence._meta.concrete_fields
+    if f.name not in ("id", "created_at", *ABSENCE_UNIQUE_FIELDS)
+]
+
 class APIService:
     """Serviço para interação com as APIs externas"""
 
     @staticmethod
-    def sync_employees(user, client, sync_log_id=None):
+    def start_sync(user, client, api_type, company, enqueue):
+        """
+        Inicia uma sincronização de (client, api_type, company) ou, se já há
+        uma em andamento, devolve o SyncLog dela sem criar outra.
+
+        `enqueue(sync_log)` dispara a tarefa e devolve o AsyncResult. Retorna
+        (sync_log, iniciada?). O lock é liberado pela tarefa ao terminar.
+        """
+        lock = SyncLock(client.id, api_type, company)
+        running = lock.running_log()
+        if running is not None:
+            return running, False
+
+        sync_log = SyncLog.objects.create(
+            client=client,
+            user=user,
+            api_type=api_type,
+            company=company,
+            status="error",
+            records_processed=0,
+            records_success=0,
+            records_error=0,
+            start_time=timezone.now(),
+        )
+        if not lock.acquire(sync_log.id):
+            # Outro pedido pegou o lock entre a checagem e a criação do log
+            running = lock.running_log()
+            if running is not None:
+                sync_log.delete()
+                return running, False
+            lock.take_over(sync_log.id)
+
+        try:
+            task = enqueue(sync_log)
+        except Exception:
+            lock.release(sync_log.id)
+            raise
+        sync_log.task_id = task.id
+        sync_log.save(update_fields=["task_id"])
+        return sync_log, True
+
+    @staticmethod
+    def release_sync_lock(sync_log_id):
+        sync_log = SyncLog.objects.filter(id=sync_log_id).only("client_id", "api_type", "company").first()
+        if sync_log is not None:
+            SyncLock.for_log(sync_log).release(sync_log.id)
+
+    @staticmethod
+    def sync_employees(user, client, sync_log_id=None, full=None, fanout=False):
         """
-        Sincroniza dados de funcionários da API externa usando processamento paralelo
+        Sincroniza dados de funcionários da API externa usando upsert em lotes.
+
+        Em modo incremental só chegam à gravação os registros com
+        DATAULTALTERACAO a partir da marca da credencial. `full=None` decide
+        sozinho: faz sincronização completa quando não há marca ou quando a
+        última completa tem mais de EMPLOYEE_FULL_SYNC_INTERVAL_HOURS.
+        Com `fanout`, respostas grandes são divididas em partes processadas
+        por vários workers do Celery (ver _dispatch_chunks).
         """
         credentials = EmployeeCredentials.objects.filter(user=user, client=client).first()
         if not credentials:
@@ -41,60 +143,43 @@ class APIService:
         try:
             # 2) Montar parâmetros e fazer requisição
             params = APIService._build_employee_params(credentials)
-            param_str = json.dumps(params)
-            logger.info(f"Iniciando sincronização de funcionários para empresa {credentials.company}")
+            if full is None:
+                full = APIService._is_full_sync_due(credentials)
+            watermark = None if full else credentials.last_change_watermark
+            logger.info(
+                f"Iniciando sincronização {'completa' if full else 'incremental'} de funcionários "
+                f"para empresa {credentials.company}"
+            )
             APIService._update_sync_log_message(sync_log, "Aguardando resposta da API...")
 
-            url = "https://ws1.soc.com.br/WebSoc/exportadados?parametro="
-            response = requests.get(url=url + param_str, timeout=30)
-
-            # 3) Verificar status da requisição
-            if response.status_code != 200:
-                return APIService._handle_http_error(sync_log, response)
+            with get_soc_client().export(params) as response, PayloadRecorder(sync_log, response) as recorder:
+                # 3) Verificar status da requisição
+                if response.status_code != 200:
+                    return APIService._handle_http_error(sync_log, response)
 
-            response_decode = response.content.decode("latin-1")
-            APIService._update_sync_log_message(sync_log, "Dados recebidos, processando...")
+                APIService._update_sync_log_message(sync_log, "Dados recebidos, processando...")
 
-            # 4) Decodificar JSON
-            try:
-                employees_data = json.loads(response_decode)
-            except json.JSONDecodeError as e:
-                return APIService._handle_json_decode_error(sync_log, e, response_decode)
-
-            # 5) Verificar erro da API ou lista vazia
-            if isinstance(employees_data, dict) and "Error" in employees_data:
-                error_msg = f"Erro da API: {employees_data['Error']}"
-                return APIService._finalize_sync_log(sync_log, "error", error_msg)
-
-            if not employees_data:
-                logger.info(NO_EMPLOYEES_FOUND_MSG)
-                sync_log.status = "success"
-                sync_log.error_message = NO_EMPLOYEES_FOUND_MSG
-                sync_log.end_time = timezone.now()
-                sync_log.save(update_fields=["status", "error_message", "end_time"])
-                return {"success": True, "message": NO_EMPLOYEES_FOUND_MSG}
-
-            # 6) Processar os dados
-            total_records = len(employees_data)
-            logger.info(f"Recebidos {total_records} registros de funcionários")
-            sync_log.records_processed = total_records
-            APIService._update_sync_log_message(
-                sync_log, f"Processando {total_records} registros..."
-            )
+                # 4) Decodificar o JSON em fluxo (guardando a resposta bruta) e processar em lotes
+                employees_data = SOCClient.iter_records(response, tee=recorder.write)
+                result = APIService.process_employee_records(
+                    employees_data, sync_log, client, watermark, fanout=fanout, full=full,
+                    complete_roster=APIService._is_complete_roster(params),
+                )
 
-            # 7) Processamento paralelo
-            result = APIService._process_employees_parallel(
-                employees_data, total_records, sync_log, client
-            )
+            # 5) A marca só avança quando tudo foi gravado sem erro
+            if result.get("total") and sync_log.status == "success":
+                APIService._advance_watermark(credentials, result["watermark"], full)
             return result
 
         except Exception as e:
             return APIService._handle_general_exception(sync_log, e)
 
     @staticmethod
-    def sync_absences(user, client, sync_log_id=None):
+    def sync_absences(user, client, sync_log_id=None, fanout=False, start_date=None, end_date=None):
         """
-        Sincroniza dados de absenteísmo da API externa usando processamento paralelo
+        Sincroniza dados de absenteísmo da API externa usando processamento paralelo.
+        `start_date`/`end_date` substituem o período da credencial (janela
+        móvel das sincronizações agendadas).
         """
         credentials = AbsenceCredentials.objects.filter(user=user, client=client).first()
         if not credentials:
@@ -102,7 +187,17 @@ class APIService:
                 "success": False,
                 "message": "Credenciais não encontradas. Configure suas credenciais na página de configurações."
             }
+        return APIService.sync_absence_period(
+            user, client, credentials, start_date or credentials.start_date, end_date or credentials.end_date,
+            sync_log_id, fanout,
+        )
 
+    @staticmethod
+    def sync_absence_period(user, client, credentials, start_date, end_date, sync_log_id=None, fanout=False):
+        """
+        Sincroniza o absenteísmo de um período específico com as credenciais
+        informadas. O período deve respeitar o limite de dias do SOC.
+        """
         # 1) Recuperar/criar SyncLog
         sync_log = APIService._get_or_create_log(
             sync_log_id, client, user, "absence", credentials.main_company
@@ -116,57 +211,98 @@ class APIService:
                 "chave": credentials.key,
                 "tipoSaida": "json",
                 "empresaTrabalho": credentials.work_company,
-                "dataInicio": credentials.start_date.strftime(DATE_FORMAT_DDMMYYYY),
-                "dataFim": credentials.end_date.strftime(DATE_FORMAT_DDMMYYYY),
+                "dataInicio": start_date.strftime(DATE_FORMAT_DDMMYYYY),
+                "dataFim": end_date.strftime(DATE_FORMAT_DDMMYYYY),
             }
-            logger.info(f"Iniciando sincronização de absenteísmo para empresa {credentials.main_company}")
+            logger.info(
+                f"Iniciando sincronização de absenteísmo para empresa {credentials.main_company} "
+                f"({params['dataInicio']} a {params['dataFim']})"
+            )
             APIService._update_sync_log_message(sync_log, "Aguardando resposta da API...")
 
-            url = "https://ws1.soc.com.br/WebSoc/exportadados?parametro="
-            param_str = json.dumps(params)
-            response = requests.get(url=url + param_str, timeout=30)
+            with get_soc_client().export(params) as response, PayloadRecorder(sync_log, response) as recorder:
+                if response.status_code != 200:
+                    return APIService._handle_http_error(sync_log, response)
 
-            if response.status_code != 200:
-                return APIService._handle_http_error(sync_log, response)
+                APIService._update_sync_log_message(sync_log, "Dados recebidos, processando...")
 
-            response_decode = response.content.decode("latin-1")
-            APIService._update_sync_log_message(sync_log, "Dados recebidos, processando...")
+                # 3) Decodificar o JSON em fluxo (guardando a resposta bruta) e processar em lotes
+                absences_data = SOCClient.iter_records(response, tee=recorder.write)
+                return APIService.process_absence_records(absences_data, sync_log, client, fanout=fanout)
 
-            # 3) Decodificar JSON
-            try:
-                absences_data = json.loads(response_decode)
-            except json.JSONDecodeError as e:
-                return APIService._handle_json_decode_error(sync_log, e, response_decode)
-
-            # 4) Verificar se erro ou lista vazia
-            if isinstance(absences_data, dict) and "Error" in absences_data:
-                error_msg = f"Erro da API: {absences_data['Error']}"
-                return APIService._finalize_sync_log(sync_log, "error", error_msg)
-
-            if not absences_data:
-                logger.info(NO_ABSENCES_FOUND_MSG)
-                sync_log.status = "success"
-                sync_log.error_message = NO_ABSENCES_FOUND_MSG
-                sync_log.end_time = timezone.now()
-                sync_log.save(update_fields=["status", "error_message", "end_time"])
-                return {"success": True, "message": NO_ABSENCES_FOUND_MSG}
-
-            # 5) Preparar e processar
-            total_records = len(absences_data)
-            logger.info(f"Recebidos {total_records} registros de absenteísmo")
-            sync_log.records_processed = total_records
-            APIService._update_sync_log_message(
-                sync_log, f"Processando {total_records} registros..."
+        except Exception as e:
+            return APIService._handle_general_exception(sync_log, e)
+
+    @staticmethod
+    def process_employee_records(employees_data, sync_log, client, watermark=None, fanout=False, full=None,
+                                 complete_roster=False):
+        """
+        Processa registros de funcionários já decodificados (da API ou de um
+        payload gravado) e finaliza o SyncLog. Com `complete_roster` (exportação
+        sem filtro de situação), o quadro do cliente é reconciliado com ela.
+        """
+        try:
+            large, employees_data = APIService._split_if_large(employees_data, fanout)
+            if large:
+                return APIService._dispatch_chunks(employees_data, sync_log, watermark, full, complete_roster)
+            result = APIService._process_employees_bulk(
+                employees_data, sync_log, client, watermark, complete_roster
             )
+        except SOCErrorResponse as e:
+            return APIService._finalize_sync_log(sync_log, "error", f"Erro da API: {e}")
+        except json.JSONDecodeError as e:
+            return APIService._handle_json_decode_error(sync_log, e, e.doc)
 
-            # Pré-carregar funcionários existentes
-            existing_employees = APIService._preload_employees(client, absences_data)
+        # Lista vazia
+        if result["total"] == 0:
+            return APIService._finalize_empty_sync(sync_log, NO_EMPLOYEES_FOUND_MSG)
+        return result
 
-            # 6) Processar em paralelo
-            return APIService._process_absences_parallel(
-                absences_data, total_records, sync_log, client, existing_employees
-            )
+    @staticmethod
+    def process_absence_records(absences_data, sync_log, client, fanout=False):
+        """
+        Processa registros de absenteísmo já decodificados (da API ou de um
+        payload gravado) e finaliza o SyncLog.
+        """
+        try:
+            large, absences_data = APIService._split_if_large(absences_data, fanout)
+            if large:
+                return APIService._dispatch_chunks(absences_data, sync_log)
+            result = APIService._process_absences_parallel(absences_data, sync_log, client)
+        except SOCErrorResponse as e:
+            return APIService._finalize_sync_log(sync_log, "error", f"Erro da API: {e}")
+        except json.JSONDecodeError as e:
+            return APIService._handle_json_decode_error(sync_log, e, e.doc)
+
+        # Lista vazia
+        if result["total"] == 0:
+            return APIService._finalize_empty_sync(sync_log, NO_ABSENCES_FOUND_MSG)
+        return result
+
+    @staticmethod
+    def replay_sync(source_log, client=None, user=None):
+        """
+        Reprocessa o payload gravado de um SyncLog, sem nenhuma chamada ao SOC.
+        Cria um novo SyncLog; `client` permite reprocessar em outro cliente.
+        Os filtros da exportação original não são conhecidos, então o quadro
+        não é reconciliado.
+        """
+        path = payload_path(source_log)
+        if not path.exists():
+            return {"success": False, "message": f"Payload do log {source_log.id} não encontrado em {path}"}
 
+        client = client or source_log.client
+        sync_log = APIService._get_or_create_log(
+            None, client, user or source_log.user, source_log.api_type, source_log.company
+        )
+        APIService._update_sync_log_message(sync_log, f"Reprocessando payload do log {source_log.id}...")
+        logger.info(f"Reprocessando payload do log {source_log.id} ({path})")
+
+        try:
+            records = iter_json_records(iter_payload_chunks(path), encoding="latin-1")
+            if source_log.api_type == "employee":
+                return APIService.process_employee_records(records, sync_log, client)
+            return APIService.process_absence_records(records, sync_log, client)
         except Exception as e:
             return APIService._handle_general_exception(sync_log, e)
 
@@ -176,27 +312,30 @@ class APIService:
 
     @staticmethod
     def _get_or_create_log(sync_log_id, client, user, api_type, company):
+        sync_log = None
         if sync_log_id:
             try:
                 sync_log = SyncLog.objects.get(id=sync_log_id)
                 sync_log.company = company
                 sync_log.save(update_fields=["company"])
-                return sync_log
             except SyncLog.DoesNotExist:
                 pass
 
         # Se não existe, criar
-        return SyncLog.objects.create(
-            client=client,
-            user=user,
-            api_type=api_type,
-            company=company,
-            status="error",
-            records_processed=0,
-            records_success=0,
-            records_error=0,
-            start_time=timezone.now(),
-        )
+        if sync_log is None:
+            sync_log = SyncLog.objects.create(
+                client=client,
+                user=user,
+                api_type=api_type,
+                company=company,
+                status="error",
+                records_processed=0,
+                records_success=0,
+                records_error=0,
+                start_time=timezone.now(),
+            )
+        SyncProgress(sync_log.id).start(sync_log)
+        return sync_log
 
     @staticmethod
     def _build_employee_params(credentials):
@@ -206,22 +345,44 @@ class APIService:
             "chave": credentials.key,
             "tipoSaida": "json",
         }
-        if credentials.is_active:
-            params["ativo"] = "Sim"
-        if credentials.is_inactive:
-            params["inativo"] = "Sim"
-        if credentials.is_away:
-            params["afastado"] = "Sim"
-        if credentials.is_pending:
-            params["pendente"] = "Sim"
-        if credentials.is_vacation:
-            params["ferias"] = "Sim"
+        for field, param in EMPLOYEE_SITUATION_PARAMS:
+            if getattr(credentials, field):
+                params[param] = "Sim"
         return params
 
+    @staticmethod
+    def _is_complete_roster(params):
+        """A exportação traz o quadro inteiro só quando pede todas as situações."""
+        return all(params.get(param) == "Sim" for _, param in EMPLOYEE_SITUATION_PARAMS)
+
+    @staticmethod
+    def _is_full_sync_due(credentials):
+        if not credentials.last_change_watermark or not credentials.last_full_sync_at:
+            return True
+        interval = timedelta(hours=settings.EMPLOYEE_FULL_SYNC_INTERVAL_HOURS)
+        return timezone.now() - credentials.last_full_sync_at >= interval
+
+    @staticmethod
+    def _advance_watermark(credentials, watermark, full):
+        update_fields = []
+        # Datas no futuro (erro de cadastro no SOC) não podem empurrar a marca
+        # além de hoje, senão alterações reais seriam ignoradas até lá.
+        if watermark:
+            watermark = min(watermark, timezone.localdate())
+            if not credentials.last_change_watermark or watermark > credentials.last_change_watermark:
+                credentials.last_change_watermark = watermark
+                update_fields.append("last_change_watermark")
+        if full:
+            credentials.last_full_sync_at = timezone.now()
+            update_fields.append("last_full_sync_at")
+        if update_fields:
+            credentials.save(update_fields=update_fields)
+
     @staticmethod
     def _update_sync_log_message(sync_log, message):
+        """Mensagem de etapa: vai só para o cache de progresso, não para o banco."""
         sync_log.error_message = message
-        sync_log.save(update_fields=["error_message"])
+        SyncProgress(sync_log.id).message(message)
 
     @staticmethod
     def _handle_http_error(sync_log, response):
@@ -230,6 +391,7 @@ class APIService:
         sync_log.error_message = error_message
         sync_log.end_time = timezone.now()
         sync_log.save(update_fields=["error_message", "end_time"])
+        SyncProgress(sync_log.id).clear()
         return {"success": False, "message": error_message}
 
     @staticmethod
@@ -241,7 +403,8 @@ class APIService:
         logger.error(error_message)
         sync_log.error_message = error_message
         sync_log.end_time = timezone.now()
-        sync_log.save(update_fields=["error_message", "end_time"])
+        sync_log.save(update_fields=["error_message", "end_time", *PROGRESS_FIELDS])
+        SyncProgress(sync_log.id).clear()
         return {
             "success": False,
             "message": "Erro ao decodificar resposta da API. Verifique as credenciais.",
@@ -253,9 +416,30 @@ class APIService:
         sync_log.error_message = message
         sync_log.status = status
         sync_log.end_time = timezone.now()
-        sync_log.save(update_fields=["error_message", "status", "end_time"])
+        sync_log.save(update_fields=["error_message", "status", "end_time", *PROGRESS_FIELDS])
+        SyncProgress(sync_log.id).clear()
         return {"success": (False if status == "error" else True), "message": message}
 
+    @staticmethod
+    def _finalize_empty_sync(sync_log, message):
+        logger.info(message)
+        sync_log.status = "success"
+        sync_log.error_message = message
+        sync_log.end_time = timezone.now()
+        sync_log.save(update_fields=["status", "error_message", "end_time"])
+        SyncProgress(sync_log.id).clear()
+        return {"success": True, "message": message}
+
+    @staticmethod
+    def _iter_batches(records, size):
+        """Agrupa um iterável de registros em listas de até `size` itens."""
+        records = iter(records)
+        while True:
+            batch = list(islice(records, size))
+            if not batch:
+                return
+            yield batch
+
     @staticmethod
     def _handle_general_exception(sync_log, exception):
         error_message = f"Erro na sincronização: {str(exception)}"
@@ -263,43 +447,280 @@ class APIService:
         sync_log.error_message = error_message
         sync_log.end_time = timezone.now()
         sync_log.save()
+        SyncProgress(sync_log.id).clear()
         return {"success": False, "message": error_message}
 
+    # ----------------------------
+    # PARTES (FAN-OUT NO CELERY)
+    # ----------------------------
+    @staticmethod
+    def _split_if_large(records, fanout):
+        """
+        Lê no máximo uma parte (SYNC_CHUNK_SIZE + 1 registros, ou o limite de
+        fan-out se for menor) para decidir se a resposta vai para as partes.
+        Retorna (grande?, registros), com os já lidos recolocados à frente do
+        restante do fluxo. O total só é conhecido depois, em _dispatch_chunks.
+        """
+        threshold = settings.SYNC_FANOUT_THRESHOLD
+        if not fanout or threshold <= 0:
+            return False, records
+        lookahead = min(threshold, settings.SYNC_CHUNK_SIZE)
+        records = iter(records)
+        head = list(islice(records, lookahead + 1))
+        return len(head) > lookahead, chain(head, records)
+
+    @staticmethod
+    def _dispatch_chunks(records, sync_log, watermark=None, full=None, complete_roster=False):
+        """
+        Grava a resposta em partes de SYNC_CHUNK_SIZE registros (SyncChunk)
+        conforme ela é lida, sem guardá-la inteira em memória. Acima de
+        SYNC_FANOUT_THRESHOLD registros dispara um chord: uma tarefa por parte,
+        em qualquer worker, e ao fim finalize_sync_chunks_task, que soma as
+        partes no SyncLog. Abaixo do limite as partes são gravadas aqui mesmo.
+        """
+        chunk_ids = []
+        total_records = 0
+        roster = set() if sync_log.api_type == "employee" and complete_roster else None
+        try:
+            for index, batch in enumerate(APIService._iter_batches(records, settings.SYNC_CHUNK_SIZE)):
+                chunk = SyncChunk.objects.create(sync_log=sync_log, index=index, records=batch, size=len(batch))
+                chunk_ids.append(chunk.id)
+                total_records += len(batch)
+                if roster is not None:
+                    roster.update(APIService._roster_keys(batch))
+        except Exception:
+            # Resposta interrompida no meio: nenhuma parte é processada
+            SyncChunk.objects.filter(id__in=chunk_ids).delete()
+            raise
+
+        if roster is not None:
+            # A resposta já foi lida inteira: a reconciliação não depende das partes
+            sync_log.records_missing = APIService._reconcile_roster(sync_log.client, roster)
+            SyncLog.objects.filter(id=sync_log.id).update(records_missing=sync_log.records_missing)
+
+        msg = f"Processando {total_records} registros em {len(chunk_ids)} partes..."
+        APIService._update_sync_log_message(sync_log, msg)
+        logger.info(f"Sincronização {sync_log.id}: {msg}")
+
+        # Tarefas referenciadas pelo nome: tasks.py importa este módulo
+        watermark = watermark.isoformat() if watermark else None
+        if total_records <= settings.SYNC_FANOUT_THRESHOLD:
+            return APIService._process_chunks_inline(chunk_ids, sync_log, watermark, full)
+
+        header = [
+            signature("employees.tasks.process_sync_chunk_task", args=(chunk_id, watermark))
+            for chunk_id in chunk_ids
+        ]
+        callback = signature("employees.tasks.finalize_sync_chunks_task", args=(sync_log.id, full), immutable=True)
+        result = chord(header)(callback)
+        return {
+            "success": True,
+            "deferred": True,
+            "message": msg,
+            "chunks": len(chunk_ids),
+            "task_id": result.id,
+        }
+
+    @staticmethod
+    def _process_chunks_inline(chunk_ids, sync_log, watermark, full):
+        """
+        Grava as partes em sequência na própria tarefa (resposta abaixo do
+        limite de fan-out). Como na última tentativa da tarefa de uma parte,
+        uma parte que falha conta como erro e as demais seguem.
+        """
+        for chunk_id in chunk_ids:
+            try:
+                APIService.process_sync_chunk(chunk_id, watermark)
+            except Exception as e:
+                logger.error(f"Erro ao gravar a parte {chunk_id} da sincronização {sync_log.id}: {e}")
+                APIService.fail_sync_chunk(chunk_id, str(e))
+        return APIService.finalize_sync_chunks(sync_log.id, full)
+
+    @staticmethod
+    def process_sync_chunk(chunk_id, watermark=None):
+        """
+        Grava uma parte. Idempotente: os upserts podem ser repetidos, os
+        contadores da parte são sobrescritos (nunca somados) e uma parte já
+        concluída não é processada nem contada de novo.
+        """
+        chunk = SyncChunk.objects.select_related("sync_log__client").get(id=chunk_id)
+        if chunk.status == "success":
+            return {"success": True, "message": f"Parte {chunk.index} já processada"}
+
+        sync_log = chunk.sync_log
+        if sync_log.end_time:
+            # Sincronização interrompida pelo usuário: as partes restantes são descartadas
+            return {"success": False, "message": f"Sincronização {sync_log.id} já encerrada"}
+        client = sync_log.client
+        records = chunk.records or []
+        latest_change = None
+        if sync_log.api_type == "employee":
+            codes = {str(record["CODIGO"]) for record in records if record.get("CODIGO")}
+            _, counts, latest_change = APIService._run_employee_batches(
+                records, sync_log, client, parse_date(watermark),
+                APIService._load_employee_digests(client, codes), track_progress=False,
+            )
+        else:
+            _, success_records, error_records = APIService._run_absence_batches(
+                records, sync_log, client, track_progress=False
+            )
+            counts = Counter(success=success_records, error=error_records)
+
+        # O filtro por status garante que só a primeira execução concluída conta
+        updated = SyncChunk.objects.filter(id=chunk.id).exclude(status="success").update(
+            status="success",
+            records=None,
+            attempts=F("attempts") + 1,
+            records_success=counts["success"],
+            records_error=counts["error"],
+            records_inserted=counts["inserted"],
+            records_updated=counts["updated"],
+            records_unchanged=counts["unchanged"],
+            latest_change=latest_change,
+            error_message=None,
+            finished_at=timezone.now(),
+        )
+        if updated:
+            SyncProgress(sync_log.id).add(
+                processed=chunk.size, success=counts["success"], error=counts["error"]
+            )
+        return {
+            "success": True,
+            "message": f"Parte {chunk.index}: Sucesso: {counts['success']}, Erros: {counts['error']}",
+        }
+
+    @staticmethod
+    def fail_sync_chunk(chunk_id, message):
+        """Marca a parte como erro depois da última tentativa; seus registros contam como erros."""
+        chunk = SyncChunk.objects.get(id=chunk_id)
+        updated = SyncChunk.objects.filter(id=chunk.id, status="pending").update(
+            status="error",
+            attempts=F("attempts") + 1,
+            records_success=0,
+            records_error=chunk.size,
+            error_message=message,
+            finished_at=timezone.now(),
+        )
+        if updated:
+            SyncProgress(chunk.sync_log_id).add(processed=chunk.size, error=chunk.size)
+
+    @staticmethod
+    def finalize_sync_chunks(sync_log_id, full=None):
+        """Soma as partes no SyncLog, avança a marca incremental e finaliza a sincronização."""
+        sync_log = SyncLog.objects.select_related("client", "user").get(id=sync_log_id)
+        if sync_log.end_time:
+            sync_log.chunks.all().delete()
+            return {"success": False, "message": f"Sincronização {sync_log.id} já encerrada"}
+        totals = sync_log.chunks.aggregate(
+            processed=Sum("size"),
+            success=Sum("records_success"),
+            error=Sum("records_error"),
+            inserted=Sum("records_inserted"),
+            updated=Sum("records_updated"),
+            unchanged=Sum("records_unchanged"),
+            latest_change=Max("latest_change"),
+        )
+        counts = Counter({key: value or 0 for key, value in totals.items() if key != "latest_change"})
+        total_records = counts.pop("processed")
+        # Partes pendentes (tarefa perdida) também contam como erro
+        counts["error"] += sync_log.chunks.filter(status="pending").aggregate(total=Sum("size"))["total"] or 0
+
+        if sync_log.api_type == "employee":
+            result = APIService._finalize_employee_sync(sync_log, total_records, counts, totals["latest_change"])
+            if sync_log.status == "success":
+                credentials = EmployeeCredentials.objects.filter(user=sync_log.user, client=sync_log.client).first()
+                if credentials:
+                    APIService._advance_watermark(credentials, totals["latest_change"], full)
+        else:
+            result = APIService._finalize_absence_sync(
+                sync_log, total_records, counts["success"], counts["error"]
+            )
+
+        # Partes com erro ficam guardadas, com os registros, para análise
+        sync_log.chunks.filter(status="success").delete()
+        return result
+
     # ----------------------------
     # EMPLOYEES PROCESSING
     # ----------------------------
     @staticmethod
-    def _process_employees_parallel(employees_data, total_records, sync_log, client):
-        success_records = 0
-        error_records = 0
-        processed_count = 0
-        last_update_percent = 0
+    def _process_employees_bulk(employees_data, sync_log, client, watermark=None, complete_roster=False):
+        # codigo -> digest do que está gravado hoje, carregado uma única vez
+        digests = APIService._load_employee_digests(client)
+        roster = set() if complete_roster else None
+        total_records, counts, latest_change = APIService._run_employee_batches(
+            employees_data, sync_log, client, watermark, digests, roster=roster
+        )
+        if total_records == 0:
+            # Resposta vazia não é um retrato do quadro: ninguém é marcado como ausente
+            return {"success": True, "total": 0}
+        if roster is not None:
+            sync_log.records_missing = APIService._reconcile_roster(client, roster)
+        return APIService._finalize_employee_sync(sync_log, total_records, counts, latest_change)
 
-        with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
-            func = partial(APIService._process_single_employee, client=client)
-            futures = [executor.submit(func, data) for data in employees_data]
+    @staticmethod
+    def _run_employee_batches(employees_data, sync_log, client, watermark, digests, track_progress=True,
+                              roster=None):
+        """
+        Grava os funcionários pelo pipeline em estágios. Retorna (total
+        recebido, Counter de resultados, maior DATAULTALTERACAO recebida).
+        Com `roster`, acrescenta nele as chaves (codigo, empresa) de todos os
+        registros recebidos, inclusive os que não precisaram ser gravados.
+        """
+        counts = Counter()
+        total_records = 0
+        # Maior DATAULTALTERACAO recebida, candidata à próxima marca incremental
+        latest_change = None
+        # `digests` é lido pelos mapeadores e atualizado pelos gravadores
+        digests_lock = threading.Lock()
+
+        def map_batch(batch):
+            batch_latest, changed = APIService._filter_by_watermark(batch, watermark)
+            codes = {code for code, _ in APIService._roster_keys(changed)}
+            with digests_lock:
+                known = {code: digests[code] for code in codes if code in digests}
+            batch_counts, pending = APIService._prepare_employee_batch(changed, known)
+            # Registros anteriores à marca não mudaram desde a última sincronização
+            skipped = len(batch) - len(changed)
+            batch_counts["success"] += skipped
+            batch_counts["unchanged"] += skipped
+            keys = APIService._roster_keys(batch) if roster is not None else None
+            return len(batch), batch_latest, batch_counts, pending, keys
+
+        def write_batch(mapped):
+            size, batch_latest, batch_counts, pending, keys = mapped
+            write_counts, saved = APIService._write_employee_batch(pending, client)
+            batch_counts.update(write_counts)
+            with digests_lock:
+                digests.update(saved)
+            return size, batch_latest, batch_counts, keys
+
+        def on_result(result):
+            nonlocal total_records, latest_change
+            size, batch_latest, batch_counts, keys = result
+            total_records += size
+            counts.update(batch_counts)
+            if keys:
+                roster.update(keys)
+            if batch_latest and (latest_change is None or batch_latest > latest_change):
+                latest_change = batch_latest
+            if track_progress:
+                APIService._update_progress(sync_log, total_records, counts["success"], counts["error"])
 
-            for future in concurrent.futures.as_completed(futures):
-                ok = False
-                try:
-                    ok = future.result()
-                except Exception as exc:
-                    logger.error(f"Erro ao processar funcionário: {exc}")
+        try:
+            StagedPipeline(map_batch, write_batch, on_result, name=f"sync-{sync_log.id}").run(
+                APIService._iter_batches(employees_data, EMPLOYEE_BATCH_SIZE)
+            )
+        finally:
+            # O quadro do dashboard muda com o que foi gravado, mesmo se o fluxo falhar no meio
+            if counts["inserted"] or counts["updated"]:
+                bump_dashboard_version(client.id)
+        return total_records, counts, latest_change
 
-                if ok:
-                    success_records += 1
-                else:
-                    error_records += 1
-
-                processed_count += 1
-                last_update_percent = APIService._maybe_update_progress(
-                    sync_log,
-                    processed_count,
-                    total_records,
-                    success_records,
-                    error_records,
-                    last_update_percent,
-                )
+    @staticmethod
+    def _finalize_employee_sync(sync_log, total_records, counts, latest_change):
+        success_records = counts["success"]
+        error_records = counts["error"]
 
         # Transformamos a condicional aninhada em if/elif/else:
         if error_records == 0:
@@ -312,14 +733,20 @@ class APIService:
         sync_log.records_processed = total_records
         sync_log.records_success = success_records
         sync_log.records_error = error_records
+        sync_log.records_inserted = counts["inserted"]
+        sync_log.records_updated = counts["updated"]
+        sync_log.records_unchanged = counts["unchanged"]
         sync_log.status = final_status
         sync_log.error_message = None
         sync_log.end_time = timezone.now()
         sync_log.save()
+        SyncProgress(sync_log.id).clear()
 
         result_msg = (
             f"Sincronização concluída. Processados: {total_records}, "
-            f"Sucesso: {success_records}, Erros: {error_records}"
+            f"Sucesso: {success_records}, Erros: {error_records} "
+            f"(Inseridos: {counts['inserted']}, Atualizados: {counts['updated']}, "
+            f"Sem alteração: {counts['unchanged']}, Ausentes da exportação: {sync_log.records_missing})"
         )
         logger.info(result_msg)
         return {
@@ -328,130 +755,258 @@ class APIService:
             "total": total_records,
             "success_count": success_records,
             "error_count": error_records,
+            "inserted_count": counts["inserted"],
+            "updated_count": counts["updated"],
+            "unchanged_count": counts["unchanged"],
+            "missing_count": sync_log.records_missing,
+            "watermark": latest_change,
         }
 
     @staticmethod
-    def _process_single_employee(employee_data, client):
-        """Processa um único funcionário."""
-        if not employee_data.get("CODIGO"):
-            logger.warning(f"Funcionário sem código, ignorando: {employee_data}")
-            return False
+    def _roster_keys(batch):
+        """Chaves (codigo, empresa) dos registros de um lote, truncadas como no mapeamento."""
+        keys = []
+        for employee_data in batch:
+            codigo = employee_data.get("CODIGO")
+            if not codigo:
+                continue
+            company = employee_data.get("CODIGOEMPRESA")
+            keys.append((
+                str(codigo)[:_EMPLOYEE_CODE_MAX_LENGTH],
+                "" if company is None else str(company)[:_EMPLOYEE_COMPANY_MAX_LENGTH],
+            ))
+        return keys
 
-        employee_dict = APIService._map_employee(employee_data)
-        try:
-            Employee.objects.update_or_create(
-                client=client,
-                codigo=employee_dict["codigo"],
-                defaults=employee_dict,
+    @staticmethod
+    def _reconcile_roster(client, roster):
+        """
+        Compara o quadro recebido numa exportação completa (todas as
+        situações pedidas, ver _is_complete_roster) com o banco.
+
+        Os códigos recebidos vão para uma tabela temporária e dois UPDATEs
+        resolvem tudo: marcam missing_since nos funcionários das empresas
+        recebidas que não vieram (genéricos ficam de fora) e limpam a marca
+        dos que voltaram. Retorna quantos passaram a ficar ausentes.
+        """
+        codes = sorted({codigo for codigo, _ in roster})
+        companies = sorted({company for _, company in roster if company})
+        if not codes or not companies:
+            return 0
+
+        employee_table = connection.ops.quote_name(Employee._meta.db_table)
+        company_params = ", ".join(["%s"] * len(companies))
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE TEMPORARY TABLE roster_codes (codigo varchar({_EMPLOYEE_CODE_MAX_LENGTH}) PRIMARY KEY)"
             )
-            return True
-        except Exception as e:
-            logger.error(f"Erro ao processar funcionário: {e}")
-            return False
+            try:
+                for start in range(0, len(codes), ROSTER_INSERT_BATCH_SIZE):
+                    batch = codes[start:start + ROSTER_INSERT_BATCH_SIZE]
+                    values = ", ".join(["(%s)"] * len(batch))
+                    cursor.execute(f"INSERT INTO roster_codes (codigo) VALUES {values}", batch)
+
+                cursor.execute(f"""
+                    UPDATE {employee_table} SET missing_since = %s
+                    WHERE client_id = %s
+                      AND missing_since IS NULL
+                      AND situacao <> %s
+                      AND codigo_empresa IN ({company_params})
+                      AND NOT EXISTS (SELECT 1 FROM roster_codes r WHERE r.codigo = {employee_table}.codigo)
+                """, [timezone.now(), client.id, PLACEHOLDER_SITUACAO, *companies])
+                missing = cursor.rowcount
+                cursor.execute(f"""
+                    UPDATE {employee_table} SET missing_since = NULL
+                    WHERE client_id = %s
+                      AND missing_since IS NOT NULL
+                      AND EXISTS (SELECT 1 FROM roster_codes r WHERE r.codigo = {employee_table}.codigo)
+                """, [client.id])
+                returned = cursor.rowcount
+            finally:
+                cursor.execute("DROP TABLE roster_codes")
+
+        if missing or returned:
+            bump_dashboard_version(client.id)
+            logger.info(
+                f"Reconciliação do quadro do cliente {client.id}: {missing} ausentes da exportação, "
+                f"{returned} de volta"
+            )
+        return missing
 
     @staticmethod
-    def _map_employee(employee_data):
-        """Monta o dicionário de campos do modelo Employee."""
-        return {
-            "codigo_empresa": employee_data.get("CODIGOEMPRESA"),
-            "nome_empresa": employee_data.get("NOMEEMPRESA"),
-            "codigo": employee_data.get("CODIGO"),
-            "nome": employee_data.get("NOME")
-            or f"Sem Nome ({employee_data.get('CODIGO')})",
-            "codigo_unidade": employee_data.get("CODIGOUNIDADE"),
-            "nome_unidade": employee_data.get("NOMEUNIDADE"),
-            "codigo_setor": employee_data.get("CODIGOSETOR"),
-            "nome_setor": employee_data.get("NOMESETOR"),
-            "codigo_cargo": employee_data.get("CODIGOCARGO"),
-            "nome_cargo": employee_data.get("NOMECARGO"),
-            "cbo_cargo": employee_data.get("CBOCARGO"),
-            "ccusto": employee_data.get("CCUSTO"),
-            "nome_centro_custo": employee_data.get("NOMECENTROCUSTO"),
-            "matricula_funcionario": employee_data.get("MATRICULAFUNCIONARIO"),
-            "cpf": employee_data.get("CPF"),
-            "rg": employee_data.get("RG"),
-            "uf_rg": employee_data.get("UFRG"),
-            "orgao_emissor_rg": employee_data.get("ORGAOEMISSORRG"),
-            "situacao": employee_data.get("SITUACAO"),
-            "sexo": APIService._parse_int(employee_data.get("SEXO")),
-            "pis": employee_data.get("PIS"),
-            "ctps": employee_data.get("CTPS"),
-            "serie_ctps": employee_data.get("SERIECTPS"),
-            "estado_civil": APIService._parse_int(employee_data.get("ESTADOCIVIL")),
-            "tipo_contratacao": APIService._parse_int(employee_data.get("TIPOCONTATACAO")),
-            "data_nascimento": APIService._parse_date(employee_data.get("DATA_NASCIMENTO")),
-            "data_admissao": APIService._parse_date(employee_data.get("DATA_ADMISSAO")),
-            "data_demissao": APIService._parse_date(employee_data.get("DATA_DEMISSAO")),
-            "endereco": employee_data.get("ENDERECO"),
-            "numero_endereco": employee_data.get("NUMERO_ENDERECO"),
-            "bairro": employee_data.get("BAIRRO"),
-            "cidade": employee_data.get("CIDADE"),
-            "uf": employee_data.get("UF"),
-            "cep": employee_data.get("CEP"),
-            "telefone_residencial": employee_data.get("TELEFONERESIDENCIAL"),
-            "telefone_celular": employee_data.get("TELEFONECELULAR"),
-            "email": employee_data.get("EMAIL"),
-            "deficiente": APIService._parse_int(employee_data.get("DEFICIENTE")),
-            "deficiencia": employee_data.get("DEFICIENCIA"),
-            "nome_mae": employee_data.get("NM_MAE_FUNCIONARIO"),
-            "data_ultima_alteracao": APIService._parse_date(employee_data.get("DATAULTALTERACAO")),
-            "matricula_rh": employee_data.get("MATRICULARH"),
-            "cor": APIService._parse_int(employee_data.get("COR")),
-            "escolaridade": APIService._parse_int(employee_data.get("ESCOLARIDADE")),
-            "naturalidade": employee_data.get("NATURALIDADE"),
-            "ramal": employee_data.get("RAMAL"),
-            "regime_revezamento": APIService._parse_int(employee_data.get("REGIMEREVEZAMENTO")),
-            "regime_trabalho": employee_data.get("REGIMETRABALHO"),
-            "tel_comercial": employee_data.get("TELCOMERCIAL"),
-            "turno_trabalho": APIService._parse_int(employee_data.get("TURNOTRABALHO")),
-            "rh_unidade": employee_data.get("RHUNIDADE"),
-            "rh_setor": employee_data.get("RHSETOR"),
-            "rh_cargo": employee_data.get("RHCARGO"),
-            "rh_centro_custo_unidade": employee_data.get("RHCENTROCUSTOUNIDADE"),
-        }
+    def _load_employee_digests(client, codes=None):
+        """Mapa codigo -> content_hash dos funcionários do cliente (todos, ou só `codes`)."""
+        employees = Employee.objects.filter(client=client)
+        if codes is not None:
+            employees = employees.filter(codigo__in=list(codes))
+        return dict(employees.values_list("codigo", "content_hash"))
 
     @staticmethod
-    def _maybe_update_progress(
-        sync_log, processed_count, total_records, success_records, error_records, last_update
-    ):
-        """Atualiza o progresso no sync_log a cada 5% ou no fim."""
-        if total_records == 0:
-            return last_update
-        current_percent = (processed_count / total_records) * 100
-
-        if current_percent - last_update >= 5 or processed_count == total_records:
-            last_update = current_percent
-            sync_log.records_processed = total_records
-            sync_log.records_success = success_records
-            sync_log.records_error = error_records
-            sync_log.error_message = (
-                f"Processando: {processed_count}/{total_records} registros "
-                f"({round(current_percent)}%)"
-            )
-            sync_log.save(update_fields=["records_processed","records_success","records_error","error_message"])
-        return last_update
+    def _employee_digest(employee_dict):
+        """Digest compacto (128 bits) dos campos mapeados de um funcionário."""
+        payload = repr(tuple(employee_dict.values())).encode("utf-8")
+        return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+    @staticmethod
+    def _filter_by_watermark(batch, watermark):
+        """
+        Retorna (maior DATAULTALTERACAO do lote, registros a gravar).
+
+        Sem marca, todos os registros seguem. Com marca, ficam de fora os
+        alterados antes dela; os do próprio dia da marca seguem, porque a data
+        não tem hora e o dia pode ter recebido alterações depois da última
+        sincronização. Registros sem data sempre seguem.
+        """
+        latest = None
+        changed = []
+        for employee_data in batch:
+            changed_at = parse_date(employee_data.get("DATAULTALTERACAO"))
+            if changed_at is not None and (latest is None or changed_at > latest):
+                latest = changed_at
+            if watermark is None or changed_at is None or changed_at >= watermark:
+                changed.append(employee_data)
+        return latest, changed
+
+    @staticmethod
+    def _prepare_employee_batch(batch, digests):
+        """
+        Mapeia e valida um lote (sem acesso ao banco). Retorna o Counter dos
+        registros já resolvidos (erros e sem alteração) e o dict
+        codigo -> (campos, tipos de alteração) do que precisa ser gravado.
+        """
+        counts = Counter()
+        # codigo -> (campos mapeados, tipo de alteração de cada registro recebido)
+        pending = {}
+        for employee_data in batch:
+            if not employee_data.get("CODIGO"):
+                logger.warning(f"Funcionário sem código, ignorando: {employee_data}")
+                counts["error"] += 1
+                continue
+            employee_dict = map_employee(employee_data)
+            employee_dict["content_hash"] = APIService._employee_digest(employee_dict)
+            codigo = str(employee_dict["codigo"])
+
+            if codigo in pending:
+                # Códigos repetidos no mesmo lote: prevalece o último, como no update_or_create
+                pending[codigo] = (employee_dict, pending[codigo][1] + ["updated"])
+            elif digests.get(codigo) == employee_dict["content_hash"]:
+                counts["unchanged"] += 1
+                counts["success"] += 1
+            else:
+                pending[codigo] = (employee_dict, ["updated" if codigo in digests else "inserted"])
+        return counts, pending
+
+    @staticmethod
+    def _write_employee_batch(pending, client):
+        """
+        Grava o que `_prepare_employee_batch` separou. Retorna o Counter do
+        lote e o dict codigo -> digest do que foi gravado.
+        """
+        counts = Counter()
+        if not pending:
+            return counts, {}
+
+        try:
+            with transaction.atomic():
+                Employee.objects.bulk_create(
+                    [Employee(client=client, **employee_dict) for employee_dict, _ in pending.values()],
+                    update_conflicts=True,
+                    unique_fields=["client", "codigo"],
+                    update_fields=EMPLOYEE_UPDATE_FIELDS,
+                )
+            saved = pending
+        except Exception as e:
+            # Um registro inválido derruba o lote inteiro; reprocessa um a um
+            # para isolar as falhas e manter a contagem por registro.
+            logger.error(f"Erro no upsert em lote de funcionários, reprocessando individualmente: {e}")
+            saved = {}
+            for codigo, (employee_dict, kinds) in pending.items():
+                try:
+                    Employee.objects.update_or_create(
+                        client=client, codigo=employee_dict["codigo"], defaults=employee_dict
+                    )
+                    saved[codigo] = (employee_dict, kinds)
+                except Exception as exc:
+                    logger.error(f"Erro ao processar funcionário: {exc}")
+                    counts["error"] += len(kinds)
+
+        for employee_dict, kinds in saved.values():
+            counts.update(kinds)
+            counts["success"] += len(kinds)
+        return counts, {codigo: employee_dict["content_hash"] for codigo, (employee_dict, _) in saved.items()}
+
+    @staticmethod
+    def _update_progress(sync_log, processed_count, success_records, error_records):
+        """
+        Atualiza o progresso ao fim de cada lote gravado: incrementa os
+        contadores no cache e mantém os totais no objeto em memória, que só
+        vai para o banco na finalização.
+        """
+        SyncProgress(sync_log.id).add(
+            processed=processed_count - sync_log.records_processed,
+            success=success_records - sync_log.records_success,
+            error=error_records - sync_log.records_error,
+        )
+        sync_log.records_processed = processed_count
+        sync_log.records_success = success_records
+        sync_log.records_error = error_records
 
     # ----------------------------
     # ABSENCES PROCESSING
     # ----------------------------
     @staticmethod
-    def _preload_employees(client, absences_data):
-        """Pré-carrega funcionários com base em matrículas presentes nos absences."""
-        matriculas = {a.get("MATRICULA_FUNC") for a in absences_data if a.get("MATRICULA_FUNC")}
-        if not matriculas:
-            return {}
-        employees_qs = Employee.objects.filter(client=client, matricula_funcionario__in=list(matriculas))
-        return {emp.matricula_funcionario: emp for emp in employees_qs}
+    def _process_absences_parallel(absences_data, sync_log, client):
+        total_records, success_records, error_records = APIService._run_absence_batches(
+            absences_data, sync_log, client
+        )
+        if total_records == 0:
+            return {"success": True, "total": 0}
+        return APIService._finalize_absence_sync(sync_log, total_records, success_records, error_records)
 
     @staticmethod
-    def _process_absences_parallel(absences_data, total_records, sync_log, client, existing_employees):
-        with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
-            func = partial(APIService._process_single_absence, client=client, existing_employees=existing_employees)
-            results = list(executor.map(func, absences_data))
+    def _run_absence_batches(absences_data, sync_log, client, track_progress=True):
+        """
+        Grava os absenteísmos pelo pipeline em estágios e atualiza o resumo do
+        dashboard nos meses gravados. Retorna (total, sucessos, erros).
+        """
+        success_records = 0
+        error_records = 0
+        total_records = 0
+        # Meses com absenteísmos gravados, reagregados ao fim (mesmo se o fluxo falhar no meio)
+        touched_months = set()
+        # Funcionários do cliente, carregados uma vez para todo o payload
+        employee_index = EmployeeIndex(client)
+
+        def map_batch(batch):
+            prepared = [APIService._prepare_absence(absence_data) for absence_data in batch]
+            for absence_dict, employee_id in zip(prepared, employee_index.resolve(prepared)):
+                if absence_dict is not None:
+                    absence_dict["employee_id"] = employee_id
+            return prepared
+
+        def write_batch(prepared):
+            batch_success, batch_error = APIService._upsert_absence_batch(prepared, client)
+            return len(prepared), batch_success, batch_error, absence_months(prepared)
+
+        def on_result(result):
+            nonlocal success_records, error_records, total_records
+            size, batch_success, batch_error, months = result
+            touched_months.update(months)
+            success_records += batch_success
+            error_records += batch_error
+            total_records += size
+            if track_progress:
+                APIService._update_progress(sync_log, total_records, success_records, error_records)
 
-        success_records = sum(1 for r in results if r)
-        error_records = total_records - success_records
+        try:
+            StagedPipeline(map_batch, write_batch, on_result, name=f"sync-{sync_log.id}").run(
+                APIService._iter_batches(absences_data, ABSENCE_BATCH_SIZE)
+            )
+        finally:
+            refresh_absence_rollups(client.id, touched_months)
+        return total_records, success_records, error_records
 
+    @staticmethod
+    def _finalize_absence_sync(sync_log, total_records, success_records, error_records):
         # Ao invés do ternário aninhado, utilizamos if/elif/else
         if error_records == 0:
             final_status = "success"
@@ -467,6 +1022,7 @@ class APIService:
         sync_log.error_message = None
         sync_log.end_time = timezone.now()
         sync_log.save()
+        SyncProgress(sync_log.id).clear()
 
         msg = (
             f"Sincronização concluída. Processados: {total_records}, "
@@ -482,75 +1038,73 @@ class APIService:
         }
 
     @staticmethod
-    def _process_single_absence(absence_data, client, existing_employees):
+    def _prepare_absence(absence_data):
+        """Mapeia os campos do absenteísmo; retorna None se o registro for inválido."""
         try:
-            # Encontrar ou criar funcionário
-            employee = APIService._find_or_create_employee_for_absence(client, absence_data, existing_employees)
-            absence_dict = APIService._map_absence_fields(absence_data, employee)
+            absence_dict = map_absence(absence_data)
 
             # Checar datas obrigatórias
             if not absence_dict["dt_inicio_atestado"] or not absence_dict["dt_fim_atestado"]:
                 logger.warning(f"Absenteísmo sem datas obrigatórias: {absence_data}")
-                return False
+                return None
 
-            return APIService._update_or_create_absence(client, employee, absence_dict, absence_data)
+            return absence_dict
         except Exception as e:
             logger.error(f"Erro ao processar absenteísmo: {e}")
-            return False
+            return None
 
     @staticmethod
-    def _find_or_create_employee_for_absence(client, absence_data, existing_employees):
-        matricula = absence_data.get("MATRICULA_FUNC")
-        employee = None
-        if matricula:
-            employee = existing_employees.get(matricula)
-            if not employee:
-                employee = Employee.objects.filter(client=client, matricula_funcionario=matricula).first()
-
-        if employee:
-            return employee
-
-        # Se não encontrou, criar genérico
-        sem_matricula_code = f"SEM_MATRICULA_{hash(str(absence_data))}"
-        identifier = matricula or str(abs(hash(str(absence_data)) % 10000))
-        logger.info(f"Criando funcionário genérico para matrícula: {identifier}")
+    def _upsert_absence_batch(prepared, client):
+        """
+        Grava um lote de absenteísmos com um único INSERT ... ON CONFLICT
+        sobre a chave natural. Retorna a tupla (sucessos, erros).
+        """
+        instances = {}
+        error_records = 0
+        for absence_dict in prepared:
+            if absence_dict is None:
+                error_records += 1
+                continue
+            key = (
+                absence_dict["employee_id"],
+                absence_dict["dt_inicio_atestado"],
+                absence_dict["dt_fim_atestado"],
+            )
+            # O ON CONFLICT não aceita a mesma chave duas vezes no mesmo comando
+            instances[key] = Absence(client=client, **absence_dict)
 
-        new_emp = Employee.objects.create(
-            client=client,
-            codigo=sem_matricula_code[:20],
-            nome=f"Sem Matrícula ({identifier})",
-            situacao="GENERICO",
-        )
-        existing_employees[matricula] = new_emp
-        return new_emp
+        if not instances:
+            return 0, error_records
 
-    @staticmethod
-    def _map_absence_fields(absence_data, employee):
-        return {
-            "unidade": absence_data.get("UNIDADE"),
-            "setor": absence_data.get("SETOR"),
-            "matricula_func": absence_data.get("MATRICULA_FUNC"),
-            "dt_nascimento": APIService._parse_date(absence_data.get("DT_NASCIMENTO")),
-            "sexo": APIService._parse_int(absence_data.get("SEXO")),
-            "tipo_atestado": APIService._parse_int(absence_data.get("TIPO_ATESTADO")),
-            "dt_inicio_atestado": APIService._parse_date(absence_data.get("DT_INICIO_ATESTADO")),
-            "dt_fim_atestado": APIService._parse_date(absence_data.get("DT_FIM_ATESTADO")),
-            "hora_inicio_atestado": absence_data.get("HORA_INICIO_ATESTADO"),
-            "hora_fim_atestado": absence_data.get("HORA_FIM_ATESTADO"),
-            "dias_afastados": APIService._parse_int(absence_data.get("DIAS_AFASTADOS")),
-            "horas_afastado": absence_data.get("HORAS_AFASTADO"),
-            "cid_principal": absence_data.get("CID_PRINCIPAL"),
-            "descricao_cid": absence_data.get("DESCRICAO_CID"),
-            "grupo_patologico": absence_data.get("GRUPO_PATOLOGICO"),
-            "tipo_licenca": absence_data.get("TIPO_LICENCA"),
-            "employee": employee,
-        }
+        try:
+            with transaction.atomic():
+                Absence.objects.bulk_create(
+                    list(instances.values()),
+                    update_conflicts=True,
+                    unique_fields=ABSENCE_UNIQUE_FIELDS,
+                    update_fields=ABSENCE_UPDATE_FIELDS,
+                )
+            return len(prepared) - error_records, error_records
+        except Exception as e:
+            logger.error(f"Erro no upsert em lote de absenteísmo, reprocessando individualmente: {e}")
+            success_records = 0
+            for absence_dict in prepared:
+                if absence_dict is None:
+                    continue
+                try:
+                    if APIService._update_or_create_absence(
+                        client, absence_dict["employee_id"], absence_dict, absence_dict
+                    ):
+                        success_records += 1
+                except Exception as exc:
+                    logger.error(f"Erro ao processar absenteísmo: {exc}")
+            return success_records, len(prepared) - success_records
 
     @staticmethod
-    def _update_or_create_absence(client, employee, absence_dict, raw_data):
+    def _update_or_create_absence(client, employee_id, absence_dict, raw_data):
         unique_fields = {
             "client": client,
-            "employee": employee,
+            "employee_id": employee_id,
             "dt_inicio_atestado": absence_dict["dt_inicio_atestado"],
             "dt_fim_atestado": absence_dict["dt_fim_atestado"],
         }
@@ -566,32 +1120,3 @@ class APIService:
             defaults=absence_dict
         )
         return True
-
-    # ----------------------------
-    # PARSE HELPERS
-    # ----------------------------
-    @staticmethod
-    def _parse_date(date_str):
-        """Converte string de data para objeto date"""
-        if not date_str:
-            return None
-        try:
-            return datetime.strptime(date_str, DATE_FORMAT_DDMMYYYY).date()
-        except ValueError:
-            try:
-                # Tentar formato alternativo
-                return datetime.strptime(date_str, "%Y-%m-%d").date()
-            except ValueError:
-                logger.warning(f"Formato de data inválido: {date_str}")
-                return None
-
-    @staticmethod
-    def _parse_int(int_str):
-        """Converte string para inteiro"""
-        if not int_str:
-            return None
-        try:
-            return int(int_str)
-        except ValueError:
-            logger.warning(f"Formato de número inválido: {int_str}")
-            return None
@@ -0,0 +1,101 @@
+"""
+Cliente HTTP do web service exportadados do SOC.
+
+Todas as chamadas passam por uma sessão requests compartilhada no processo:
+conexões keep-alive em pool, timeouts de conexão/leitura separados, retry com
+backoff exponencial e jitter para falhas transitórias e resposta gzip.
+"""
+import json
+import logging
+import threading
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .streaming import iter_json_records
+
+logger = logging.getLogger(__name__)
+
+# Respostas tratadas como transitórias (o SOC devolve 503 sob carga)
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# Tamanho dos blocos lidos do corpo da resposta
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+class SOCClient:
+    """Sessão HTTP reutilizável para o exportadados do SOC."""
+
+    def __init__(self, base_url=None, connect_timeout=None, read_timeout=None,
+                 max_retries=None, backoff_factor=None, backoff_jitter=None, pool_maxsize=None):
+        self.base_url = base_url or settings.SOC_EXPORT_URL
+        self.timeout = (
+            connect_timeout or settings.SOC_CONNECT_TIMEOUT,
+            read_timeout or settings.SOC_READ_TIMEOUT,
+        )
+        retry = Retry(
+            total=settings.SOC_MAX_RETRIES if max_retries is None else max_retries,
+            backoff_factor=settings.SOC_BACKOFF_FACTOR if backoff_factor is None else backoff_factor,
+            backoff_jitter=settings.SOC_BACKOFF_JITTER if backoff_jitter is None else backoff_jitter,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset(["GET"]),
+            respect_retry_after_header=True,
+            # Esgotadas as tentativas, devolve a última resposta para o chamador tratar o status
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=pool_maxsize or settings.SOC_POOL_MAXSIZE,
+            max_retries=retry,
+        )
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            "Accept": "application/json",
+            "Accept-Encoding": "gzip, deflate",
+        })
+
+    def export(self, params):
+        """
+        Faz o GET no exportadados com os parâmetros informados.
+
+        A resposta é devolvida em modo stream; use-a como context manager
+        para devolver a conexão ao pool.
+        """
+        return self.session.get(
+            self.base_url,
+            params={"parametro": json.dumps(params)},
+            timeout=self.timeout,
+            stream=True,
+        )
+
+    @staticmethod
+    def iter_records(response, encoding="latin-1", tee=None):
+        """
+        Gera os registros do corpo da resposta conforme os blocos chegam.
+        `tee`, se informado, recebe cada bloco de bytes antes do parser.
+        """
+        chunks = response.iter_content(chunk_size=STREAM_CHUNK_SIZE)
+        if tee is not None:
+            chunks = map(tee, chunks)
+        yield from iter_json_records(chunks, encoding=encoding)
+        # O parser para no "]": o resto do corpo (fim do chunked) precisa ser
+        # lido para a conexão voltar ao pool em vez de ser descartada
+        for _ in chunks:
+            pass
+
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+
+def get_soc_client():
+    """Cliente compartilhado pelo processo (mantém o pool de conexões entre syncs)."""
+    global _default_client
+    if _default_client is None:
+        with _default_client_lock:
+            if _default_client is None:
+                _default_client = SOCClient()
+    return _default_client
@@ -0,0 +1,119 @@
+"""
+Leitura incremental das respostas JSON do exportadados do SOC.
+
+O SOC devolve uma lista JSON (latin-1) com um objeto por registro. Em vez de
+carregar o corpo inteiro, decodificá-lo e só então chamar json.loads, os
+registros são extraídos um a um conforme os blocos de bytes chegam.
+"""
+import codecs
+import json
+
+_JSON_DECODER = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+_NUMBER_CHARS = "0123456789.eE+-"
+# Acima deste deslocamento o texto já consumido é descartado do buffer
+_COMPACT_THRESHOLD = 64 * 1024
+
+
+class SOCErrorResponse(Exception):
+    """A API respondeu com um objeto {"Error": ...} em vez da lista de registros."""
+
+
+class _ChunkReader:
+    """Buffer de texto alimentado sob demanda a partir de blocos de bytes."""
+
+    def __init__(self, chunks, encoding):
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder(encoding)()
+        self.buffer = ""
+        self.pos = 0
+        self.exhausted = False
+
+    def read_more(self):
+        """Acrescenta o próximo bloco ao buffer; retorna False no fim do corpo."""
+        if self.exhausted:
+            return False
+        for chunk in self._chunks:
+            if not chunk:
+                continue
+            if self.pos > _COMPACT_THRESHOLD:
+                self.buffer = self.buffer[self.pos:]
+                self.pos = 0
+            self.buffer += self._decoder.decode(chunk)
+            return True
+        self.buffer += self._decoder.decode(b"", final=True)
+        self.exhausted = True
+        return False
+
+    def peek(self):
+        """Retorna o próximo caractere significativo sem consumi-lo (None no fim)."""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.read_more():
+                return None
+
+    def decode_value(self):
+        """Decodifica o próximo valor JSON completo, lendo mais blocos se preciso."""
+        self.peek()
+        while True:
+            try:
+                value, end = _JSON_DECODER.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self.read_more():
+                    continue
+                raise
+            # Um valor terminando exatamente no fim do buffer pode estar truncado
+            # (números e literais não têm delimitador final); um número seguido
+            # só de caracteres numéricos parou num prefixo válido ("5." ou "1e").
+            if self._may_continue(value, end) and self.read_more():
+                continue
+            self.pos = end
+            return value
+
+    def _may_continue(self, value, end):
+        if end == len(self.buffer):
+            return True
+        is_number = isinstance(value, (int, float)) and not isinstance(value, bool)
+        return is_number and not self.buffer[end:].strip(_NUMBER_CHARS)
+
+    def error(self, message):
+        return json.JSONDecodeError(message, self.buffer, self.pos)
+
+
+def iter_json_records(chunks, encoding="latin-1"):
+    """
+    Gera os registros de uma resposta do exportadados a partir de blocos de bytes.
+
+    Levanta SOCErrorResponse quando a API devolve {"Error": ...} e
+    json.JSONDecodeError quando o corpo não é um JSON válido.
+    """
+    reader = _ChunkReader(chunks, encoding)
+    char = reader.peek()
+    if char is None:
+        return
+
+    if char == "{":
+        payload = reader.decode_value()
+        if "Error" in payload:
+            raise SOCErrorResponse(payload["Error"])
+        yield payload
+        return
+
+    if char != "[":
+        raise reader.error("Esperado '[' no início da resposta")
+    reader.pos += 1
+
+    if reader.peek() == "]":
+        return
+    while True:
+        yield reader.decode_value()
+        char = reader.peek()
+        if char == ",":
+            reader.pos += 1
+        elif char == "]":
+            return
+        else:
+            raise reader.error("Esperado ',' ou ']' entre os registros")
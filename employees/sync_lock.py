@@ -0,0 +1,101 @@
+"""
+Exclusão mútua das sincronizações por (cliente, tipo de API, empresa).
+
+O lock é uma chave com o id do SyncLog em andamento, criada só se não
+existir (SET NX, atômico no Redis). Um novo pedido enquanto o lock existe
+não cria outra sincronização: recebe o SyncLog em andamento e passa a
+acompanhá-lo. A tarefa libera o lock ao terminar; um lock cujo SyncLog já
+foi encerrado (worker derrubado, por exemplo) é tratado como abandonado.
+
+Com o cache no Redis, o lock usa uma conexão redis-py própria com o mesmo
+servidor, e o valor é o id em texto puro (sem o serializador do cache). A
+liberação compara o dono e apaga a chave num único script Lua: com get
+seguido de delete, um lock que expirou e foi retomado por outra
+sincronização entre as duas chamadas seria apagado por engano. Sem Redis
+(desenvolvimento), o lock fica no cache local do processo.
+"""
+from functools import lru_cache
+
+import redis
+from django.conf import settings
+from django.core.cache import cache
+
+from api_config.models import SyncLog
+
+_REDIS_BACKEND = "django.core.cache.backends.redis.RedisCache"
+
+_RELEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+@lru_cache(maxsize=None)
+def _redis_client(location):
+    return redis.Redis.from_url(location)
+
+
+def _lock_client():
+    """Cliente Redis dos locks, ou None quando o cache não está no Redis."""
+    config = settings.CACHES["default"]
+    if config["BACKEND"] != _REDIS_BACKEND:
+        return None
+    location = config["LOCATION"]
+    if isinstance(location, str):
+        location = location.split(",")
+    # Como no cache do Django, as escritas vão para o primeiro servidor
+    return _redis_client(location[0])
+
+
+class SyncLock:
+    def __init__(self, client_id, api_type, company):
+        self.key = f"sync-lock:{client_id}:{api_type}:{company}"
+
+    @classmethod
+    def for_log(cls, sync_log):
+        return cls(sync_log.client_id, sync_log.api_type, sync_log.company)
+
+    def acquire(self, sync_log_id):
+        """Tenta ficar com o lock; False se outra sincronização já o tem."""
+        client = _lock_client()
+        if client is None:
+            return cache.add(self.key, sync_log_id, settings.SYNC_LOCK_TTL)
+        return bool(client.set(self.key, str(sync_log_id), nx=True, ex=settings.SYNC_LOCK_TTL))
+
+    def take_over(self, sync_log_id):
+        """Assume um lock abandonado."""
+        client = _lock_client()
+        if client is None:
+            cache.set(self.key, sync_log_id, settings.SYNC_LOCK_TTL)
+        else:
+            client.set(self.key, str(sync_log_id), ex=settings.SYNC_LOCK_TTL)
+
+    def owner(self):
+        """Id do SyncLog dono do lock, ou None."""
+        client = _lock_client()
+        if client is None:
+            return cache.get(self.key)
+        value = client.get(self.key)
+        return int(value) if value is not None else None
+
+    def running_log(self):
+        """SyncLog da sincronização em andamento, ou None (descartando lock abandonado)."""
+        sync_log_id = self.owner()
+        if sync_log_id is None:
+            return None
+        sync_log = SyncLog.objects.filter(id=sync_log_id, end_time__isnull=True).first()
+        if sync_log is None:
+            self.release(sync_log_id)
+        return sync_log
+
+    def release(self, sync_log_id):
+        """Libera o lock, se ainda pertencer a esta sincronização."""
+        client = _lock_client()
+        if client is None:
+            # Cache local ao processo: não há outro processo disputando
+            if cache.get(self.key) == sync_log_id:
+                cache.delete(self.key)
+            return
+        client.eval(_RELEASE_SCRIPT, 1, self.key, str(sync_log_id))
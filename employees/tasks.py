@@ -1,25 +1,30 @@
 import logging
+from datetime import date
 from celery import shared_task
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 from clients.models import Client
-from api_config.models import SyncLog
+from api_config.models import SyncLog, BackfillJob
 from .services import APIService
+from .backfill import BackfillService
+from .scheduler import SyncScheduler
+from .progress import SyncProgress
 
 User = get_user_model()
 logger = logging.getLogger(__name__)
 
 @shared_task
-def sync_employees_task(user_id, client_id, sync_log_id=None):
-    """Task for async employee synchronization"""
-    logger.info(f"Starting employee sync: user={user_id}, client={client_id}, log={sync_log_id}")
-    
+def sync_employees_task(user_id, client_id, sync_log_id=None, full=None):
+    """Task for async employee synchronization (full=None lets the service pick incremental or full)"""
+    logger.info(f"Starting employee sync: user={user_id}, client={client_id}, log={sync_log_id}, full={full}")
+    result = None
     try:
         user = User.objects.get(id=user_id)
         client = Client.objects.get(id=client_id)
         
         # Call sync service with the log ID
-        result = APIService.sync_employees(user, client, sync_log_id)
+        result = APIService.sync_employees(user, client, sync_log_id, full, fanout=True)
         
         logger.info(f"Employee sync completed: {result}")
         return result
@@ -35,6 +40,7 @@ def sync_employees_task(user_id, client_id, sync_log_id=None):
                 sync_log.end_time = timezone.now()
                 sync_log.status = 'error'
                 sync_log.save()
+                SyncProgress(sync_log.id).clear()
             except Exception as log_error:
                 logger.error(f"Error updating log: {str(log_error)}")
                 
@@ -43,17 +49,27 @@ def sync_employees_task(user_id, client_id, sync_log_id=None):
             "message": f"Error in synchronization: {str(e)}"
         }
 
+    finally:
+        _release_sync_lock(sync_log_id, result)
+
 @shared_task
-def sync_absences_task(user_id, client_id, sync_log_id=None):
-    """Task for async absence synchronization"""
-    logger.info(f"Starting absence sync: user={user_id}, client={client_id}, log={sync_log_id}")
-    
+def sync_absences_task(user_id, client_id, sync_log_id=None, start_date=None, end_date=None):
+    """Task for async absence synchronization (ISO start/end dates override the credentials' period)"""
+    logger.info(
+        f"Starting absence sync: user={user_id}, client={client_id}, log={sync_log_id}, "
+        f"period={start_date or 'credentials'}..{end_date or 'credentials'}"
+    )
+    result = None
     try:
         user = User.objects.get(id=user_id)
         client = Client.objects.get(id=client_id)
         
         # Call sync service with the log ID
-        result = APIService.sync_absences(user, client, sync_log_id)
+        result = APIService.sync_absences(
+            user, client, sync_log_id, fanout=True,
+            start_date=date.fromisoformat(start_date) if start_date else None,
+            end_date=date.fromisoformat(end_date) if end_date else None,
+        )
         
         logger.info(f"Absence sync completed: {result}")
         return result
@@ -69,10 +85,108 @@ def sync_absences_task(user_id, client_id, sync_log_id=None):
                 sync_log.end_time = timezone.now()
                 sync_log.status = 'error'
                 sync_log.save()
+                SyncProgress(sync_log.id).clear()
             except Exception as log_error:
                 logger.error(f"Error updating log: {str(log_error)}")
                 
         return {
             "success": False,
             "message": f"Error in synchronization: {str(e)}"
-        }
\ No newline at end of file
+        }
+
+    finally:
+        _release_sync_lock(sync_log_id, result)
+
+
+def _release_sync_lock(sync_log_id, result):
+    """Frees the (client, api_type, company) lock, unless the sync went on as chunk tasks"""
+    if not sync_log_id or (result or {}).get("deferred"):
+        return
+    try:
+        APIService.release_sync_lock(sync_log_id)
+    except Exception as e:
+        logger.error(f"Error releasing sync lock: {str(e)}")
+
+
+@shared_task(bind=True)
+def process_sync_chunk_task(self, chunk_id, watermark=None):
+    """Task that writes one chunk of a large sync; part of the chord built by APIService._dispatch_chunks"""
+    logger.info(f"Processing sync chunk: chunk={chunk_id}")
+    try:
+        return APIService.process_sync_chunk(chunk_id, watermark)
+    except Exception as e:
+        if self.request.retries < settings.SYNC_CHUNK_MAX_RETRIES:
+            logger.warning(f"Error in sync chunk {chunk_id}, retrying: {str(e)}")
+            raise self.retry(exc=e, countdown=2 ** self.request.retries * 10)
+
+        # Never fail the chord: the callback must still run and close the SyncLog
+        logger.error(f"Error in sync chunk {chunk_id}, giving up: {str(e)}")
+        APIService.fail_sync_chunk(chunk_id, f"Error in synchronization: {str(e)}")
+        return {
+            "success": False,
+            "message": f"Error in synchronization: {str(e)}"
+        }
+
+
+@shared_task
+def finalize_sync_chunks_task(sync_log_id, full=None):
+    """Chord callback that aggregates the chunk counts into the SyncLog"""
+    logger.info(f"Finalizing chunked sync: log={sync_log_id}")
+    try:
+        result = APIService.finalize_sync_chunks(sync_log_id, full)
+        logger.info(f"Chunked sync completed: {result}")
+        return result
+    except Exception as e:
+        logger.error(f"Error finalizing chunked sync: {str(e)}")
+        SyncLog.objects.filter(id=sync_log_id).update(
+            error_message=f"Error in synchronization: {str(e)}", end_time=timezone.now(), status='error'
+        )
+        SyncProgress(sync_log_id).clear()
+        return {
+            "success": False,
+            "message": f"Error in synchronization: {str(e)}"
+        }
+    finally:
+        _release_sync_lock(sync_log_id, None)
+
+
+@shared_task
+def schedule_syncs_task():
+    """Periodic task (Celery beat) that starts the due scheduled syncs"""
+    result = SyncScheduler.run_once()
+    if result["started"] or result["deferred"]:
+        logger.info(f"Sync scheduler: {result}")
+    return result
+
+
+@shared_task
+def run_backfill_job_task(job_id):
+    """Task that runs the pending and failed windows of an absence backfill job"""
+    logger.info(f"Starting absence backfill: job={job_id}")
+    try:
+        result = BackfillService.run_job(job_id)
+        logger.info(f"Absence backfill completed: {result}")
+        return result
+    except Exception as e:
+        logger.error(f"Error in absence backfill task: {str(e)}")
+        BackfillJob.objects.filter(id=job_id).update(status='error', finished_at=timezone.now())
+        return {
+            "success": False,
+            "message": f"Error in backfill: {str(e)}"
+        }
+
+
+@shared_task
+def retry_backfill_window_task(window_id):
+    """Task that re-runs a single window of an absence backfill job"""
+    logger.info(f"Retrying absence backfill window: window={window_id}")
+    try:
+        result = BackfillService.retry_window(window_id)
+        logger.info(f"Absence backfill window completed: {result}")
+        return result
+    except Exception as e:
+        logger.error(f"Error in absence backfill window task: {str(e)}")
+        return {
+            "success": False,
+            "message": f"Error in backfill: {str(e)}"
+        }
@@ -1,3 +1,1227 @@
-from django.test import TestCase
+import datetime
+import gzip
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import User
+from api_config.models import ABSENCE_MAX_PERIOD_DAYS, AbsenceCredentials, EmployeeCredentials, SyncChunk, SyncLog
+from clients.models import Client
+from .backfill import BackfillService, split_windows
+from .charts import CHARTS, chart_json
+from .dashboard import (
+    DashboardData, build_dashboard, bump_dashboard_version, cached_dashboard, cached_period, dashboard_period,
+    dashboard_version, period_key,
+)
+from .management.commands._soc_stub import SOCStubServer
+from .identity import PLACEHOLDER_SITUACAO, EmployeeIndex, merge_placeholder_employees, placeholder_code
+from .mapping import map_absence, parse_date, parse_int
+from .models import Absence, AbsenceRollup, Employee
+from .payload_store import PAYLOAD_SUFFIX, iter_payload_chunks, payload_path, prune_payloads
+from .pipeline import StagedPipeline
+from .progress import SyncProgress
+from .rollups import refresh_absence_rollups
+from .scheduler import SyncScheduler, absence_window
+from .services import APIService
+from .soc_client import SOCClient, get_soc_client
+from .streaming import SOCErrorResponse, iter_json_records
+from .sync_lock import SyncLock
+
+
+def employee_record(codigo, **fields):
+    record = {
+        "CODIGOEMPRESA": "1001",
+        "NOMEEMPRESA": "EMPRESA TESTE",
+        "CODIGO": str(codigo),
+        "NOME": f"FUNCIONARIO {codigo}",
+        "MATRICULAFUNCIONARIO": f"M{codigo}",
+        "SITUACAO": "Ativo",
+        "SEXO": "1",
+        "DATAULTALTERACAO": "01/03/2024",
+    }
+    record.update(fields)
+    return record
+
+
+def absence_record(**fields):
+    record = {
+        "UNIDADE": "MATRIZ",
+        "SETOR": "PRODUCAO",
+        "MATRICULA_FUNC": "",
+        "DT_NASCIMENTO": "01/01/1980",
+        "SEXO": "1",
+        "TIPO_ATESTADO": "1",
+        "DT_INICIO_ATESTADO": "01/03/2024",
+        "DT_FIM_ATESTADO": "03/03/2024",
+        "DIAS_AFASTADOS": "3",
+        "CID_PRINCIPAL": "J11",
+        "GRUPO_PATOLOGICO": "RESPIRATORIO",
+    }
+    record.update(fields)
+    return record
+
+
+class FakeResponse:
+    """
+    Resposta HTTP do SOC com o corpo em blocos, usada como context manager
+    como a real. Como no requests, o corpo só pode ser lido uma vez; com
+    `broken_after`, a conexão cai depois desse número de blocos.
+    """
+
+    def __init__(self, records, chunk_size=64, status_code=200, broken_after=None):
+        self.body = json.dumps(records, ensure_ascii=False).encode("latin-1")
+        self.chunk_size = chunk_size
+        self.status_code = status_code
+        self.broken_after = broken_after
+        self.encoding = "latin-1"
+        self.text = self.body.decode("latin-1")
+        self._sent = 0
+        self._consumed = False
+
+    def iter_content(self, chunk_size=None):
+        if self._consumed:
+            raise requests.exceptions.StreamConsumedError()
+        while self._sent < len(self.body):
+            if self.broken_after is not None and self._sent >= self.broken_after * self.chunk_size:
+                raise requests.exceptions.ChunkedEncodingError("Connection broken")
+            chunk = self.body[self._sent:self._sent + self.chunk_size]
+            self._sent += len(chunk)
+            yield chunk
+        self._consumed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class SyncTestMixin:
+    """Cliente, usuário e SyncLog para exercitar o serviço de sincronização."""
+
+    def setUp(self):
+        super().setUp()
+        self.client_obj = Client.objects.create(name="Cliente Teste", subdomain=f"teste-{self.id()[-40:]}")
+        self.user = User.objects.create_user(
+            f"{self.client_obj.subdomain}@example.com", "Usuário Teste", "Analista", client=self.client_obj
+        )
+
+    def new_sync_log(self, api_type):
+        return SyncLog.objects.create(
+            client=self.client_obj, user=self.user, api_type=api_type, company="1001",
+            status="error", start_time=timezone.now(),
+        )
+
+    def sync_employees(self, records, **kwargs):
+        return APIService.process_employee_records(records, self.new_sync_log("employee"), self.client_obj, **kwargs)
+
+    def sync_absences(self, records):
+        return APIService.process_absence_records(records, self.new_sync_log("absence"), self.client_obj)
+
+
+class PlaceholderIdentityTests(TestCase):
+    def test_same_record_gets_same_code(self):
+        self.assertEqual(
+            placeholder_code(map_absence(absence_record())), placeholder_code(map_absence(absence_record()))
+        )
+
+    def test_distinct_anonymous_records_get_distinct_codes(self):
+        first = placeholder_code(map_absence(absence_record()))
+        self.assertNotEqual(first, placeholder_code(map_absence(absence_record(CID_PRINCIPAL="M54"))))
+        self.assertNotEqual(first, placeholder_code(map_absence(absence_record(DT_INICIO_ATESTADO="02/03/2024"))))
+
+    def test_blank_records_differing_only_in_period_get_distinct_codes(self):
+        blank = {key: "" for key in absence_record()}
+        first = dict(blank, DT_INICIO_ATESTADO="01/03/2024", DT_FIM_ATESTADO="01/03/2024")
+        second = dict(blank, DT_INICIO_ATESTADO="05/03/2024", DT_FIM_ATESTADO="05/03/2024")
+        self.assertNotEqual(placeholder_code(map_absence(first)), placeholder_code(map_absence(second)))
+
+    def test_matricula_identifies_placeholder(self):
+        self.assertEqual(
+            placeholder_code(map_absence(absence_record(MATRICULA_FUNC="123", CID_PRINCIPAL="J11"))),
+            placeholder_code(map_absence(absence_record(MATRICULA_FUNC="123", CID_PRINCIPAL="M54"))),
+        )
+
+
+class AnonymousAbsenceSyncTests(SyncTestMixin, TransactionTestCase):
+    def test_distinct_anonymous_absences_for_same_period_survive(self):
+        result = self.sync_absences([absence_record(), absence_record(CID_PRINCIPAL="M54")])
+
+        self.assertTrue(result["success"])
+        self.assertEqual(Absence.objects.filter(client=self.client_obj).count(), 2)
+        self.assertEqual(
+            set(Absence.objects.filter(client=self.client_obj).values_list("cid_principal", flat=True)),
+            {"J11", "M54"},
+        )
+
+    def test_blank_anonymous_absences_survive(self):
+        blank = {key: "" for key in absence_record()}
+        records = [
+            dict(blank, DT_INICIO_ATESTADO="01/03/2024", DT_FIM_ATESTADO="01/03/2024"),
+            dict(blank, DT_INICIO_ATESTADO="05/03/2024", DT_FIM_ATESTADO="05/03/2024"),
+        ]
+        self.sync_absences(records)
+        self.assertEqual(Absence.objects.filter(client=self.client_obj).count(), 2)
+
+    def test_resent_anonymous_absence_is_not_duplicated(self):
+        self.sync_absences([absence_record()])
+        self.sync_absences([absence_record()])
+
+        self.assertEqual(Absence.objects.filter(client=self.client_obj).count(), 1)
+        self.assertEqual(Employee.objects.filter(client=self.client_obj, situacao=PLACEHOLDER_SITUACAO).count(), 1)
+
+    def test_absence_with_matricula_uses_real_employee(self):
+        employee = Employee.objects.create(
+            client=self.client_obj, codigo="1", nome="Funcionário", matricula_funcionario="123"
+        )
+        self.sync_absences([absence_record(MATRICULA_FUNC="123")])
+
+        self.assertEqual(Absence.objects.get(client=self.client_obj).employee_id, employee.id)
+        self.assertFalse(Employee.objects.filter(client=self.client_obj, situacao=PLACEHOLDER_SITUACAO).exists())
+
+
+class MergePlaceholderTests(SyncTestMixin, TransactionTestCase):
+    def placeholder(self, codigo, matricula=""):
+        return Employee.objects.create(
+            client=self.client_obj, codigo=codigo, nome=f"Sem Matrícula ({codigo})",
+            matricula_funcionario=matricula, situacao=PLACEHOLDER_SITUACAO,
+        )
+
+    def absence(self, employee, start, **fields):
+        mapped = map_absence(absence_record(**fields))
+        mapped.update(dt_inicio_atestado=start, dt_fim_atestado=start, employee_id=employee.id)
+        return Absence.objects.create(client=self.client_obj, **mapped)
+
+    def test_moves_placeholder_absences_to_real_employee(self):
+        real = Employee.objects.create(
+            client=self.client_obj, codigo="1", nome="Funcionário", matricula_funcionario="123"
+        )
+        old = self.placeholder("SEM_MATRICULA_1", "123")
+        kept = self.absence(real, datetime.date(2024, 3, 1), MATRICULA_FUNC="123")
+        colliding = self.absence(old, datetime.date(2024, 3, 1), MATRICULA_FUNC="123")
+        moved = self.absence(old, datetime.date(2024, 4, 1), MATRICULA_FUNC="123")
+
+        summary = merge_placeholder_employees(self.client_obj.id)
+
+        self.assertEqual(summary["merged"], 1)
+        self.assertEqual(summary["absences_dropped"], 1)
+        self.assertFalse(Employee.objects.filter(id=old.id).exists())
+        self.assertEqual(
+            set(Absence.objects.filter(employee=real).values_list("id", flat=True)), {kept.id, moved.id}
+        )
+        self.assertFalse(Absence.objects.filter(id=colliding.id).exists())
+
+    def test_duplicate_placeholders_collapse_into_canonical(self):
+        first = self.placeholder("SEM_MATRICULA_1")
+        second = self.placeholder("SEM_MATRICULA_2")
+        self.absence(first, datetime.date(2024, 3, 1))
+        newest = self.absence(second, datetime.date(2024, 3, 1))
+
+        summary = merge_placeholder_employees(self.client_obj.id)
+
+        self.assertEqual(summary["created"], 1)
+        self.assertEqual(summary["absences_dropped"], 1)
+        absence = Absence.objects.get(client=self.client_obj)
+        self.assertEqual(absence.id, newest.id)
+        self.assertEqual(absence.employee.codigo, placeholder_code(map_absence(absence_record(
+            DT_INICIO_ATESTADO="01/03/2024", DT_FIM_ATESTADO="01/03/2024",
+        ))))
+        self.assertEqual(Employee.objects.filter(client=self.client_obj).count(), 1)
+
+    def test_distinct_anonymous_absences_are_not_merged(self):
+        first = self.placeholder("SEM_MATRICULA_1")
+        second = self.placeholder("SEM_MATRICULA_2")
+        self.absence(first, datetime.date(2024, 3, 1), CID_PRINCIPAL="J11")
+        self.absence(second, datetime.date(2024, 3, 1), CID_PRINCIPAL="M54")
+
+        summary = merge_placeholder_employees(self.client_obj.id)
+
+        self.assertEqual(summary["absences_dropped"], 0)
+        self.assertEqual(Absence.objects.filter(client=self.client_obj).count(), 2)
+        self.assertEqual(
+            Absence.objects.filter(client=self.client_obj).values("employee").distinct().count(), 2
+        )
+
+    def test_dry_run_changes_nothing(self):
+        first = self.placeholder("SEM_MATRICULA_1")
+        self.absence(first, datetime.date(2024, 3, 1))
+        self.placeholder("SEM_MATRICULA_ORFAO")
+
+        summary = merge_placeholder_employees(self.client_obj.id, dry_run=True)
+
+        self.assertEqual(summary["merged"], 1)
+        self.assertEqual(summary["orphans"], 1)
+        self.assertEqual(Employee.objects.filter(client=self.client_obj).count(), 2)
+        self.assertEqual(Absence.objects.get(client=self.client_obj).employee_id, first.id)
+
+
+class RosterReconciliationTests(SyncTestMixin, TransactionTestCase):
+    ALL_SITUATIONS = dict(is_active=True, is_inactive=True, is_away=True, is_pending=True, is_vacation=True)
+
+    def credentials(self, **flags):
+        return EmployeeCredentials(client=self.client_obj, user=self.user, company="1001", code="c", key="k", **flags)
+
+    def missing_codes(self):
+        return set(
+            Employee.objects.filter(client=self.client_obj, missing_since__isnull=False).values_list("codigo", flat=True)
+        )
+
+    def test_complete_roster_requires_every_situation(self):
+        self.assertTrue(APIService._is_complete_roster(
+            APIService._build_employee_params(self.credentials(**self.ALL_SITUATIONS))
+        ))
+        self.assertFalse(APIService._is_complete_roster(
+            APIService._build_employee_params(self.credentials(is_active=True))
+        ))
+
+    def test_complete_export_marks_and_clears_missing_employees(self):
+        self.sync_employees([employee_record(1), employee_record(2)], complete_roster=True)
+
+        result = self.sync_employees([employee_record(1)], complete_roster=True)
+        self.assertEqual(result["missing_count"], 1)
+        self.assertEqual(self.missing_codes(), {"2"})
+
+        self.sync_employees([employee_record(1), employee_record(2)], complete_roster=True)
+        self.assertEqual(self.missing_codes(), set())
+
+    def test_filtered_export_marks_nobody(self):
+        self.sync_employees([employee_record(1), employee_record(2, SITUACAO="Férias")], complete_roster=True)
+
+        # Credencial que só pede ativos: quem está de férias não vem, mas continua no quadro
+        result = self.sync_employees([employee_record(1)])
+        self.assertEqual(result["missing_count"], 0)
+        self.assertEqual(self.missing_codes(), set())
+
+    def test_empty_export_marks_nobody(self):
+        self.sync_employees([employee_record(1)], complete_roster=True)
+        self.sync_employees([], complete_roster=True)
+        self.assertEqual(self.missing_codes(), set())
+
+    def test_sync_reconciles_only_unfiltered_exports(self):
+        self.sync_employees([employee_record(1), employee_record(2)], complete_roster=True)
+        for flags, expected in ((dict(is_active=True), set()), (self.ALL_SITUATIONS, {"2"})):
+            credentials = self.credentials(**flags)
+            credentials.save()
+            with mock.patch("employees.services.get_soc_client") as soc:
+                soc.return_value.export.return_value = FakeResponse([employee_record(1)])
+                APIService.sync_employees(self.user, self.client_obj, full=True)
+            credentials.delete()
+            self.assertEqual(self.missing_codes(), expected)
+
+
+class WatermarkTests(SyncTestMixin, TransactionTestCase):
+    WATERMARK = datetime.date(2024, 3, 10)
+
+    def setUp(self):
+        super().setUp()
+        self.credentials = EmployeeCredentials.objects.create(
+            client=self.client_obj, user=self.user, company="1001", code="c", key="k", is_active=True,
+            last_change_watermark=self.WATERMARK, last_full_sync_at=timezone.now(),
+        )
+
+    def run_sync(self, records, full=None, response=None):
+        with mock.patch("employees.services.get_soc_client") as soc:
+            soc.return_value.export.return_value = response or FakeResponse(records)
+            result = APIService.sync_employees(self.user, self.client_obj, full=full)
+        self.credentials.refresh_from_db()
+        return result
+
+    def names(self):
+        return dict(Employee.objects.filter(client=self.client_obj).values_list("codigo", "nome"))
+
+    def test_filter_keeps_watermark_day_and_undated_records(self):
+        batch = [
+            employee_record(1, DATAULTALTERACAO="09/03/2024"),
+            employee_record(2, DATAULTALTERACAO="10/03/2024"),
+            employee_record(3, DATAULTALTERACAO=""),
+            employee_record(4, DATAULTALTERACAO="12/03/2024"),
+        ]
+        latest, changed = APIService._filter_by_watermark(batch, self.WATERMARK)
+        self.assertEqual(latest, datetime.date(2024, 3, 12))
+        self.assertEqual([record["CODIGO"] for record in changed], ["2", "3", "4"])
+        self.assertEqual(APIService._filter_by_watermark(batch, None)[1], batch)
+
+    def test_incremental_sync_skips_old_records_and_advances(self):
+        self.sync_employees([employee_record(1)])
+        result = self.run_sync([
+            employee_record(1, NOME="NAO GRAVAR", DATAULTALTERACAO="09/03/2024"),
+            employee_record(2, DATAULTALTERACAO="15/03/2024"),
+        ])
+
+        self.assertEqual(result["total"], 2)
+        self.assertEqual(self.names(), {"1": "FUNCIONARIO 1", "2": "FUNCIONARIO 2"})
+        self.assertEqual(self.credentials.last_change_watermark, datetime.date(2024, 3, 15))
+
+    def test_run_with_errors_keeps_watermark(self):
+        result = self.run_sync([
+            employee_record(2, DATAULTALTERACAO="15/03/2024"),
+            employee_record("", DATAULTALTERACAO="16/03/2024"),
+        ])
+        self.assertEqual(result["error_count"], 1)
+        self.assertEqual(self.credentials.last_change_watermark, self.WATERMARK)
+
+    def test_interrupted_response_keeps_watermark(self):
+        response = FakeResponse([employee_record(2, DATAULTALTERACAO="15/03/2024")])
+        response.body = response.body[:-20]
+        self.run_sync(None, response=response)
+        self.assertEqual(self.credentials.last_change_watermark, self.WATERMARK)
+        self.assertEqual(SyncLog.objects.get(client=self.client_obj).status, "error")
+
+    def test_future_change_date_is_clamped_to_today(self):
+        self.run_sync([employee_record(2, DATAULTALTERACAO="01/01/2099")])
+        self.assertEqual(self.credentials.last_change_watermark, timezone.localdate())
+
+    def test_full_sync_due_when_interval_elapsed(self):
+        self.assertFalse(APIService._is_full_sync_due(self.credentials))
+        self.assertTrue(APIService._is_full_sync_due(EmployeeCredentials(last_full_sync_at=timezone.now())))
+
+        hours = settings.EMPLOYEE_FULL_SYNC_INTERVAL_HOURS
+        self.credentials.last_full_sync_at = timezone.now() - datetime.timedelta(hours=hours, minutes=1)
+        self.credentials.save()
+        self.assertTrue(APIService._is_full_sync_due(self.credentials))
+
+        # Completa: grava também o que está abaixo da marca e renova last_full_sync_at
+        self.run_sync([employee_record(1, DATAULTALTERACAO="01/01/2024")])
+        self.assertEqual(self.names(), {"1": "FUNCIONARIO 1"})
+        self.assertGreater(self.credentials.last_full_sync_at, timezone.now() - datetime.timedelta(minutes=1))
+        self.assertEqual(self.credentials.last_change_watermark, self.WATERMARK)
+
+
+@override_settings(DASHBOARD_CACHE_TTL=3600, DASHBOARD_CUSTOM_PERIOD_CACHE_TTL=60)
+class DashboardCacheTests(TestCase):
+    def cached_timeout(self, start, end):
+        with mock.patch("employees.dashboard.cache") as cache:
+            cache.get.side_effect = lambda key: 1 if key.startswith("dashboard-version:") else None
+            cached_period(1, "page", start, end, lambda: {"total": 1})
+        (key, value, timeout), _ = cache.set.call_args
+        return key, timeout
+
+    def test_default_period_gets_long_ttl(self):
+        key, timeout = self.cached_timeout(*dashboard_period({}))
+        self.assertEqual(timeout, 3600)
+        self.assertTrue(key.startswith("dashboard:1:1:page:"))
+
+    def test_custom_period_expires_quickly(self):
+        _, timeout = self.cached_timeout(datetime.date(2020, 1, 1), datetime.date(2020, 6, 30))
+        self.assertEqual(timeout, 60)
+
+    def test_bump_invalidates_cached_value(self):
+        calls = []
+        build = lambda: calls.append(1) or len(calls)
+        self.assertEqual(cached_dashboard(99, "x", build), 1)
+        self.assertEqual(cached_dashboard(99, "x", build), 1)
+        bump_dashboard_version(99)
+        self.assertEqual(cached_dashboard(99, "x", build), 2)
+
+
+class DashboardPeriodTests(SimpleTestCase):
+    def test_period_is_rounded_to_whole_months(self):
+        self.assertEqual(
+            dashboard_period({"start_date": "2024-03-15", "end_date": "2024-03-20"}),
+            (datetime.date(2024, 3, 1), datetime.date(2024, 3, 31)),
+        )
+        self.assertEqual(
+            dashboard_period({"start_date": "2023-12", "end_date": "2024-02"}),
+            (datetime.date(2023, 12, 1), datetime.date(2024, 2, 29)),
+        )
+
+    def test_missing_or_invalid_dates_fall_back_to_default_period(self):
+        today = datetime.date(2024, 2, 10)
+        with mock.patch("employees.dashboard.timezone.localdate", return_value=today):
+            self.assertEqual(dashboard_period({}), (datetime.date(2023, 11, 1), datetime.date(2024, 2, 29)))
+            self.assertEqual(
+                dashboard_period({"start_date": "2024-13", "end_date": "ontem"}),
+                (datetime.date(2023, 11, 1), datetime.date(2024, 2, 29)),
+            )
+            self.assertEqual(dashboard_period({"end_date": "2024-12-01"})[1], datetime.date(2024, 12, 31))
+
+
+class DashboardPageTests(SyncTestMixin, TestCase):
+    def test_page_shows_the_whole_months_applied(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("dashboard"), {"start_date": "2024-03-15", "end_date": "2024-03-20"})
+        self.assertContains(response, 'type="month" id="start-date" class="filter-input" name="start_date" '
+                                      'value="2024-03"')
+        self.assertContains(response, "Período analisado: 01/03/2024 a 31/03/2024")
+
+
+class StagedPipelineTests(TestCase):
+    def test_batches_are_written_in_read_order(self):
+        written = []
+
+        def map_batch(batch):
+            # Lotes pares demoram mais: o mapeamento termina fora de ordem
+            time.sleep(0.01 if batch[0] % 2 == 0 else 0)
+            return batch
+
+        StagedPipeline(map_batch, lambda batch: batch, written.append, map_workers=4, write_workers=1).run(
+            [i] for i in range(40)
+        )
+        self.assertEqual(written, [[i] for i in range(40)])
+
+    def test_error_in_map_stage_is_reraised(self):
+        def map_batch(batch):
+            if batch == 5:
+                raise ValueError("lote inválido")
+            return batch
+
+        with self.assertRaises(ValueError):
+            StagedPipeline(map_batch, lambda batch: batch, lambda result: None, map_workers=2).run(range(20))
+
+
+class EmployeeUpsertTests(SyncTestMixin, TransactionTestCase):
+    def test_last_record_wins_for_codes_repeated_across_batches(self):
+        records = [employee_record(i) for i in range(6)] + [employee_record(1, NOME="ULTIMO")]
+        with mock.patch("employees.services.EMPLOYEE_BATCH_SIZE", 2), \
+                override_settings(SYNC_MAP_WORKERS=3, SYNC_WRITE_WORKERS=1):
+            result = self.sync_employees(records)
+
+        self.assertEqual(result["error_count"], 0)
+        self.assertEqual(Employee.objects.filter(client=self.client_obj).count(), 6)
+        self.assertEqual(Employee.objects.get(client=self.client_obj, codigo="1").nome, "ULTIMO")
+
+
+class EmployeeDigestTests(SyncTestMixin, TransactionTestCase):
+    def test_resent_roster_is_counted_unchanged_without_writes(self):
+        records = [employee_record(i) for i in range(4)]
+        first = self.sync_employees(records)
+        self.assertEqual((first["inserted_count"], first["unchanged_count"]), (4, 0))
+        written = dict(Employee.objects.filter(client=self.client_obj).values_list("codigo", "updated_at"))
+
+        second = self.sync_employees(records)
+        self.assertEqual((second["success_count"], second["unchanged_count"], second["updated_count"]), (4, 4, 0))
+        self.assertEqual(dict(Employee.objects.filter(client=self.client_obj).values_list("codigo", "updated_at")),
+                         written)
+
+    def test_only_changed_records_are_updated(self):
+        self.sync_employees([employee_record(i) for i in range(4)])
+        result = self.sync_employees([employee_record(i) for i in range(3)] + [employee_record(3, NOME="NOVO NOME")])
+        self.assertEqual((result["updated_count"], result["unchanged_count"]), (1, 3))
+        self.assertEqual(Employee.objects.get(client=self.client_obj, codigo="3").nome, "NOVO NOME")
+
+
+class AbsenceUpsertTests(SyncTestMixin, TransactionTestCase):
+    def setUp(self):
+        super().setUp()
+        self.sync_employees([employee_record(1)])
+        self.employee = Employee.objects.get(client=self.client_obj, codigo="1")
+
+    def test_resent_absence_updates_the_same_row(self):
+        self.sync_absences([absence_record(MATRICULA_FUNC="M1")])
+        result = self.sync_absences([absence_record(MATRICULA_FUNC="M1", DIAS_AFASTADOS="2", CID_PRINCIPAL="J12")])
+
+        self.assertEqual(result["success_count"], 1)
+        absence = Absence.objects.get(client=self.client_obj)
+        self.assertEqual((absence.employee_id, absence.dias_afastados, absence.cid_principal),
+                         (self.employee.id, 2, "J12"))
+
+    def test_other_period_of_same_employee_is_a_new_absence(self):
+        self.sync_absences([
+            absence_record(MATRICULA_FUNC="M1"),
+            absence_record(MATRICULA_FUNC="M1", DT_INICIO_ATESTADO="10/03/2024", DT_FIM_ATESTADO="11/03/2024"),
+        ])
+        self.assertEqual(Absence.objects.filter(client=self.client_obj, employee=self.employee).count(), 2)
+
+    def test_same_key_repeated_in_one_response_keeps_last(self):
+        self.sync_absences([
+            absence_record(MATRICULA_FUNC="M1"), absence_record(MATRICULA_FUNC="M1", DIAS_AFASTADOS="9"),
+        ])
+        self.assertEqual(list(Absence.objects.filter(client=self.client_obj).values_list("dias_afastados", flat=True)),
+                         [9])
+
+
+class IdentityResolutionTests(SyncTestMixin, TransactionTestCase):
+    def test_known_matricula_resolves_to_real_employee(self):
+        self.sync_employees([employee_record(1)])
+        self.sync_absences([absence_record(MATRICULA_FUNC="M1")])
+
+        self.assertEqual(Absence.objects.get().employee.codigo, "1")
+        self.assertFalse(Employee.objects.filter(situacao=PLACEHOLDER_SITUACAO).exists())
+
+    def test_real_employee_preferred_over_older_placeholder(self):
+        Employee.objects.create(
+            client=self.client_obj, codigo="SEM_MAT_antigo", nome="Sem Matrícula (M1)",
+            matricula_funcionario="M1", situacao=PLACEHOLDER_SITUACAO,
+        )
+        self.sync_employees([employee_record(1)])
+
+        resolved = EmployeeIndex(self.client_obj).resolve([map_absence(absence_record(MATRICULA_FUNC="M1"))])
+        self.assertEqual(resolved, [Employee.objects.get(client=self.client_obj, codigo="1").id])
+
+    def test_unknown_matricula_reuses_one_placeholder(self):
+        self.sync_absences([absence_record(MATRICULA_FUNC="X9")])
+        self.sync_absences([absence_record(MATRICULA_FUNC="X9", DT_INICIO_ATESTADO="10/03/2024",
+                                           DT_FIM_ATESTADO="11/03/2024")])
+
+        placeholder = Employee.objects.get(client=self.client_obj, situacao=PLACEHOLDER_SITUACAO)
+        self.assertEqual(placeholder.matricula_funcionario, "X9")
+        self.assertEqual(Absence.objects.filter(employee=placeholder).count(), 2)
+
+    def test_invalid_records_resolve_to_none(self):
+        index = EmployeeIndex(self.client_obj)
+        self.assertEqual(index.resolve([None]), [None])
+        self.assertFalse(Employee.objects.exists())
+
+
+class RollupRefreshTests(SyncTestMixin, TransactionTestCase):
+    def rollup_rows(self):
+        return sorted(AbsenceRollup.objects.filter(client=self.client_obj).values_list(
+            "month", "unidade", "setor", "grupo_patologico", "sexo", "absences_count", "days_off"
+        ))
+
+    def test_sync_refreshes_touched_months(self):
+        self.sync_absences([
+            absence_record(MATRICULA_FUNC="A"),
+            absence_record(MATRICULA_FUNC="B", DIAS_AFASTADOS="5"),
+            absence_record(MATRICULA_FUNC="C", DT_INICIO_ATESTADO="02/04/2024", DT_FIM_ATESTADO="02/04/2024",
+                           DIAS_AFASTADOS="1"),
+        ])
+        self.assertEqual(self.rollup_rows(), [
+            (datetime.date(2024, 3, 1), "MATRIZ", "PRODUCAO", "RESPIRATORIO", 1, 2, 8),
+            (datetime.date(2024, 4, 1), "MATRIZ", "PRODUCAO", "RESPIRATORIO", 1, 1, 1),
+        ])
+
+    def test_incremental_refresh_matches_full_rebuild(self):
+        self.sync_absences([
+            absence_record(MATRICULA_FUNC="A"),
+            absence_record(MATRICULA_FUNC="C", DT_INICIO_ATESTADO="02/04/2024", DT_FIM_ATESTADO="02/04/2024"),
+        ])
+        # Alteração direta no banco só em março: o incremental recalcula só esse mês
+        Absence.objects.filter(client=self.client_obj, matricula_func="A").update(dias_afastados=20)
+        before = dashboard_version(self.client_obj.id)
+        refresh_absence_rollups(self.client_obj.id, {datetime.date(2024, 3, 1)})
+        incremental = self.rollup_rows()
+
+        self.assertNotEqual(dashboard_version(self.client_obj.id), before)
+        refresh_absence_rollups(self.client_obj.id)
+        self.assertEqual(incremental, self.rollup_rows())
+        self.assertIn(20, [row[-1] for row in incremental])
+
+    def test_empty_month_set_is_a_no_op(self):
+        before = dashboard_version(self.client_obj.id)
+        self.assertEqual(refresh_absence_rollups(self.client_obj.id, set()), 0)
+        self.assertEqual(dashboard_version(self.client_obj.id), before)
+
+
+class SyncSchedulerTests(SyncTestMixin, TestCase):
+    def absence_credentials(self, **fields):
+        return AbsenceCredentials.objects.create(
+            client=self.client_obj, user=self.user, main_company="1001", work_company="1001", code="c", key="k",
+            start_date=datetime.date(2024, 1, 1), end_date=datetime.date(2024, 1, 30), **fields
+        )
+
+    def test_scheduling_is_opt_in(self):
+        self.absence_credentials()
+        EmployeeCredentials.objects.create(client=self.client_obj, user=self.user, company="1001", code="c", key="k")
+
+        self.assertEqual(SyncScheduler.run()["started"], 0)
+        self.assertEqual(SyncScheduler.schedule(), [])
+
+    @override_settings(SYNC_ABSENCE_WINDOW_DAYS=30)
+    def test_absence_window_trails_today_within_soc_limit(self):
+        self.assertEqual(
+            absence_window(datetime.date(2024, 5, 31)), (datetime.date(2024, 5, 1), datetime.date(2024, 5, 31))
+        )
+        with override_settings(SYNC_ABSENCE_WINDOW_DAYS=90):
+            start, end = absence_window(datetime.date(2024, 5, 31))
+        self.assertEqual((end - start).days, ABSENCE_MAX_PERIOD_DAYS)
+
+    def test_scheduled_absence_sync_uses_rolling_window(self):
+        credentials = self.absence_credentials(sync_interval_minutes=60, next_sync_at=timezone.now())
+        with mock.patch("employees.tasks.sync_absences_task.delay") as delay:
+            delay.return_value.id = "task-1"
+            summary = SyncScheduler.run()
+
+        self.assertEqual(summary["started"], 1)
+        start_date, end_date = delay.call_args.args[3:]
+        self.assertEqual(end_date, timezone.localdate().isoformat())
+        self.assertNotEqual(start_date, credentials.start_date.isoformat())
+        credentials.refresh_from_db()
+        self.assertGreater(credentials.next_sync_at, timezone.now())
+
+
+class SyncStatusAccessTests(SyncTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.sync_log = self.new_sync_log("employee")
+        SyncProgress(self.sync_log.id).start(self.sync_log)
+        self.addCleanup(SyncProgress(self.sync_log.id).clear)
+        self.colleague = User.objects.create_user(
+            f"outro-{self.client_obj.subdomain}@example.com", "Outro Usuário", "Analista", client=self.client_obj
+        )
+
+    def test_owner_reads_progress(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("sync_status", args=[self.sync_log.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.json()["completed"])
+
+    def test_other_user_of_same_client_is_refused(self):
+        self.client.force_login(self.colleague)
+        for name in ("sync_status", "sync_stream"):
+            with self.subTest(name):
+                response = self.client.get(reverse(name, args=[self.sync_log.id]))
+                self.assertEqual(response.status_code, 404)
+
+
+def byte_chunks(body, size):
+    return [body[start:start + size] for start in range(0, len(body), size)]
+
+
+class StreamingJSONTests(SimpleTestCase):
+    def records(self, body, size, encoding="latin-1"):
+        return list(iter_json_records(byte_chunks(body, size), encoding))
+
+    def test_records_split_at_every_boundary(self):
+        records = [
+            {"CODIGO": "001", "NOME": "JOSÉ DA CONCEIÇÃO", "SALARIO": 1234.5},
+            {"CODIGO": "002", "NOME": "ANA", "DIAS": 15, "ATIVO": True, "OBS": None},
+        ]
+        body = json.dumps(records, ensure_ascii=False).encode("latin-1")
+        for size in range(1, len(body) + 1):
+            with self.subTest(size=size):
+                self.assertEqual(self.records(body, size), records)
+
+    def test_numbers_and_literals_split_across_chunks(self):
+        # Sem delimitador final, "12" no fim de um bloco não pode virar 12
+        chunks = [b"[12", b"34, 5.", b"5e", b"1, -", b"2, tr", b"ue, nu", b"ll]"]
+        self.assertEqual(list(iter_json_records(chunks)), [1234, 55.0, -2, True, None])
+
+    def test_multibyte_characters_split_across_chunks(self):
+        body = json.dumps([{"NOME": "JOÃO"}], ensure_ascii=False).encode("utf-8")
+        self.assertEqual(self.records(body, 1, "utf-8"), [{"NOME": "JOÃO"}])
+
+    def test_large_body_compacts_buffer(self):
+        records = [{"CODIGO": f"{i:06d}", "NOME": "X" * 50} for i in range(3000)]
+        body = json.dumps(records).encode("latin-1")
+        self.assertEqual(self.records(body, 4096), records)
+
+    def test_error_object_raises(self):
+        body = json.dumps({"Error": "Chave de acesso inválida"}, ensure_ascii=False).encode("latin-1")
+        with self.assertRaisesMessage(SOCErrorResponse, "Chave de acesso inválida"):
+            self.records(body, 5)
+
+    def test_empty_responses(self):
+        for body in (b"", b"  \n", b"[]", b" [ \r\n ] "):
+            with self.subTest(body=body):
+                self.assertEqual(self.records(body, 1), [])
+
+    def test_truncated_body_raises(self):
+        for body in (b'[{"CODIGO": "001"}, {"CODIGO": "0', b'[{"CODIGO": "001"}', b'[{"CODIGO": "001"},', b"["):
+            with self.subTest(body=body), self.assertRaises(json.JSONDecodeError):
+                self.records(body, 3)
+
+    def test_malformed_body_raises(self):
+        for body in (b"<html>erro</html>", b'[{"CODIGO" "001"}]', b'[{"CODIGO": "001"} {"CODIGO": "002"}]'):
+            with self.subTest(body=body), self.assertRaises(json.JSONDecodeError):
+                self.records(body, 4)
+
+    def test_records_before_error_are_yielded(self):
+        records = iter_json_records([b'[{"CODIGO": "001"}, ', b"{oops}]"])
+        self.assertEqual(next(records), {"CODIGO": "001"})
+        with self.assertRaises(json.JSONDecodeError):
+            next(records)
+
+
+@override_settings(SYNC_CHUNK_SIZE=3, SYNC_FANOUT_THRESHOLD=5)
+class SyncChunkTests(SyncTestMixin, TransactionTestCase):
+    def dispatch(self, total):
+        self.sync_log = self.new_sync_log("employee")
+        with mock.patch("employees.services.chord") as chord:
+            chord.return_value.return_value.id = "chord-1"
+            result = APIService.process_employee_records(
+                [employee_record(i) for i in range(total)], self.sync_log, self.client_obj, fanout=True
+            )
+        return result, chord
+
+    def chunk_ids(self):
+        return list(self.sync_log.chunks.values_list("id", flat=True))
+
+    def test_lookahead_reads_at_most_one_chunk(self):
+        read = []
+        records = (read.append(i) or employee_record(i) for i in range(100))
+        large, _ = APIService._split_if_large(records, fanout=True)
+        self.assertTrue(large)
+        self.assertEqual(len(read), 4)
+
+    def test_small_response_is_not_split(self):
+        result, chord = self.dispatch(3)
+        chord.assert_not_called()
+        self.assertEqual(result["total"], 3)
+        self.assertFalse(SyncChunk.objects.exists())
+
+    def test_response_below_threshold_is_written_inline_from_chunks(self):
+        result, chord = self.dispatch(5)
+        chord.assert_not_called()
+        self.assertEqual((result["total"], result["success_count"]), (5, 5))
+        self.assertEqual(Employee.objects.filter(client=self.client_obj).count(), 5)
+        self.assertFalse(SyncChunk.objects.exists())
+
+    def test_large_response_is_dispatched_as_chord(self):
+        result, chord = self.dispatch(7)
+        self.assertTrue(result["deferred"])
+        self.assertEqual(len(chord.call_args.args[0]), 3)
+        self.assertEqual(list(self.sync_log.chunks.values_list("size", flat=True)), [3, 3, 1])
+        self.assertFalse(Employee.objects.exists())
+
+    def test_reprocessed_chunk_is_counted_once(self):
+        self.dispatch(7)
+        for chunk_id in self.chunk_ids() + self.chunk_ids()[:1]:
+            APIService.process_sync_chunk(chunk_id)
+
+        result = APIService.finalize_sync_chunks(self.sync_log.id)
+        self.assertEqual((result["total"], result["success_count"], result["error_count"]), (7, 7, 0))
+        self.assertEqual(Employee.objects.filter(client=self.client_obj).count(), 7)
+        self.assertFalse(SyncChunk.objects.exists())
+
+    def test_failed_attempt_keeps_chunk_for_retry(self):
+        self.dispatch(7)
+        first = self.chunk_ids()[0]
+        with mock.patch.object(APIService, "_run_employee_batches", side_effect=RuntimeError("banco fora")):
+            with self.assertRaises(RuntimeError):
+                APIService.process_sync_chunk(first)
+        chunk = SyncChunk.objects.get(id=first)
+        self.assertEqual((chunk.status, len(chunk.records)), ("pending", 3))
+
+        APIService.process_sync_chunk(first)
+        self.assertEqual(SyncChunk.objects.get(id=first).status, "success")
+
+    def test_chunk_failed_after_last_retry_counts_as_error(self):
+        self.dispatch(7)
+        first, *others = self.chunk_ids()
+        APIService.fail_sync_chunk(first, "banco fora")
+        APIService.fail_sync_chunk(first, "banco fora")
+        for chunk_id in others:
+            APIService.process_sync_chunk(chunk_id)
+
+        result = APIService.finalize_sync_chunks(self.sync_log.id)
+        self.assertEqual((result["success_count"], result["error_count"]), (4, 3))
+        self.sync_log.refresh_from_db()
+        self.assertEqual(self.sync_log.status, "partial")
+        # A parte com erro fica guardada, com os registros, para análise
+        self.assertEqual(list(self.sync_log.chunks.values_list("id", flat=True)), [first])
+        self.assertEqual(len(SyncChunk.objects.get(id=first).records), 3)
+
+    def test_lost_chunk_counts_as_error_and_late_finalize_is_ignored(self):
+        self.dispatch(7)
+        for chunk_id in self.chunk_ids()[1:]:
+            APIService.process_sync_chunk(chunk_id)
+
+        result = APIService.finalize_sync_chunks(self.sync_log.id)
+        self.assertEqual(result["error_count"], 3)
+        self.assertFalse(APIService.finalize_sync_chunks(self.sync_log.id)["success"])
+
+
+class SyncLockTests(TestCase):
+    def setUp(self):
+        self.lock = SyncLock(1, "employee", "1001")
+        self.addCleanup(cache.delete, self.lock.key)
+
+    def test_release_keeps_lock_taken_over_by_another_sync(self):
+        self.assertTrue(self.lock.acquire(10))
+        self.lock.take_over(11)
+        self.lock.release(10)
+        self.assertEqual(cache.get(self.lock.key), 11)
+        self.lock.release(11)
+        self.assertIsNone(cache.get(self.lock.key))
+
+    @override_settings(CACHES={"default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": "redis://localhost:6379/9",
+    }})
+    def test_redis_lock_stores_plain_id_and_releases_with_single_compare_and_delete(self):
+        with mock.patch("employees.sync_lock._redis_client") as redis_client:
+            redis_conn = redis_client.return_value
+            redis_conn.get.return_value = b"10"
+            self.assertTrue(self.lock.acquire(10))
+            self.assertEqual(self.lock.owner(), 10)
+            self.lock.release(10)
+        redis_client.assert_called_with("redis://localhost:6379/9")
+        redis_conn.set.assert_called_once_with(self.lock.key, "10", nx=True, ex=settings.SYNC_LOCK_TTL)
+        script, numkeys, key, owner = redis_conn.eval.call_args.args
+        self.assertIn('redis.call("del", KEYS[1])', script)
+        self.assertEqual((numkeys, key, owner), (1, self.lock.key, "10"))
+        redis_conn.delete.assert_not_called()
+
+
+class InvalidValueWarningTests(SimpleTestCase):
+    def test_invalid_values_are_warned_once_per_distinct_value(self):
+        with self.assertLogs("employees.mapping", "WARNING") as logs:
+            for _ in range(3):
+                self.assertIsNone(parse_int("12a-teste"))
+                self.assertIsNone(parse_date("31/02/2099-teste"))
+            self.assertIsNone(parse_int("13a-teste"))
+        self.assertEqual(logs.output, [
+            "WARNING:employees.mapping:Formato de número inválido: 12a-teste",
+            "WARNING:employees.mapping:Formato de data inválido: 31/02/2099-teste",
+            "WARNING:employees.mapping:Formato de número inválido: 13a-teste",
+        ])
+
+
+class SOCClientTests(SimpleTestCase):
+    RECORDS = [employee_record(i, NOME=f"JOSÉ {i}") for i in range(200)]
+
+    def client_for(self, stub, **options):
+        options = {"max_retries": 3, "backoff_factor": 0, "backoff_jitter": 0, **options}
+        return SOCClient(base_url=stub.url, **options)
+
+    def export(self, client):
+        with client.export({"codigo": "c"}) as response:
+            return response.status_code, list(SOCClient.iter_records(response))
+
+    def test_transient_statuses_are_retried(self):
+        with SOCStubServer({"c": self.RECORDS}, failures=[503, 429]) as stub:
+            status, records = self.export(self.client_for(stub))
+        self.assertEqual((status, records), (200, self.RECORDS))
+        self.assertEqual(stub.requests, 3)
+
+    def test_last_response_returned_when_retries_run_out(self):
+        with SOCStubServer({"c": self.RECORDS}, failures=[503] * 5) as stub:
+            with self.client_for(stub, max_retries=2).export({"codigo": "c"}) as response:
+                self.assertEqual(response.status_code, 503)
+        self.assertEqual(stub.requests, 3)
+
+    def test_connect_and_read_timeouts_are_separate(self):
+        with SOCStubServer({"c": self.RECORDS}, chunk_size=256, delay=0.5) as stub:
+            client = self.client_for(stub, connect_timeout=2, read_timeout=0.1, max_retries=0)
+            self.assertEqual(client.timeout, (2, 0.1))
+            # O corpo para no meio: o timeout de leitura vale para cada bloco
+            with self.assertRaises(requests.exceptions.ConnectionError):
+                self.export(client)
+
+    def test_gzip_response_is_decompressed(self):
+        with SOCStubServer({"c": self.RECORDS}, compress=True) as stub:
+            client = self.client_for(stub)
+            with client.export({"codigo": "c"}) as response:
+                self.assertEqual(response.headers["Content-Encoding"], "gzip")
+                self.assertEqual(list(SOCClient.iter_records(response)), self.RECORDS)
+        self.assertIn("gzip", stub.received[0][0]["Accept-Encoding"])
+
+    def test_shared_client_reuses_pooled_connection(self):
+        with SOCStubServer({"c": self.RECORDS}) as stub, \
+                override_settings(SOC_EXPORT_URL=stub.url), \
+                mock.patch("employees.soc_client._default_client", None):
+            client = get_soc_client()
+            self.assertIs(get_soc_client(), client)
+            for _ in range(3):
+                self.assertEqual(self.export(client), (200, self.RECORDS))
+        self.assertEqual(len({port for _, port in stub.received}), 1)
+
+
+class BackfillTests(SyncTestMixin, TransactionTestCase):
+    def setUp(self):
+        super().setUp()
+        self.credentials = AbsenceCredentials.objects.create(
+            client=self.client_obj, user=self.user, main_company="1001", work_company="1001", code="c", key="k",
+            start_date=datetime.date(2024, 1, 1), end_date=datetime.date(2024, 1, 30),
+        )
+        self.failing = set()
+        self.requested = []
+
+    def export(self, params):
+        self.requested.append(params["dataInicio"])
+        if params["dataInicio"] in self.failing:
+            return FakeResponse([], status_code=503)
+        start = datetime.datetime.strptime(params["dataInicio"], "%d/%m/%Y").date()
+        day = start.strftime("%d/%m/%Y")
+        return FakeResponse([absence_record(MATRICULA_FUNC=f"M{day}", DT_INICIO_ATESTADO=day, DT_FIM_ATESTADO=day)])
+
+    def run_job(self, job):
+        with mock.patch("employees.services.get_soc_client") as soc:
+            soc.return_value.export.side_effect = self.export
+            return BackfillService.run_job(job.id)
+
+    def test_windows_are_inclusive_and_within_soc_limit(self):
+        start, end = datetime.date(2024, 1, 1), datetime.date(2024, 3, 15)
+        windows = split_windows(start, end)
+        self.assertEqual(windows, [
+            (datetime.date(2024, 1, 1), datetime.date(2024, 1, 31)),
+            (datetime.date(2024, 2, 1), datetime.date(2024, 3, 2)),
+            (datetime.date(2024, 3, 3), datetime.date(2024, 3, 15)),
+        ])
+        for window_start, window_end in windows:
+            self.assertLessEqual((window_end - window_start).days, ABSENCE_MAX_PERIOD_DAYS)
+        # Sem buracos nem sobreposição entre as janelas
+        for (_, previous_end), (next_start, _) in zip(windows, windows[1:]):
+            self.assertEqual(next_start - previous_end, datetime.timedelta(days=1))
+        self.assertEqual(split_windows(start, start), [(start, start)])
+        self.assertEqual(split_windows(end, start), [])
+
+    def test_invalid_period_is_refused(self):
+        with self.assertRaises(ValueError):
+            BackfillService.create_job(self.credentials, datetime.date(2024, 2, 1), datetime.date(2024, 1, 1))
+
+    def test_failed_window_marks_job_partial_and_retry_completes_it(self):
+        job = BackfillService.create_job(
+            self.credentials, datetime.date(2024, 1, 1), datetime.date(2024, 3, 15), parallelism=1
+        )
+        self.failing = {"01/02/2024"}
+        result = self.run_job(job)
+
+        self.assertEqual((result["status"], result["windows_success"], result["windows_failed"]), ("partial", 2, 1))
+        failed = job.windows.get(status="error")
+        self.assertEqual((failed.start_date, failed.attempts), (datetime.date(2024, 2, 1), 1))
+        self.assertIn("503", failed.error_message)
+        self.assertEqual(Absence.objects.filter(client=self.client_obj).count(), 2)
+
+        self.failing, self.requested = set(), []
+        with mock.patch("employees.services.get_soc_client") as soc:
+            soc.return_value.export.side_effect = self.export
+            result = BackfillService.retry_window(failed.id)
+
+        self.assertEqual(self.requested, ["01/02/2024"])
+        self.assertEqual(result["status"], "success")
+        failed.refresh_from_db()
+        self.assertEqual((failed.status, failed.attempts, failed.error_message), ("success", 2, None))
+        job.refresh_from_db()
+        self.assertEqual(job.status, "success")
+        self.assertEqual(Absence.objects.filter(client=self.client_obj).count(), 3)
+
+    def test_rerun_resumes_only_unfinished_windows(self):
+        job = BackfillService.create_job(
+            self.credentials, datetime.date(2024, 1, 1), datetime.date(2024, 3, 15), parallelism=1
+        )
+        self.failing = {"01/01/2024", "01/02/2024", "03/03/2024"}
+        self.assertEqual(self.run_job(job)["status"], "error")
+
+        self.failing, self.requested = {"03/03/2024"}, []
+        self.run_job(job)
+        self.failing, self.requested = set(), []
+        self.assertEqual(self.run_job(job)["status"], "success")
+        self.assertEqual(self.requested, ["03/03/2024"])
+
+
+class PayloadCaptureTests(SyncTestMixin, TransactionTestCase):
+    def setUp(self):
+        super().setUp()
+        payload_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, payload_dir, ignore_errors=True)
+        settings_override = override_settings(SYNC_PAYLOAD_DIR=payload_dir, SYNC_PAYLOAD_RETENTION_DAYS=14)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.client_dir = Path(payload_dir) / str(self.client_obj.id)
+        EmployeeCredentials.objects.create(
+            client=self.client_obj, user=self.user, company="1001", code="c", key="k", is_active=True,
+        )
+        AbsenceCredentials.objects.create(
+            client=self.client_obj, user=self.user, main_company="1001", work_company="1001", code="c", key="k",
+            start_date=datetime.date(2024, 3, 1), end_date=datetime.date(2024, 3, 30),
+        )
+
+    def capture(self, sync, response):
+        with mock.patch("employees.services.get_soc_client") as soc:
+            soc.return_value.export.return_value = response
+            sync(self.user, self.client_obj)
+        return SyncLog.objects.filter(client=self.client_obj).latest("id")
+
+    def test_payload_round_trips_through_gzip(self):
+        response = FakeResponse([employee_record(i, NOME=f"JOÃO {i}") for i in range(50)])
+        sync_log = self.capture(APIService.sync_employees, response)
+
+        path = payload_path(sync_log)
+        self.assertEqual(gzip.decompress(path.read_bytes()), response.body)
+        self.assertEqual(b"".join(iter_payload_chunks(path)), response.body)
+        self.assertEqual(sorted(p.name for p in self.client_dir.iterdir()), [path.name])
+
+    def test_broken_stream_leaves_no_payload(self):
+        response = FakeResponse([employee_record(i) for i in range(50)], broken_after=3)
+        sync_log = self.capture(APIService.sync_employees, response)
+
+        self.assertEqual(sync_log.status, "error")
+        self.assertEqual(list(self.client_dir.iterdir()), [])
+
+    def test_capture_disabled_without_retention(self):
+        with override_settings(SYNC_PAYLOAD_RETENTION_DAYS=0):
+            sync_log = self.capture(APIService.sync_employees, FakeResponse([employee_record(1)]))
+        self.assertFalse(payload_path(sync_log).exists())
+
+    def test_old_payloads_are_pruned(self):
+        self.client_dir.mkdir(parents=True)
+        old, recent = self.client_dir / f"1{PAYLOAD_SUFFIX}", self.client_dir / f"2{PAYLOAD_SUFFIX}"
+        for path in (old, recent):
+            path.write_bytes(b"")
+        stale = time.time() - 15 * 86400
+        os.utime(old, (stale, stale))
+
+        # Cada captura aplica a retenção aos payloads do cliente
+        sync_log = self.capture(APIService.sync_employees, FakeResponse([employee_record(1)]))
+        self.assertEqual(sorted(p.name for p in self.client_dir.iterdir()),
+                         sorted([recent.name, payload_path(sync_log).name]))
+        self.assertEqual(prune_payloads(self.client_obj.id, max_age_days=0), 2)
+
+    def rows(self, model, client, *fields):
+        return sorted(model.objects.filter(client=client).values_list(*fields))
+
+    def test_replay_reproduces_rows_without_calling_soc(self):
+        employees_log = self.capture(
+            APIService.sync_employees, FakeResponse([employee_record(i) for i in range(20)])
+        )
+        absences_log = self.capture(APIService.sync_absences, FakeResponse([
+            absence_record(MATRICULA_FUNC=f"M{i}", DIAS_AFASTADOS=str(i)) for i in range(10)
+        ] + [absence_record()]))
+        other = Client.objects.create(name="Cliente Replay", subdomain=f"replay-{self.client_obj.id}")
+
+        with mock.patch("employees.services.get_soc_client") as soc:
+            call_command("replay_sync", employees_log.id, client=other.id, stdout=io.StringIO())
+            call_command("replay_sync", absences_log.id, client=other.id, stdout=io.StringIO())
+        soc.assert_not_called()
+
+        employee_fields = ("codigo", "nome", "matricula_funcionario", "situacao", "content_hash")
+        absence_fields = (
+            "employee__codigo", "dt_inicio_atestado", "dt_fim_atestado", "dias_afastados", "cid_principal",
+        )
+        self.assertEqual(self.rows(Employee, other, *employee_fields),
+                         self.rows(Employee, self.client_obj, *employee_fields))
+        self.assertEqual(self.rows(Absence, other, *absence_fields),
+                         self.rows(Absence, self.client_obj, *absence_fields))
+        self.assertEqual(Absence.objects.filter(client=other).count(), 11)
+
+    def test_replay_without_payload_fails(self):
+        sync_log = self.new_sync_log("employee")
+        result = APIService.replay_sync(sync_log)
+        self.assertFalse(result["success"])
+        self.assertIn("não encontrado", result["message"])
+
+
+def rollup_rows():
+    """Linhas fixas no formato de ROLLUP_COLUMNS, com empates, nomes longos e sexo não informado."""
+    rows = []
+    for index in range(12):
+        rows.append((
+            datetime.date(2024, 1 + index % 3, 1),
+            f"UNIDADE COM NOME BEM COMPRIDO {index:02d}",
+            f"SETOR {index % 4}",
+            f"GRUPO PATOLOGICO DE NOME MUITO LONGO NUMERO {index % 5}",
+            (1, 2, None)[index % 3],
+            index + 1,
+            (index * 7) % 11 + 1,
+        ))
+    return rows
+
+
+class ChartSpecTests(SimpleTestCase):
+    def setUp(self):
+        self.data = DashboardData(100, rollup_rows())
+
+    def traces(self, name):
+        spec = json.loads(chart_json(CHARTS[name](self.data)))
+        return spec["data"]
+
+    def test_units_chart(self):
+        days, absences = self.traces("units")
+        labels = [item["unidade"][:20] for item in self.data.units]
+        self.assertEqual((days["orientation"], days["y"], days["x"]),
+                         ("h", labels, [item["total_days"] for item in self.data.units]))
+        self.assertEqual(absences["y"], labels)
+        self.assertEqual(absences["x"], [item["total_absences"] for item in self.data.units])
+        # As 10 unidades com mais dias, da maior para a menor
+        self.assertEqual(len(labels), 10)
+        self.assertEqual(days["x"], sorted(days["x"], reverse=True))
+
+    def test_departments_chart(self):
+        days, absences = self.traces("departments")
+        labels = [item["setor"] for item in self.data.departments]
+        self.assertEqual((days["x"], days["y"]), (labels, [item["total_days"] for item in self.data.departments]))
+        self.assertEqual(absences["y"], [item["total_absences"] for item in self.data.departments])
+
+    def test_cid_chart(self):
+        absences, days = self.traces("cid")
+        labels = [item["grupo_patologico"][:30] for item in self.data.cids]
+        self.assertEqual(absences["y"], labels)
+        self.assertEqual(absences["x"], [item["total_absences"] for item in self.data.cids])
+        self.assertEqual(absences["x"], sorted(absences["x"], reverse=True))
+        self.assertEqual(days["x"], [item["total_days"] for item in self.data.cids])
+
+    def test_month_chart(self):
+        days, absences = self.traces("month")
+        self.assertEqual(days["x"], ["01/2024", "02/2024", "03/2024"])
+        self.assertEqual(days["y"], [item["total_days"] for item in self.data.months])
+        self.assertEqual(absences["y"], [item["total_absences"] for item in self.data.months])
+        self.assertEqual(absences["yaxis"], "y2")
+
+    def test_gender_chart(self):
+        (pie,) = self.traces("gender")
+        self.assertEqual(pie["labels"], [item["label"] for item in self.data.genders])
+        self.assertEqual(pie["values"], [item["total_absences"] for item in self.data.genders])
+        self.assertEqual(set(pie["labels"]), {"Masculino", "Feminino", "Não informado"})
+
+    def test_cost_chart(self):
+        (bars,) = self.traces("cost")
+        self.assertEqual(bars["x"], [item["setor"] for item in self.data.costs])
+        self.assertEqual(bars["y"], [round(item["total_cost"], 2) for item in self.data.costs])
+        self.assertEqual(bars["text"][0], f"R$ {bars['y'][0]:.2f}".replace(".", ","))
+
+    def test_empty_data_has_no_charts(self):
+        empty = DashboardData(100, [])
+        for name, build in CHARTS.items():
+            with self.subTest(name):
+                self.assertEqual(chart_json(build(empty)), "null")
+
+
+class DashboardChartApiTests(SyncTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.other_client = Client.objects.create(name="Outro Cliente", subdomain=f"outro-{self.client_obj.id}")
+        this_month = timezone.localdate().replace(day=1)
+        last_month = (this_month - datetime.timedelta(days=1)).replace(day=1)
+        for client, unidade in ((self.client_obj, "MATRIZ"), (self.other_client, "UNIDADE SIGILOSA")):
+            Employee.objects.create(client=client, codigo="1", nome="FUNCIONARIO")
+            for month, sexo in ((this_month, 1), (last_month, 2)):
+                AbsenceRollup.objects.create(
+                    client=client, month=month, unidade=unidade, setor=f"SETOR {unidade}",
+                    grupo_patologico="RESPIRATORIO", sexo=sexo, absences_count=2, days_off=5,
+                )
+        self.client.force_login(self.user)
+
+    def get_chart(self, name):
+        return self.client.get(reverse("api_dashboard_chart", args=[name]))
+
+    def test_every_chart_returns_json_for_own_client(self):
+        for name in CHARTS:
+            with self.subTest(name):
+                response = self.get_chart(name)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response["Content-Type"], "application/json")
+                figure = response.json()
+                self.assertTrue(figure["data"])
+                self.assertNotIn("SIGILOSA", response.content.decode())
+
+    def test_unknown_chart_is_404(self):
+        self.assertEqual(self.get_chart("inexistente").status_code, 404)
+
+    def test_login_required(self):
+        self.client.logout()
+        self.assertEqual(self.get_chart("units").status_code, 302)
+
+    def test_second_request_is_served_from_chart_cache(self):
+        with mock.patch("employees.views.build_dashboard", wraps=build_dashboard) as build:
+            first = self.get_chart("units").content
+            second = self.get_chart("units").content
+            self.assertEqual(build.call_count, 1)
+            # Outro gráfico do mesmo período reaproveita os dados em cache, mas tem chave própria
+            self.get_chart("cid")
+            self.assertEqual(build.call_count, 1)
+        self.assertEqual(first, second)
+        key = f"chart:units:{period_key(*dashboard_period({}))}"
+        self.assertEqual(cached_dashboard(self.client_obj.id, key, lambda: None), first.decode())
+
+    def test_failing_chart_does_not_affect_the_others(self):
+        broken = dict(CHARTS, cid=mock.Mock(side_effect=RuntimeError("falha no gráfico")))
+        self.client.raise_request_exception = False
+        with mock.patch("employees.views.CHARTS", broken), self.assertLogs("django.request", "ERROR"):
+            statuses = {name: self.get_chart(name).status_code for name in CHARTS}
+        self.assertEqual(statuses.pop("cid"), 500)
+        self.assertEqual(set(statuses.values()), {200})
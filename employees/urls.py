@@ -7,6 +7,7 @@ urlpatterns = [
     path('sync/', views.sync_employees, name='sync_employees'),
     path('sync-absences/', views.sync_absences, name='sync_absences'),
     path('sync-status/<int:sync_id>/', views.sync_status, name='sync_status'),
+    path('sync-stream/<int:sync_id>/', views.sync_stream, name='sync_stream'),
     path('sync-details/<int:sync_id>/', views.sync_details, name='sync_details'),
     path('sync-delete/<int:sync_id>/', views.sync_delete, name='sync_delete'),
     path('sync-stop/<int:sync_id>/', views.sync_stop, name='sync_stop'),
@@ -14,4 +15,6 @@ urlpatterns = [
     # Adicione essas URLs para as APIs do dashboard
     path('api/dashboard/employees/', views.dashboard_employees_api, name='api_dashboard_employees'),
     path('api/dashboard/absences/', views.dashboard_absences_api, name='api_dashboard_absences'),
+    path('api/dashboard/summary/', views.dashboard_summary_api, name='api_dashboard_summary'),
+    path('api/dashboard/charts/<slug:chart>/', views.dashboard_chart_api, name='api_dashboard_chart'),
 ]
\ No newline at end of file
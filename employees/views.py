@@ -1,31 +1,27 @@
+import asyncio
 import json
-import pandas as pd
-import plotly
-import plotly.express as px
-import plotly.graph_objects as go
+import time
 from django.shortcuts import render, redirect, get_object_or_404
 from django.views.generic import ListView, DetailView, TemplateView
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.http import JsonResponse, HttpResponse
+from django.conf import settings
+from django.http import JsonResponse, HttpResponse, StreamingHttpResponse, Http404
 from django.contrib.auth.decorators import login_required
 from django.utils import timezone
-from django.db.models import Count, Sum, Q, F
-from django.db.models.functions import TruncMonth, Coalesce
-from django.views.decorators.cache import cache_page
-from django.utils.decorators import method_decorator
+from django.db.models import Q, F
 
 from clients.models import Client
 from clients.mixins import ClientQuerySetMixin  # Import adicionado
 from api_config.models import SyncLog, EmployeeCredentials, AbsenceCredentials
 from .models import Employee, Absence
+from .charts import CHARTS, chart_json
+from .dashboard import build_dashboard, cached_period, dashboard_period
 from .services import APIService
+from .payload_store import delete_payload
+from .progress import SyncProgress
 from .tasks import sync_employees_task, sync_absences_task
 
-# ============================================================
-# Constantes para evitar duplicação de literais (S1192)
-# ============================================================
-DAYS_OFF_LABEL = "Dias Afastados"          # substitui duplicado 4x
-NUM_ATTESTADOS_LABEL = "Número de Atestados"  # substitui duplicado 4x
+SSE_KEEPALIVE_SECONDS = 15  # intervalo máximo sem eventos no stream SSE
 
 class EmployeeListView(LoginRequiredMixin, ClientQuerySetMixin, ListView):
     """View para listar funcionários."""
@@ -122,7 +118,6 @@ class EmployeeDetailView(LoginRequiredMixin, DetailView):
         return context
 
 
-@method_decorator(cache_page(60 * 5), name='dispatch')  # Cache de 5 minutos
 class DashboardView(LoginRequiredMixin, TemplateView):
     """Exibe o dashboard principal de absenteísmo."""
     template_name = 'dashboard/index.html'
@@ -136,43 +131,15 @@ class DashboardView(LoginRequiredMixin, TemplateView):
             context['no_client'] = True
             return context
         
-        employees = Employee.objects.filter(client=client)
-        absences = Absence.objects.filter(client=client)
-
-        # Se não há dados de employees ou absences, retorna cedo
-        if not self._verifica_dados_basicos(context, employees, absences):
-            return context
-        
-        # Calcular métricas gerais
-        (context['total_employees'],
-         context['total_absences'],
-         context['total_days_off'],
-         absenteeism_rate,
-         absenteeism_cost,
-         total_hours_off,
-         hourly_rate) = self._calcular_metricas_absenteismo(employees, absences)
-        
-        context['absenteeism_rate'] = round(absenteeism_rate, 2)
-        context['absenteeism_cost'] = round(absenteeism_cost, 2)
-        context['total_hours_off'] = total_hours_off
-        context['hourly_rate'] = round(hourly_rate, 2)
-        
-        # Projeção de economia (10%, 20%, 30%)
-        context['savings_10'] = round(absenteeism_cost * 0.1, 2)
-        context['savings_20'] = round(absenteeism_cost * 0.2, 2)
-        context['savings_30'] = round(absenteeism_cost * 0.3, 2)
-        
-        # Construir gráficos
-        context['units_chart'] = self._build_units_chart(absences)
-        context['departments_chart'] = self._build_departments_chart(absences)
-        context['cid_chart'] = self._build_cid_chart(absences)
-        context['month_chart'] = self._build_month_chart(absences)
-        
-        gender_chart, gender_cid_data = self._build_gender_chart(absences)
-        context['gender_chart'] = gender_chart
-        context['gender_cid_data'] = gender_cid_data
-        
-        context['cost_chart'] = self._build_cost_chart(absences, hourly_rate)
+        # Só os indicadores: os gráficos são buscados depois pela página, um
+        # endpoint por gráfico (dashboard_chart_api)
+        start, end = dashboard_period(self.request.GET)
+        context['start_date'] = start
+        context['end_date'] = end
+        context.update(cached_period(
+            client.id, 'page', start, end,
+            lambda: self._build_kpi_context(_dashboard_data(client, start, end)),
+        ))
         
         # Pré-serializa a configuração dos gráficos para uso seguro no template
         context['chart_config_json'] = json.dumps({'displaylogo': False})
@@ -182,246 +149,55 @@ class DashboardView(LoginRequiredMixin, TemplateView):
     # --------------------------------------
     # MÉTODOS AUXILIARES PARA get_context_data
     # --------------------------------------
-    def _verifica_dados_basicos(self, context, employees, absences):
-        """Se não existem registros de funcionários ou absences, define no_data e retorna False."""
-        if not employees.exists() or not absences.exists():
+    def _build_kpi_context(self, data):
+        """Indicadores do período, calculados numa passada (ver employees/dashboard.py)."""
+        context = {
+            'total_employees': data.total_employees,
+            'total_absences': data.total_absences,
+        }
+        if data.no_data:
             context['no_data'] = True
-            context['total_employees'] = employees.count()
-            context['total_absences'] = absences.count()
-            return False
-        return True
-    
-    def _calcular_metricas_absenteismo(self, employees, absences):
-        """Calcula métricas principais de absenteísmo."""
-        total_employees = employees.count()
-        total_absences = absences.count()
-        total_days_off = absences.aggregate(total=Coalesce(Sum('dias_afastados'), 0))['total'] or 0
-        
-        # Parâmetros simplificados
-        working_days_per_month = 22
-        months_analyzed = max(1, len(absences.dates('dt_inicio_atestado', 'month', order='ASC')))
-        
-        # Taxa de absenteísmo = dias_afastados / (dias_uteis * meses * total_func)
-        absenteeism_rate = (total_days_off / (working_days_per_month * months_analyzed * total_employees)) * 100
-        
-        # Custo aproximado
-        MIN_WAGE_BRAZIL = 1412.00
-        AVG_WORK_HOURS_PER_MONTH = 176
-        hourly_rate = MIN_WAGE_BRAZIL / AVG_WORK_HOURS_PER_MONTH
-        total_hours_off = total_days_off * 8
-        absenteeism_cost = total_hours_off * hourly_rate
-        
-        return (total_employees, total_absences, total_days_off,
-                absenteeism_rate, absenteeism_cost, total_hours_off, hourly_rate)
-    
-    def _build_units_chart(self, absences):
-        """Gráfico de unidades com maior absenteísmo."""
-        units_data = (absences.values('unidade')
-                      .annotate(total_absences=Count('id'),
-                                total_days=Coalesce(Sum('dias_afastados'), 0))
-                      .exclude(unidade__isnull=True)
-                      .exclude(unidade__exact='')
-                      .order_by('-total_days')[:10])
-        if not units_data:
-            return None
-        
-        df = pd.DataFrame(list(units_data))
-        if df.empty:
-            return None
-        
-        df['unidade'] = df['unidade'].str.slice(0, 20)
-        
-        fig = go.Figure()
-        fig.add_trace(go.Bar(
-            y=df['unidade'],
-            x=df['total_days'],
-            name=DAYS_OFF_LABEL,
-            orientation='h'
-        ))
-        fig.add_trace(go.Bar(
-            y=df['unidade'],
-            x=df['total_absences'],
-            name=NUM_ATTESTADOS_LABEL,
-            orientation='h'
-        ))
-        fig.update_layout(barmode='group')
-        
-        return json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
-    
-    def _build_departments_chart(self, absences):
-        """Gráfico de departamentos com maior absenteísmo."""
-        departments_data = (absences.values('setor')
-                            .annotate(total_absences=Count('id'),
-                                      total_days=Coalesce(Sum('dias_afastados'), 0))
-                            .exclude(setor__isnull=True)
-                            .exclude(setor__exact='')
-                            .order_by('-total_days')[:10])
-        if not departments_data:
-            return None
-        
-        df = pd.DataFrame(list(departments_data))
-        if df.empty:
-            return None
-        
-        fig = go.Figure()
-        fig.add_trace(go.Bar(
-            x=df['setor'],
-            y=df['total_days'],
-            name=DAYS_OFF_LABEL
-        ))
-        fig.add_trace(go.Bar(
-            x=df['setor'],
-            y=df['total_absences'],
-            name=NUM_ATTESTADOS_LABEL
-        ))
-        fig.update_layout(barmode='group')
-        
-        return json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
-    
-    def _build_cid_chart(self, absences):
-        """Gráfico por CID / Grupo Patológico."""
-        cid_data = (absences.values('grupo_patologico')
-                    .annotate(total_absences=Count('id'),
-                              total_days=Coalesce(Sum('dias_afastados'), 0))
-                    .exclude(grupo_patologico__isnull=True)
-                    .exclude(grupo_patologico__exact='')
-                    .order_by('-total_absences')[:10])
-        if not cid_data:
-            return None
-        
-        df = pd.DataFrame(list(cid_data))
-        if df.empty:
-            return None
-        
-        df['grupo_patologico'] = df['grupo_patologico'].str.slice(0, 30)
-        
-        fig = go.Figure()
-        fig.add_trace(go.Bar(
-            y=df['grupo_patologico'],
-            x=df['total_absences'],
-            name=NUM_ATTESTADOS_LABEL,
-            orientation='h'
-        ))
-        fig.add_trace(go.Bar(
-            y=df['grupo_patologico'],
-            x=df['total_days'],
-            name=DAYS_OFF_LABEL,
-            orientation='h'
-        ))
-        fig.update_layout(barmode='group')
-        
-        return json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
-    
-    def _build_month_chart(self, absences):
-        """Gráfico de linhas por mês."""
-        absences_with_date = absences.filter(dt_inicio_atestado__isnull=False)
-        month_data = (absences_with_date.annotate(month=TruncMonth('dt_inicio_atestado'))
-                      .values('month')
-                      .annotate(total_absences=Count('id'),
-                                total_days=Coalesce(Sum('dias_afastados'), 0))
-                      .order_by('month'))
-        
-        if not month_data or len(month_data) <= 1:
-            return None
-        
-        df = pd.DataFrame(list(month_data))
-        if df.empty:
-            return None
-        
-        df['month_str'] = df['month'].apply(lambda x: x.strftime('%m/%Y'))
-        
-        fig = go.Figure()
-        fig.add_trace(go.Scatter(
-            x=df['month_str'],
-            y=df['total_days'],
-            name=DAYS_OFF_LABEL,
-            mode='lines+markers'
-        ))
-        fig.add_trace(go.Scatter(
-            x=df['month_str'],
-            y=df['total_absences'],
-            name=NUM_ATTESTADOS_LABEL,
-            mode='lines+markers',
-            yaxis='y2'
-        ))
-        
-        fig.update_layout(
-            yaxis2=dict(overlaying='y', side='right')
-        )
-        return json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
-    
-    def _build_gender_chart(self, absences):
-        """Gráfico de distribuição de absenteísmo por gênero + top CIDs."""
-        gender_data = (absences.values('sexo')
-                       .annotate(total_absences=Count('id'),
-                                 total_days=Coalesce(Sum('dias_afastados'), 0)))
-        if not gender_data:
-            return None, {}
-        
-        df = pd.DataFrame(list(gender_data))
-        if df.empty:
-            return None, {}
-        
-        gender_map = {1: 'Masculino', 2: 'Feminino', None: 'Não informado'}
-        df['gender_label'] = df['sexo'].map(gender_map)
-        
-        total_abs = df['total_absences'].sum()
-        df['percentage'] = (df['total_absences'] / total_abs * 100).round(2)
-        
-        fig_gender = px.pie(
-            df,
-            values='total_absences',
-            names='gender_label',
-            hole=0.4
-        )
-        fig_gender.update_traces(textposition='inside', textinfo='percent+label')
+            return context
         
-        gender_chart = json.dumps(fig_gender, cls=plotly.utils.PlotlyJSONEncoder)
+        context['total_days_off'] = data.total_days_off
+        context['absenteeism_rate'] = round(data.absenteeism_rate, 2)
+        context['absenteeism_cost'] = round(data.absenteeism_cost, 2)
+        context['total_hours_off'] = data.total_hours_off
+        context['hourly_rate'] = round(data.hourly_rate, 2)
         
-        # Preparar top CIDs por gênero
-        gender_cid_data = {}
-        for gval in df['sexo'].unique():
-            if gval is None:
-                continue
-            top_cids = (absences.filter(sexo=gval)
-                        .values('grupo_patologico')
-                        .annotate(count=Count('id'))
-                        .exclude(grupo_patologico__isnull=True)
-                        .exclude(grupo_patologico__exact='')
-                        .order_by('-count')[:5])
-            
-            if top_cids:
-                label = gender_map.get(gval, 'Outro')
-                gender_cid_data[label] = list(top_cids)
+        # Projeção de economia (10%, 20%, 30%)
+        for rate, value in data.savings.items():
+            context[f'savings_{rate}'] = round(value, 2)
         
-        return gender_chart, gender_cid_data
+        context['gender_cid_data'] = data.gender_top_cids
+        return context
+
+
+def _dashboard_data(client, start, end):
+    """DashboardData do período, compartilhado no cache pela página e pelos gráficos."""
+    return cached_period(client.id, 'data', start, end, lambda: build_dashboard(client, start, end))
+
+
+@login_required
+def dashboard_chart_api(request, chart):
+    """
+    Figura de um gráfico do dashboard em JSON (null quando não há dados),
+    em cache próprio por cliente, período e versão dos dados.
+    """
+    build_chart = CHARTS.get(chart)
+    if build_chart is None:
+        raise Http404('Gráfico não encontrado')
+    client = request.client
+    if not client:
+        return JsonResponse({'success': False, 'message': 'Nenhum cliente encontrado.'}, status=404)
     
-    def _build_cost_chart(self, absences, hourly_rate):
-        """Gráfico de custo por setor."""
-        cost_data = (absences.values('setor')
-                     .annotate(total_days=Coalesce(Sum('dias_afastados'), 0))
-                     .exclude(setor__isnull=True)
-                     .exclude(setor__exact='')
-                     .order_by('-total_days')[:5])
-        if not cost_data:
-            return None
-        
-        df = pd.DataFrame(list(cost_data))
-        if df.empty:
-            return None
-        
-        df['total_hours'] = df['total_days'] * 8
-        df['total_cost'] = df['total_hours'] * hourly_rate
-        
-        fig = go.Figure(go.Bar(
-            x=df['setor'],
-            y=df['total_cost'],
-            text=df['total_cost'].apply(lambda x: f'R$ {x:.2f}'.replace('.', ',')),
-            textposition='auto'
-        ))
-        fig.update_layout(yaxis=dict(tickprefix='R$ ', tickformat=',.2f'))
-        
-        return json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
+    start, end = dashboard_period(request.GET)
+    figure = cached_period(
+        client.id, f'chart:{chart}', start, end,
+        # Gráfico vazio vira 'null' (e não None), para também ficar em cache
+        lambda: chart_json(build_chart(_dashboard_data(client, start, end))),
+    )
+    return HttpResponse(figure, content_type='application/json')
 
 
 @login_required
@@ -442,28 +218,15 @@ def sync_employees(request):
                 return JsonResponse({'success': False, 'message': msg})
             return redirect('api_config')
         
-        sync_log = SyncLog.objects.create(
-            client=client,
-            user=request.user,
-            api_type='employee',
-            company=credentials.company,
-            status='error',
-            records_processed=0,
-            records_success=0,
-            records_error=0,
-            start_time=timezone.now()
+        # full=1 força a sincronização completa; sem ele o serviço decide (incremental por padrão)
+        full = True if request.POST.get('full') in ('1', 'true', 'on') else None
+        sync_log, started = APIService.start_sync(
+            request.user, client, 'employee', credentials.company,
+            lambda log: sync_employees_task.delay(request.user.id, client.id, log.id, full)
         )
         
-        task = sync_employees_task.delay(request.user.id, client.id, sync_log.id)
-        sync_log.task_id = task.id
-        sync_log.save()
-        
         if is_ajax:
-            return JsonResponse({
-                'success': True, 
-                'message': 'Sincronização iniciada com sucesso!',
-                'sync_log_id': sync_log.id
-            })
+            return _sync_started_response(sync_log, started)
         return redirect('sync_logs')
     
     return redirect('employee_list')
@@ -487,44 +250,51 @@ def sync_absences(request):
                 return JsonResponse({'success': False, 'message': msg})
             return redirect('api_config')
         
-        sync_log = SyncLog.objects.create(
-            client=client,
-            user=request.user,
-            api_type='absence',
-            company=credentials.main_company,
-            status='error',
-            records_processed=0,
-            records_success=0,
-            records_error=0,
-            start_time=timezone.now()
+        sync_log, started = APIService.start_sync(
+            request.user, client, 'absence', credentials.main_company,
+            lambda log: sync_absences_task.delay(request.user.id, client.id, log.id)
         )
         
-        task = sync_absences_task.delay(request.user.id, client.id, sync_log.id)
-        sync_log.task_id = task.id
-        sync_log.save()
-        
         if is_ajax:
-            return JsonResponse({
-                'success': True, 
-                'message': 'Sincronização iniciada com sucesso!',
-                'sync_log_id': sync_log.id
-            })
+            return _sync_started_response(sync_log, started)
         return redirect('sync_logs')
     
     return redirect('employee_list')
 
 
-@login_required
-def sync_status(request, sync_id):
-    """API para verificar status de uma sincronização."""
-    sync_log = get_object_or_404(
-        SyncLog,
-        id=sync_id,
-        user=request.user,
-        client=request.client
-    )
+def _sync_started_response(sync_log, started):
+    """Resposta AJAX de um pedido de sincronização, nova ou já em andamento."""
+    if started:
+        message = 'Sincronização iniciada com sucesso!'
+    else:
+        message = 'Já existe uma sincronização em andamento; acompanhando a existente.'
+    return JsonResponse({
+        'success': True,
+        'message': message,
+        'sync_log_id': sync_log.id,
+        'attached': not started
+    })
+
+
+def _progress_data(sync_id, progress):
+    """Status de uma sincronização em andamento, a partir do cache de progresso."""
+    processed = progress['records_processed']
+    return {
+        'id': sync_id,
+        'api_type': progress['api_type'],
+        'company': progress['company'],
+        'records_processed': processed,
+        'records_success': progress['records_success'],
+        'records_error': progress['records_error'],
+        'status': 'running',
+        'error_message': f"Processando: {processed} registros recebidos" if processed else progress['message'],
+        'completed': False
+    }
+
+
+def _sync_log_data(sync_log):
+    """Status de uma sincronização a partir do SyncLog gravado."""
     completed = sync_log.end_time is not None
-    
     data = {
         'id': sync_log.id,
         'api_type': sync_log.api_type,
@@ -538,8 +308,83 @@ def sync_status(request, sync_id):
     }
     if completed:
         data['end_time'] = sync_log.end_time.isoformat()
-    
-    return JsonResponse(data)
+    return data
+
+
+def _owns_progress(progress, user_id, client_id):
+    return progress is not None and progress['user_id'] == user_id and progress['client_id'] == client_id
+
+
+@login_required
+def sync_status(request, sync_id):
+    """API para verificar status de uma sincronização."""
+    # Em andamento: responde pelo cache de progresso, sem consultar o banco
+    progress = SyncProgress(sync_id).read()
+    client_id = request.client.id if request.client else None
+    if _owns_progress(progress, request.user.id, client_id):
+        return JsonResponse(_progress_data(sync_id, progress))
+
+    sync_log = get_object_or_404(SyncLog, id=sync_id, user=request.user, client=request.client)
+    return JsonResponse(_sync_log_data(sync_log))
+
+
+def _sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def _sync_event_stream(sync_id, user_id, client_id):
+    """
+    Envia as mudanças de progresso (só os campos alterados) e, ao concluir,
+    o resultado final. Lê o cache a cada SYNC_STREAM_INTERVAL segundos; o
+    banco só é consultado enquanto a sincronização não está no cache
+    (antes de a tarefa começar e no fim).
+    """
+    last = {}
+    started = time.monotonic()
+    last_sent = started
+    yield f"retry: {int(settings.SYNC_STREAM_RETRY_MS)}\n\n"
+    while time.monotonic() - started < settings.SYNC_STREAM_TIMEOUT:
+        progress = await SyncProgress(sync_id).aread()
+        if _owns_progress(progress, user_id, client_id):
+            data = _progress_data(sync_id, progress)
+            delta = {key: value for key, value in data.items() if last.get(key) != value}
+            if delta:
+                last.update(delta)
+                last_sent = time.monotonic()
+                yield _sse_event('progress', delta)
+        else:
+            sync_log = await SyncLog.objects.filter(id=sync_id, user_id=user_id, client_id=client_id).afirst()
+            if sync_log is None:
+                yield _sse_event('not_found', {'message': 'Sincronização não encontrada'})
+                return
+            if sync_log.end_time is not None:
+                yield _sse_event('complete', _sync_log_data(sync_log))
+                return
+
+        # Comentário SSE mantém a conexão viva atrás de proxies
+        if time.monotonic() - last_sent >= SSE_KEEPALIVE_SECONDS:
+            last_sent = time.monotonic()
+            yield ": keepalive\n\n"
+        await asyncio.sleep(settings.SYNC_STREAM_INTERVAL)
+    # Tempo máximo atingido: o navegador reconecta sozinho (campo retry)
+
+
+@login_required
+async def sync_stream(request, sync_id):
+    """Stream SSE com o progresso de uma sincronização; termina quando ela é concluída."""
+    user = await request.auser()
+    client_id = request.client.id if request.client else None
+    exists = await SyncLog.objects.filter(id=sync_id, user_id=user.id, client_id=client_id).aexists()
+    if not exists:
+        raise Http404("Sincronização não encontrada")
+
+    response = StreamingHttpResponse(
+        _sync_event_stream(sync_id, user.id, client_id), content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    # Desliga o buffer de proxies (nginx) para os eventos chegarem na hora
+    response['X-Accel-Buffering'] = 'no'
+    return response
 
 
 @login_required
@@ -562,6 +407,10 @@ def sync_details(request, sync_id):
         'records_processed': sync_log.records_processed,
         'records_success': sync_log.records_success,
         'records_error': sync_log.records_error,
+        'records_inserted': sync_log.records_inserted,
+        'records_updated': sync_log.records_updated,
+        'records_unchanged': sync_log.records_unchanged,
+        'records_missing': sync_log.records_missing,
         'error_message': sync_log.error_message,
         'start_time': sync_log.start_time.isoformat(),
     }
@@ -585,6 +434,7 @@ def sync_delete(request, sync_id):
             client=request.client
         )
         try:
+            delete_payload(sync_log)
             sync_log.delete()
             return JsonResponse({'success': True, 'message': 'Log excluído com sucesso'})
         except Exception as e:
@@ -616,6 +466,8 @@ def sync_stop(request, sync_id):
             sync_log.end_time = timezone.now()
             sync_log.error_message = "Sincronização interrompida pelo usuário."
             sync_log.save()
+            SyncProgress(sync_log.id).clear()
+            APIService.release_sync_lock(sync_log.id)
             
             return JsonResponse({'success': True, 'message': 'Sincronização interrompida com sucesso'})
         except Exception as e:
@@ -631,11 +483,24 @@ def dashboard_employees_api(request):
     if not client:
         return JsonResponse([], safe=False)
     
-    employees = Employee.objects.filter(client=client)
+    employees = Employee.objects.filter(client=client, missing_since__isnull=True)
     data = list(employees.values())
     return JsonResponse(data, safe=False)
 
 
+@login_required
+def dashboard_summary_api(request):
+    """Indicadores e séries do dashboard em JSON (mesma agregação da DashboardView)."""
+    client = request.client
+    if not client:
+        return JsonResponse({'success': False, 'message': 'Nenhum cliente encontrado.'}, status=404)
+    
+    start, end = dashboard_period(request.GET)
+    return JsonResponse(cached_period(
+        client.id, 'summary', start, end, lambda: _dashboard_data(client, start, end).as_dict()
+    ))
+
+
 @login_required
 def dashboard_absences_api(request):
     """API para obter dados de absenteísmo para o dashboard (compatibilidade)."""